@@ -0,0 +1,142 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from tools.utils_clock import clock_now, clock_monotonic
+from tools.utils_timing import latency_recorder
+
+
+# 需要盯行情的时段和各自的正常推送间隔，单位（秒）
+# 集合竞价只有撮合价变化时才推送，间隔放宽；9:25 到 9:30 和午休没有推送，不检查
+WATCH_SESSIONS = [
+    ('09:15', '09:25', 10.0),   # 开盘集合竞价
+    ('09:30', '11:30', 3.0),    # 上午连续竞价
+    ('13:00', '14:57', 3.0),    # 下午连续竞价
+    ('14:57', '15:00', 10.0),   # 收盘集合竞价
+]
+
+
+# ================================
+# 行情断流看门狗：记录 → 重新订阅（退避重试） → 钉钉告警
+# ================================
+class FeedWatchdog:
+    def __init__(
+        self,
+        subscriber,                             # XtSubscriber，需要 last_push_monotonic / resubscribe_tick
+        check_interval: float = 0.2,            # 看门狗检查间隔，单位（秒）
+        log_after: float = 2.0,                 # 超过几倍推送间隔没有行情就记录日志
+        resubscribe_after: float = 4.0,         # 超过几倍推送间隔没有行情就重新订阅
+        alert_after_retries: int = 3,           # 重新订阅几次仍未恢复就告警
+        backoff: float = 2.0,                   # 第一次重试后的等待，之后每次翻倍，单位（秒）
+        max_backoff: float = 30.0,
+        sessions: List[tuple] = None,           # [(开始, 结束, 正常推送间隔)]，缺省为 WATCH_SESSIONS
+    ):
+        self.subscriber = subscriber
+        self.check_interval = check_interval
+        self.log_after = log_after
+        self.resubscribe_after = resubscribe_after
+        self.alert_after_retries = alert_after_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sessions = sessions if sessions is not None else WATCH_SESSIONS
+
+        # 当前断流的状态，恢复后清空
+        self.gap_start: Optional[float] = None      # 断流前最后一次推送的时间
+        self.first_action: Optional[float] = None   # 第一次重新订阅的时间
+        self.retries = 0
+        self.next_retry = 0.0
+        self.alerted = False
+
+        self.events: List[Dict] = []                # 每次断流的记录
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=self.run, name='feed-watchdog', daemon=True).start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    # 当前时段的正常推送间隔，不在盯盘时段返回 None
+    def expected_interval(self) -> Optional[float]:
+        curr_time = clock_now().strftime('%H:%M')
+        for start, end, interval in self.sessions:
+            if start <= curr_time < end:
+                return interval
+        return None
+
+    def in_session(self) -> bool:
+        return self.expected_interval() is not None
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f'[行情看门狗]检查出错 {e}')
+
+    def check(self) -> None:
+        suber = self.subscriber
+        last_push = suber.last_push_monotonic
+        now = clock_monotonic()
+
+        # 断流之后来了新推送，记录断流时长和恢复耗时
+        if self.gap_start is not None and last_push > self.gap_start:
+            self.recover(last_push)
+            return
+
+        expected_interval = self.expected_interval()
+        if not suber.is_subscribed or expected_interval is None:
+            return
+
+        gap = now - last_push
+        if gap < expected_interval * self.log_after:
+            return
+
+        if self.gap_start is None:
+            self.gap_start = last_push
+            logging.warning(f'[行情看门狗]已经 {gap:.1f} 秒没有收到行情推送')
+
+        if gap >= expected_interval * self.resubscribe_after and now >= self.next_retry:
+            if self.first_action is None:
+                self.first_action = now
+            self.retries += 1
+            self.next_retry = now + min(self.max_backoff, self.backoff * 2 ** (self.retries - 1))
+            logging.warning(f'[行情看门狗]断流 {gap:.1f} 秒，第 {self.retries} 次重新订阅')
+            suber.resubscribe_tick()
+
+        if self.retries >= self.alert_after_retries and not self.alerted:
+            self.alerted = True
+            if suber.ding_messager is not None:
+                suber.ding_messager.send_text(
+                    f'[{suber.account_id}]{suber.strategy_name}:行情中断{int(gap)}秒\n'
+                    f'已重新订阅{self.retries}次，请检查QMT数据源 ',
+                    alert=True,
+                )
+
+    def recover(self, last_push: float) -> None:
+        gap_seconds = last_push - self.gap_start
+        recovery_seconds = last_push - self.first_action if self.first_action is not None else 0.0
+
+        latency_recorder.record('feed_gap', gap_seconds)
+        if self.first_action is not None:
+            latency_recorder.record('feed_recovery', recovery_seconds)
+
+        self.events.append({
+            'time': clock_now().strftime('%H:%M:%S'),
+            'gap_seconds': round(gap_seconds, 3),
+            'recovery_seconds': round(recovery_seconds, 3),
+            'retries': self.retries,
+            'alerted': self.alerted,
+        })
+        logging.warning(f'[行情看门狗]行情恢复，断流 {gap_seconds:.1f} 秒，重新订阅 {self.retries} 次')
+
+        if self.alerted and self.subscriber.ding_messager is not None:
+            self.subscriber.ding_messager.send_text(
+                f'[{self.subscriber.account_id}]{self.subscriber.strategy_name}:行情恢复，'
+                f'中断{int(gap_seconds)}秒')
+
+        self.gap_start = None
+        self.first_action = None
+        self.retries = 0
+        self.next_retry = 0.0
+        self.alerted = False
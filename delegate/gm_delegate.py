@@ -13,6 +13,7 @@ from credentials import GM_ACCOUNT_ID, GM_CLIENT_TOKEN
 
 from tools.utils_basic import code_to_gmsymbol, gmsymbol_to_code
 from tools.utils_ding import DingMessager
+from tools.utils_timing import latency_span, latency_timed
 
 
 GM_SERVER_HOST = 'api.myquant.cn:9000'
@@ -76,6 +77,7 @@ class GmDelegate(BaseDelegate):
         orders = get_orders(self.account)
         return [GmOrder(order) for order in orders]
 
+    @latency_timed('check_positions')
     def check_positions(self) -> List[GmPosition]:
         positions = get_positions(self.account)
         return [GmPosition(position) for position in positions]
@@ -119,15 +121,16 @@ class GmDelegate(BaseDelegate):
                 f'{code}市买{volume}股{price:.2f}元',
                 '')
 
-        orders = order_volume(
-            symbol=code_to_gmsymbol(code),
-            price=price,
-            volume=volume,
-            side=OrderSide_Buy,
-            order_type=OrderType_Market,
-            order_qualifier=OrderQualifier_B5TC,
-            position_effect=PositionEffect_Open,
-        )
+        with latency_span('order_submit'):  # 和 XtDelegate 一样只计报单调用，不含钉钉通知
+            orders = order_volume(
+                symbol=code_to_gmsymbol(code),
+                price=price,
+                volume=volume,
+                side=OrderSide_Buy,
+                order_type=OrderType_Market,
+                order_qualifier=OrderQualifier_B5TC,
+                position_effect=PositionEffect_Open,
+            )
         return orders
 
     def order_market_close(
@@ -145,15 +148,16 @@ class GmDelegate(BaseDelegate):
                 f'{code}市卖{volume}股{price:.2f}元',
                 '')
 
-        orders = order_volume(
-            symbol=code_to_gmsymbol(code),
-            price=price,
-            volume=volume,
-            side=OrderSide_Sell,
-            order_type=OrderType_Market,
-            order_qualifier=OrderQualifier_B5TC,
-            position_effect=PositionEffect_Close,
-        )
+        with latency_span('order_submit'):
+            orders = order_volume(
+                symbol=code_to_gmsymbol(code),
+                price=price,
+                volume=volume,
+                side=OrderSide_Sell,
+                order_type=OrderType_Market,
+                order_qualifier=OrderQualifier_B5TC,
+                position_effect=PositionEffect_Close,
+            )
         return orders
 
     def order_limit_open(
@@ -195,14 +199,15 @@ class GmDelegate(BaseDelegate):
                 f'{code}限买{volume}股{price:.2f}元',
                 '')
 
-        orders = order_volume(
-            symbol=code_to_gmsymbol(code),
-            price=price,
-            volume=volume,
-            side=OrderSide_Buy,
-            order_type=OrderType_Limit,
-            position_effect=PositionEffect_Open,
-        )
+        with latency_span('order_submit'):
+            orders = order_volume(
+                symbol=code_to_gmsymbol(code),
+                price=price,
+                volume=volume,
+                side=OrderSide_Buy,
+                order_type=OrderType_Limit,
+                position_effect=PositionEffect_Open,
+            )
         return orders
 
     def order_limit_close(
@@ -220,14 +225,15 @@ class GmDelegate(BaseDelegate):
                 f'{code}限卖{volume}股{price:.2f}元',
                 '')
 
-        orders = order_volume(
-            symbol=code_to_gmsymbol(code),
-            price=price,
-            volume=volume,
-            side=OrderSide_Sell,
-            order_type=OrderType_Limit,
-            position_effect=PositionEffect_Close,
-        )
+        with latency_span('order_submit'):
+            orders = order_volume(
+                symbol=code_to_gmsymbol(code),
+                price=price,
+                volume=volume,
+                side=OrderSide_Sell,
+                order_type=OrderType_Limit,
+                position_effect=PositionEffect_Close,
+            )
         return orders
 
     def order_cancel_all(self):
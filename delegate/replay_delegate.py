@@ -0,0 +1,124 @@
+import logging
+from typing import List, Dict
+
+from delegate.base_delegate import BaseDelegate
+from tools.utils_clock import clock_now
+
+
+class ReplayAsset:
+    def __init__(self, cash: float, market_value: float):
+        self.account_type = 0
+        self.account_id = 'replay'
+        self.cash = round(cash, 2)
+        self.frozen_cash = 0.0
+        self.market_value = round(market_value, 2)
+        self.total_asset = round(cash + market_value, 2)
+
+
+class ReplayOrder:
+    def __init__(self, order_id: int, code: str, price: float, volume: int, side: str, order_type: str, remark: str):
+        self.account_id = 'replay'
+        self.order_id = order_id
+        self.order_time = clock_now().strftime('%Y-%m-%d %H:%M:%S')
+        self.stock_code = code
+        self.price = price
+        self.order_volume = volume
+        self.side = side                # 买入 / 卖出
+        self.order_type = order_type    # 市价 / 限价
+        self.order_remark = remark
+        self.order_status = 56          # 回放时默认全部成交
+
+    def to_dict(self) -> Dict:
+        return {
+            'order_time': self.order_time,
+            'code': self.stock_code,
+            'side': self.side,
+            'type': self.order_type,
+            'price': round(self.price, 3),
+            'volume': self.order_volume,
+            'remark': self.order_remark,
+        }
+
+
+class ReplayPosition:
+    def __init__(self, code: str, volume: int, open_price: float, can_use_volume: int = None):
+        self.account_id = 'replay'
+        self.stock_code = code
+        self.volume = volume
+        self.can_use_volume = volume if can_use_volume is None else can_use_volume
+        self.open_price = open_price
+        self.market_value = volume * open_price
+
+
+# 回放用的桩委托：不连接任何交易接口，只记录策略本来会下的委托，并按委托价立即成交
+class ReplayDelegate(BaseDelegate):
+    def __init__(self, positions: List[ReplayPosition] = None, cash: float = 1000000.0):
+        super().__init__()
+        self.cash = cash
+        self.positions: Dict[str, ReplayPosition] = {}
+        for position in positions or []:
+            self.positions[position.stock_code] = position
+        self.orders: List[ReplayOrder] = []
+
+    def shutdown(self):
+        pass
+
+    def check_asset(self) -> ReplayAsset:
+        market_value = sum(position.market_value for position in self.positions.values())
+        return ReplayAsset(self.cash, market_value)
+
+    def check_orders(self) -> List[ReplayOrder]:
+        return self.orders
+
+    def check_positions(self) -> List[ReplayPosition]:
+        return list(self.positions.values())
+
+    def _order(self, code: str, price: float, volume: int, remark: str, side: str, order_type: str) -> None:
+        order = ReplayOrder(len(self.orders) + 1, code, price, volume, side, order_type, remark)
+        self.orders.append(order)
+        logging.info(f'[回放委托]{order.order_time} {side}{order_type} {code} {price:.3f} {volume}股 {remark}')
+
+        if side == '买入':
+            self.cash -= price * volume
+            if code in self.positions:
+                position = self.positions[code]
+                position.open_price = (position.open_price * position.volume + price * volume) \
+                    / (position.volume + volume)
+                position.volume += volume
+            else:
+                # T+1 当日买入不可卖
+                self.positions[code] = ReplayPosition(code, volume, price, can_use_volume=0)
+        else:
+            if code in self.positions:
+                position = self.positions[code]
+                volume = min(volume, position.can_use_volume)
+                position.volume -= volume
+                position.can_use_volume -= volume
+                self.cash += price * volume
+                if position.volume <= 0:
+                    del self.positions[code]
+
+        if code in self.positions:
+            position = self.positions[code]
+            position.market_value = position.volume * price
+
+    def order_market_open(self, code: str, price: float, volume: int, remark: str, strategy_name: str = 'non-name'):
+        self._order(code, price, volume, remark, '买入', '市价')
+
+    def order_market_close(self, code: str, price: float, volume: int, remark: str, strategy_name: str = 'non-name'):
+        self._order(code, price, volume, remark, '卖出', '市价')
+
+    def order_limit_open(self, code: str, price: float, volume: int, remark: str, strategy_name: str = 'non-name'):
+        self._order(code, price, volume, remark, '买入', '限价')
+
+    def order_limit_close(self, code: str, price: float, volume: int, remark: str, strategy_name: str = 'non-name'):
+        self._order(code, price, volume, remark, '卖出', '限价')
+
+    def order_cancel_all(self):
+        pass
+
+    def order_cancel_buy(self, code: str):
+        pass
+
+    def order_cancel_sell(self, code: str):
+        pass
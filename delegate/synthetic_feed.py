@@ -0,0 +1,165 @@
+import json
+import time
+import threading
+from typing import Dict, List, Callable, Optional
+
+import numpy as np
+
+from tools.utils_basic import is_stock, get_limit_up_price, get_limit_down_price
+from tools.utils_clock import clock_now
+
+
+# 读取本地行情快照作为模拟行情的初始价格
+def load_seed_quotes(
+    path_sh: str = './_data/mktdt00.txt',
+    path_sz: str = './_data/sjshq.txt',
+) -> Dict[str, Dict]:
+    ans = {}
+
+    with open(path_sh, 'r', errors='replace') as r:
+        for line in r.readlines():
+            arr = line.split('|')
+            if len(arr) > 9 and arr[0] == 'MD002' and is_stock(arr[1]):
+                pre_close = float(arr[5])
+                last_price = float(arr[9])
+                ans[arr[1] + '.SH'] = {
+                    'lastClose': pre_close,
+                    'lastPrice': last_price if last_price > 0 else pre_close,
+                }
+
+    with open(path_sz, 'r', encoding='utf-8', errors='replace') as r:
+        for line in r.readlines():
+            arr = json.loads(line)
+            if is_stock(arr['code']) and arr['pre_close'] > 0:
+                ans[arr['code']] = {
+                    'lastClose': arr['pre_close'],
+                    'lastPrice': arr['traded'] if arr['traded'] > 0 else arr['pre_close'],
+                }
+
+    return ans
+
+
+# ================================
+# 本地模拟的全推行情，接口同 xtdata 的订阅函数
+# ================================
+class SyntheticWholeQuote:
+    def __init__(
+        self,
+        push_interval: float = 3.0,     # 推送间隔，单位（秒）
+        max_codes: int = 5000,          # 最多模拟多少支股票
+        active_ratio: float = 1.0,      # 每次推送中有变动的股票比例
+        volatility: float = 0.002,      # 每次推送价格随机游走的标准差
+        seed: Optional[int] = None,
+        path_sh: str = './_data/mktdt00.txt',
+        path_sz: str = './_data/sjshq.txt',
+    ):
+        self.push_interval = push_interval
+        self.active_ratio = active_ratio
+        self.volatility = volatility
+        self.random = np.random.default_rng(seed)
+
+        seeds = load_seed_quotes(path_sh, path_sz)
+        self.codes: List[str] = sorted(seeds.keys())[:max_codes]
+
+        n = len(self.codes)
+        self.last_close = np.array([seeds[code]['lastClose'] for code in self.codes])
+        self.price = np.array([seeds[code]['lastPrice'] for code in self.codes])
+        self.open = self.price.copy()
+        self.high = self.price.copy()
+        self.low = self.price.copy()
+        self.volume = np.zeros(n, dtype=np.int64)
+        self.amount = np.zeros(n)
+        self.limit_up = np.array([get_limit_up_price(c, p) for c, p in zip(self.codes, self.last_close)])
+        self.limit_down = np.array([get_limit_down_price(c, p) for c, p in zip(self.codes, self.last_close)])
+
+        self.subscriptions: Dict[int, threading.Event] = {}
+        self.push_count = 0
+        self.quote_count = 0
+
+    # 选出订阅范围内的股票下标，支持 ['SH', 'SZ'] 市场代码和具体股票代码混用
+    def _select(self, code_list: List[str]) -> np.ndarray:
+        markets = {code for code in code_list if '.' not in code}
+        codes = {code for code in code_list if '.' in code}
+        return np.array([
+            i for i, code in enumerate(self.codes)
+            if code in codes or code[-2:] in markets
+        ], dtype=np.int64)
+
+    # 推进一步随机游走，返回被选中且有变动的股票的行情
+    def step(self, selected: np.ndarray) -> Dict[str, Dict]:
+        if len(selected) == 0:
+            return {}
+
+        active = selected[self.random.random(len(selected)) < self.active_ratio]
+        shocks = self.random.normal(0.0, self.volatility, len(active))
+        prices = np.round(self.price[active] * np.exp(shocks), 2)
+        prices = np.clip(prices, self.limit_down[active], self.limit_up[active])
+        traded = self.random.integers(1, 200, len(active))
+
+        self.price[active] = prices
+        self.high[active] = np.maximum(self.high[active], prices)
+        self.low[active] = np.minimum(self.low[active], prices)
+        self.volume[active] += traded
+        self.amount[active] += prices * traded * 100
+
+        now_ms = int(clock_now().timestamp() * 1000)
+        ticks = [0.01 * k for k in range(1, 6)]
+        quotes = {}
+        for i in active:
+            price = float(self.price[i])
+            quotes[self.codes[i]] = {
+                'time': now_ms,
+                'lastPrice': price,
+                'open': float(self.open[i]),
+                'high': float(self.high[i]),
+                'low': float(self.low[i]),
+                'lastClose': float(self.last_close[i]),
+                'amount': float(self.amount[i]),
+                'volume': int(self.volume[i]),
+                'pvolume': int(self.volume[i]) * 100,
+                'askPrice': [round(price + tick, 2) for tick in ticks],
+                'bidPrice': [round(price - tick, 2) for tick in ticks],
+                'askVol': [int(v) for v in self.random.integers(1, 500, 5)],
+                'bidVol': [int(v) for v in self.random.integers(1, 500, 5)],
+            }
+
+        self.push_count += 1
+        self.quote_count += len(quotes)
+        return quotes
+
+    def _run(self, selected: np.ndarray, callback: Callable, stopped: threading.Event) -> None:
+        next_time = time.perf_counter()
+        while not stopped.is_set():
+            callback(self.step(selected))
+            next_time += self.push_interval
+            stopped.wait(max(0.0, next_time - time.perf_counter()))
+
+    def subscribe_whole_quote(self, code_list: List[str], callback: Callable = None) -> int:
+        seq = len(self.subscriptions) + 1
+        stopped = threading.Event()
+        self.subscriptions[seq] = stopped
+        if callback is not None:
+            selected = self._select(code_list)
+            threading.Thread(target=self._run, args=(selected, callback, stopped), daemon=True).start()
+        return seq
+
+    def unsubscribe_quote(self, seq: int) -> None:
+        if seq in self.subscriptions:
+            self.subscriptions[seq].set()
+
+
+if __name__ == '__main__':
+    # 在 Linux 上压测行情回调：python -m delegate.synthetic_feed
+    feed = SyntheticWholeQuote(push_interval=0.5, seed=0)
+    print(f'模拟 {len(feed.codes)} 支股票')
+
+    received = {'pushes': 0, 'quotes': 0}
+
+    def on_quotes(quotes: Dict) -> None:
+        received['pushes'] += 1
+        received['quotes'] += len(quotes)
+
+    sub_seq = feed.subscribe_whole_quote(['SH', 'SZ'], callback=on_quotes)
+    time.sleep(5)
+    feed.unsubscribe_quote(sub_seq)
+    print(received)
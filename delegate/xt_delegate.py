@@ -10,6 +10,7 @@ from xtquant.xttype import StockAccount, XtPosition, XtOrder, XtAsset
 
 from credentials import *
 from tools.utils_basic import get_code_exchange
+from tools.utils_timing import latency_timed
 from delegate.base_delegate import BaseDelegate
 from delegate.xt_callback import XtDefaultCallback
 
@@ -93,6 +94,7 @@ class XtDelegate(BaseDelegate):
         self.xt_trader.stop()
         self.xt_trader = None
 
+    @latency_timed('order_submit')
     def order_submit(
         self,
         stock_code: str,
@@ -118,6 +120,7 @@ class XtDelegate(BaseDelegate):
         else:
             return False
 
+    @latency_timed('order_submit')
     def order_submit_async(
         self,
         stock_code: str,
@@ -169,6 +172,7 @@ class XtDelegate(BaseDelegate):
         else:
             raise Exception('xt_trader为空')
 
+    @latency_timed('check_positions')
     def check_positions(self) -> List[XtPosition]:
         if self.xt_trader is not None:
             return self.xt_trader.query_stock_positions(self.account)
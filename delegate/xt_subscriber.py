@@ -1,24 +1,33 @@
-import json
 import datetime
+import logging
 import time
 
 import schedule
 import threading
 import math
-import os
 import pandas as pd
 
 from random import random
-from typing import Dict, Callable
-
-from xtquant import xtdata
-
-from delegate.xt_delegate import XtDelegate
-from reader.reader_market import get_ak_market
+from typing import Dict, List, Callable, Optional, Tuple
+
+try:
+    from xtquant import xtdata
+except ImportError:
+    xtdata = None  # 非 Windows 环境没有 QMT 行情，只能回放或使用本地行情源
+
+from delegate.base_delegate import BaseDelegate
+from delegate.feed_watchdog import FeedWatchdog
+from reader.reader_download import HistoryDownloader
+from reader.reader_history import DailyHistoryStore
+from tools.utils_bars import BarStore
 from tools.utils_basic import code_to_symbol
 from tools.utils_cache import check_today_is_open_day, get_total_asset_increase, \
-    load_pickle, save_pickle, load_json, save_json, StockNames
+    load_pickle, save_pickle, load_state, save_state, load_deals, StockNames
+from tools.utils_clock import clock_now, clock_monotonic, TradingClock
 from tools.utils_ding import DingMessager
+from tools.utils_panel import HistoryPanel
+from tools.utils_tick import TickStore, TickJournalWriter, get_tick_journal_path
+from tools.utils_timing import latency_recorder
 
 
 class XtSubscriber:
@@ -26,15 +35,26 @@ class XtSubscriber:
         self,
         account_id: str,
         strategy_name: str,
-        delegate: XtDelegate,
+        delegate: BaseDelegate,
         path_deal: str,
         path_assets: str,
         execute_strategy: Callable,     # 策略回调函数
         execute_interval: int = 1,      # 策略执行间隔，单位（秒）
+        execute_mode: str = 'second',   # second：按整秒；interval_ms：按毫秒间隔；every_push：每次推送；debounce：推送停顿后
+        execute_interval_ms: int = 500, # interval_ms 模式的执行间隔，单位（毫秒）
+        debounce_ms: int = 200,         # debounce 模式最后一次推送之后等待多久执行，单位（毫秒）
+        debounce_max_ms: int = 1000,    # debounce 模式从第一次推送算起最多等待多久，避免持续推送时一直不执行
         ding_messager: DingMessager = None,
         open_tick_memory_cache: bool = False,
         open_today_deal_report: bool = False,
         open_today_hold_report: bool = False,
+        open_strategy_worker: bool = False,     # 策略在独立线程执行，行情回调只做合并
+        path_latency: str = None,               # 各环节耗时统计文件，可以带 {} 按日期滚动
+        quote_source=None,                      # 行情源，缺省为 xtdata，压测时可换成 SyntheticWholeQuote
+        open_bar_periods: List[int] = None,     # 盘中聚合的分钟线周期，例如 [1, 5]，None 表示不聚合
+        use_history_panel: bool = False,        # 日线缓存用 HistoryPanel 存储，替代 Dict[str, DataFrame]
+        open_feed_watchdog: bool = False,       # 后台检查行情断流并自动重新订阅
+        tick_checker: Callable = None,          # 每次推送在回调里直接调用 (quotes, 当日分钟数)，例如 BaseSeller.check_stops
     ):
         self.account_id = '**' + str(account_id)[-4:]
         self.strategy_name = strategy_name
@@ -45,68 +65,342 @@ class XtSubscriber:
 
         self.execute_strategy = execute_strategy
         self.execute_interval = execute_interval
+
+        # 策略执行节奏
+        assert execute_mode in ['second', 'interval_ms', 'every_push', 'debounce'], f'不支持的执行模式 {execute_mode}'
+        self.execute_mode = execute_mode
+        self.execute_interval_ms = execute_interval_ms
+        self.debounce_ms = debounce_ms
+        self.debounce_max_ms = debounce_max_ms
+        self.execute_budget = {                     # 单次执行的耗时预算，超过视为超时，单位（秒）
+            'second': execute_interval,
+            'interval_ms': execute_interval_ms / 1000,
+            'every_push': execute_interval,
+            'debounce': debounce_ms / 1000,
+        }[execute_mode]
+        if execute_mode == 'debounce':
+            open_strategy_worker = True             # 防抖在单独的线程触发，策略必须在策略线程执行
+        self.last_execute_ms = 0.0                  # 上次触发策略的单调时钟，单位（毫秒）
+        self.debounce_condition = threading.Condition()
+        self.debounce_first: Optional[float] = None     # 本轮第一次推送的单调时钟
+        self.debounce_deadline: Optional[float] = None  # 本轮预计触发的单调时钟
+        self.debounce_trigger: Optional[tuple] = None
+        self.cadence_stats: Dict[str, float] = {
+            'pushes': 0,                # 本分钟推送次数
+            'runs': 0,                  # 本分钟策略执行次数
+            'since': time.monotonic(),  # 本分钟开始统计的单调时钟
+            'pushes_per_second': 0.0,   # 上一分钟实际的推送频率
+            'runs_per_second': 0.0,     # 上一分钟实际的执行频率
+        }
+        self.last_run_monotonic: Optional[float] = None
         self.ding_messager = ding_messager
+        self.quote_source = quote_source if quote_source is not None else xtdata
+        self.tick_checker = tick_checker
+
+        if path_latency is not None:
+            latency_recorder.set_path(path_latency)
 
         self.lock_quotes_update = threading.Lock()  # 聚合实时打点缓存的锁
 
         self.cache_quotes: Dict[str, Dict] = {}     # 记录实时的价格信息
-        self.cache_limits: Dict[str, str] = {       # 限制执行次数的缓存集合
-            'prev_seconds': '',                     # 限制每秒一次跑策略扫描的缓存
-            'prev_minutes': '',                     # 限制每分钟屏幕心跳换行的缓存
+        self.cache_limits: Dict[str, int] = {       # 限制执行次数的缓存集合
+            'prev_seconds': -1,                     # 限制每秒一次跑策略扫描的缓存，当日秒数
+            'prev_minutes': -1,                     # 限制每分钟屏幕心跳换行的缓存，当日分钟数
         }
         self.cache_history: Dict[str, pd.DataFrame] = {}     # 记录历史日线行情的信息 { code: DataFrame }
+        self.use_history_panel = use_history_panel
+
+        # 价格变动集合：每个使用方各自累计上次取走之后变过价或成交量的股票 { consumer: { code: 变动前价格 } }
+        self.last_prices: Dict[str, float] = {}
+        self.last_volumes: Dict[str, float] = {}   # 放量类的卖出条件价格不动也要重新检查
+        self.changed_consumers: Dict[str, Dict[str, Optional[float]]] = {}
+
+        # 策略线程模式：回调线程写 pending_quotes，策略线程独占 cache_quotes，执行前交换合并
+        self.open_strategy_worker = open_strategy_worker
+        self.pending_quotes: Dict[str, Dict] = {}   # 上次执行之后新推送的行情
+        self.strategy_condition = threading.Condition()
+        self.strategy_trigger: Optional[tuple] = None  # 待执行的触发参数，只保留最新一次
+        self.strategy_running = False
+        self.strategy_stats: Dict[str, float] = {
+            'runs': 0,          # 执行次数
+            'overruns': 0,      # 执行中又到了下一次触发的次数
+            'coalesced': 0,     # 被更新触发覆盖而跳过的次数
+            'last_cost': 0.0,   # 最近一次执行耗时，单位（秒）
+            'max_cost': 0.0,    # 最长一次执行耗时，单位（秒）
+        }
 
         self.open_tick = open_tick_memory_cache
         self.quick_ticks: bool = False              # 是否开启quick tick模式
-        self.today_ticks: Dict[str, list] = {}      # 记录tick的历史信息
-        # [ 成交时间, 成交价格, 累计成交量 ]
+        self.today_ticks: TickStore = TickStore()   # 记录tick的历史信息，按股票列存
+        # [ 成交时间, 成交价格, 累计成交量, 卖一价, 卖一量, 买一价, 买一量 ]
+        self.tick_journal: Optional[TickJournalWriter] = None  # 盘中持续落盘的tick流水
+        self.today_bars: Optional[BarStore] = BarStore(open_bar_periods) if open_bar_periods else None
 
         self.open_today_deal_report = open_today_deal_report
         self.open_today_hold_report = open_today_hold_report
 
         self.code_list = ['SH', 'SZ']
+        self.watched_codes: Optional[frozenset] = None  # 关注的股票集合，None 表示全市场不过滤
+        self.quote_filter_stats: Dict[str, int] = {
+            'kept': 0,          # 累计保留的行情条数
+            'dropped': 0,       # 累计丢弃的行情条数
+        }
         self.stock_names = StockNames()
         self.last_callback_time = datetime.datetime.now()
+        self.curr_clock: Optional[TradingClock] = None  # 最近一次回调的交易时钟
+        self.last_push_monotonic = clock_monotonic()    # 最近一次推送的单调时钟，给看门狗计算断流时长
+        self.is_subscribed = False
+
+        self.feed_watchdog: Optional[FeedWatchdog] = None
+        if open_feed_watchdog:
+            self.feed_watchdog = FeedWatchdog(self)
+            self.feed_watchdog.start()
+
+        if self.open_strategy_worker:
+            threading.Thread(target=self.strategy_worker, name='strategy-worker', daemon=True).start()
+        if self.execute_mode == 'debounce':
+            threading.Thread(target=self.debounce_worker, name='debounce-worker', daemon=True).start()
 
     # ================
     # 策略触发主函数
     # ================
     def callback_sub_whole(self, quotes: Dict) -> None:
-        now = datetime.datetime.now()
+        now = clock_now()
         self.last_callback_time = now
+        self.last_push_monotonic = clock_monotonic()
 
-        curr_date = now.strftime('%Y-%m-%d')
-        curr_time = now.strftime('%H:%M')
+        # 每次回调只算一次时间，字符串由查表得到
+        clock = TradingClock(now)
+        self.curr_clock = clock
+        curr_date = clock.date
+        curr_time = clock.time
+        curr_seconds = clock.seconds
 
         # 每分钟输出一行开头
-        if self.cache_limits['prev_minutes'] != curr_time:
-            self.cache_limits['prev_minutes'] = curr_time
+        if self.cache_limits['prev_minutes'] != clock.minute:
+            self.cache_limits['prev_minutes'] = clock.minute
             print(f'\n[{curr_time}]', end='')
-
-        curr_seconds = now.strftime('%S')
+            self.report_cadence()
+        self.cadence_stats['pushes'] += 1
+
+        # 全推行情先过滤到关注范围，后面的合并和记录都只处理这部分
+        quotes = self.filter_quotes(quotes)
+
+        # 行情到达延迟：本次推送里最新一笔的时间到回调的间隔
+        if len(quotes) > 0:
+            newest = max(quote['time'] for quote in quotes.values())
+            latency_recorder.record('quote_arrival', max(0.0, now.timestamp() - newest / 1000))
+
+        # 本地条件单不等策略扫描，推送一到就检查
+        if self.tick_checker is not None and len(quotes) > 0:
+            t0 = time.perf_counter()
+            try:
+                self.tick_checker(quotes, clock.minute)
+            except Exception as e:
+                logging.error(f'条件单检查异常 {curr_time}:{curr_seconds} {e}')
+            latency_recorder.record('tick_checker', time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
         with self.lock_quotes_update:
-            self.cache_quotes.update(quotes)  # 合并最新数据
+            if self.open_strategy_worker:
+                self.pending_quotes.update(quotes)  # 只合并到前台缓冲，由策略线程交换
+            else:
+                self.merge_quotes(self.cache_quotes, quotes)  # 合并最新数据
+        latency_recorder.record('quote_merge', time.perf_counter() - t0)
+
+        if self.today_bars is not None:
+            self.today_bars.update_quotes(quotes)  # 增量聚合当日分钟线
 
         if self.open_tick and (not self.quick_ticks):
             self.record_tick_to_memory(quotes)  # 更全（默认：先记录再执行）
 
         # 执行策略
-        if self.cache_limits['prev_seconds'] != curr_seconds:
-            self.cache_limits['prev_seconds'] = curr_seconds
-
-            if int(curr_seconds) % self.execute_interval == 0:
-                print('.' if len(self.cache_quotes) > 0 else 'x', end='')  # 每秒钟开始的时候输出一个点
-
-                if self.execute_strategy(
-                    curr_date,
-                    curr_time,
-                    curr_seconds,
-                    self.cache_quotes,
-                ):
-                    with self.lock_quotes_update:
-                        if self.open_tick and self.quick_ticks:
-                            self.record_tick_to_memory(self.cache_quotes)  # 更快（先执行再记录）
-                        self.cache_quotes.clear()  # execute_strategy() return True means need clear
+        if self.cache_limits['prev_seconds'] != clock.day_seconds:
+            self.cache_limits['prev_seconds'] = clock.day_seconds
+
+            if self.execute_mode != 'second' or clock.second % self.execute_interval == 0:
+                with self.lock_quotes_update:
+                    has_quotes = len(self.cache_quotes) > 0 or len(self.pending_quotes) > 0
+                print('.' if has_quotes else 'x', end='')  # 每秒钟开始的时候输出一个点
+
+            if self.execute_mode == 'second' and clock.second % self.execute_interval == 0:
+                self.trigger_strategy(curr_date, curr_time, curr_seconds)
+
+        if self.execute_mode == 'every_push':
+            self.trigger_strategy(curr_date, curr_time, curr_seconds)
+        elif self.execute_mode == 'interval_ms':
+            now_ms = clock_monotonic() * 1000
+            if now_ms - self.last_execute_ms >= self.execute_interval_ms:
+                self.last_execute_ms = now_ms
+                self.trigger_strategy(curr_date, curr_time, curr_seconds)
+        elif self.execute_mode == 'debounce':
+            self.arm_debounce(curr_date, curr_time, curr_seconds)
+
+    def trigger_strategy(self, curr_date: str, curr_time: str, curr_seconds: str) -> None:
+        if self.open_strategy_worker:
+            self.notify_strategy_worker(curr_date, curr_time, curr_seconds)
+        else:
+            self.run_strategy(curr_date, curr_time, curr_seconds)
+
+    # 每次推送都把触发时间往后推，但从本轮第一次推送算起不超过 debounce_max_ms
+    def arm_debounce(self, curr_date: str, curr_time: str, curr_seconds: str) -> None:
+        now = time.monotonic()
+        with self.debounce_condition:
+            if self.debounce_first is None:
+                self.debounce_first = now
+            self.debounce_deadline = min(
+                now + self.debounce_ms / 1000,
+                self.debounce_first + self.debounce_max_ms / 1000,
+            )
+            self.debounce_trigger = (curr_date, curr_time, curr_seconds)
+            self.debounce_condition.notify()
+
+    def debounce_worker(self) -> None:
+        while True:
+            with self.debounce_condition:
+                while self.debounce_deadline is None:
+                    self.debounce_condition.wait()
+                remaining = self.debounce_deadline - time.monotonic()
+                if remaining > 0:
+                    self.debounce_condition.wait(remaining)
+                    continue
+                trigger = self.debounce_trigger
+                self.debounce_first = None
+                self.debounce_deadline = None
+                self.debounce_trigger = None
+            self.notify_strategy_worker(*trigger)
+
+    # 每分钟统计一次实际达到的推送和执行频率
+    def report_cadence(self) -> None:
+        stats = self.cadence_stats
+        now = time.monotonic()
+        elapsed = now - stats['since']
+        if elapsed > 0 and stats['pushes'] > 0:
+            stats['pushes_per_second'] = round(stats['pushes'] / elapsed, 2)
+            stats['runs_per_second'] = round(stats['runs'] / elapsed, 2)
+            if self.execute_mode != 'second':
+                logging.info(f'[策略频率]{self.execute_mode} 推送{stats["pushes_per_second"]}次/秒 '
+                             f'执行{stats["runs_per_second"]}次/秒')
+        stats['pushes'] = 0
+        stats['runs'] = 0
+        stats['since'] = now
+
+    def filter_quotes(self, quotes: Dict[str, Dict]) -> Dict[str, Dict]:
+        watched = self.watched_codes
+        if watched is None:
+            self.quote_filter_stats['kept'] += len(quotes)
+            return quotes
+
+        kept = {code: quote for code, quote in quotes.items() if code in watched}
+        self.quote_filter_stats['kept'] += len(kept)
+        self.quote_filter_stats['dropped'] += len(quotes) - len(kept)
+        return kept
+
+    def merge_quotes(self, target: Dict[str, Dict], quotes: Dict[str, Dict]) -> None:
+        target.update(quotes)
+        if len(self.changed_consumers) == 0:
+            return
+
+        last_prices = self.last_prices
+        last_volumes = self.last_volumes
+        consumers = self.changed_consumers.values()
+        for code, quote in quotes.items():
+            curr_price = quote['lastPrice']
+            curr_volume = quote.get('volume')
+            prev_price = last_prices.get(code)
+            if prev_price != curr_price or last_volumes.get(code) != curr_volume:
+                last_prices[code] = curr_price
+                last_volumes[code] = curr_volume
+                for changed in consumers:
+                    if code not in changed:
+                        changed[code] = prev_price  # 只保留本轮第一次变动前的价格
+
+    # 取走 consumer 上次调用之后变过价或成交量的股票 { code: (变动前价格, 当前价格) }
+    # 第一次调用时还没有基准，返回 None 表示需要全量扫描
+    def take_changed_codes(self, consumer: str) -> Optional[Dict[str, Tuple[Optional[float], float]]]:
+        with self.lock_quotes_update:
+            if consumer not in self.changed_consumers:
+                self.changed_consumers[consumer] = {}
+                return None
+
+            changed = self.changed_consumers[consumer]
+            self.changed_consumers[consumer] = {}
+
+        last_prices = self.last_prices
+        return {code: (prev_price, last_prices[code]) for code, prev_price in changed.items()}
+
+    def run_strategy(self, curr_date: str, curr_time: str, curr_seconds: str) -> float:
+        now = time.monotonic()
+        if self.last_run_monotonic is not None:
+            latency_recorder.record('strategy_gap', now - self.last_run_monotonic)  # 实际的执行间隔
+        self.last_run_monotonic = now
+        self.cadence_stats['runs'] += 1
+
+        t0 = time.perf_counter()
+        need_clear = self.execute_strategy(
+            curr_date,
+            curr_time,
+            curr_seconds,
+            self.cache_quotes,
+        )
+        cost = time.perf_counter() - t0
+        latency_recorder.record('execute_strategy', cost)
+
+        if need_clear:
+            with self.lock_quotes_update:
+                if self.open_tick and self.quick_ticks:
+                    self.record_tick_to_memory(self.cache_quotes)  # 更快（先执行再记录）
+                self.cache_quotes.clear()  # execute_strategy() return True means need clear
+
+        if cost > self.execute_budget:
+            logging.warning(f'策略执行超时 {curr_time}:{curr_seconds} 耗时{cost:.3f}秒 '
+                            f'超过执行间隔{self.execute_budget}秒')
+        return cost
+
+    # ================
+    # 策略执行线程
+    # ================
+    def notify_strategy_worker(self, curr_date: str, curr_time: str, curr_seconds: str) -> None:
+        with self.strategy_condition:
+            if self.strategy_running:
+                self.strategy_stats['overruns'] += 1
+            if self.strategy_trigger is not None:
+                self.strategy_stats['coalesced'] += 1  # 上一次触发还没来得及执行，直接用最新的覆盖
+            self.strategy_trigger = (curr_date, curr_time, curr_seconds)
+            self.strategy_condition.notify()
+
+    def strategy_worker(self) -> None:
+        while True:
+            with self.strategy_condition:
+                while self.strategy_trigger is None:
+                    self.strategy_condition.wait()
+                curr_date, curr_time, curr_seconds = self.strategy_trigger
+                self.strategy_trigger = None
+                self.strategy_running = True
+
+            # 交换前台缓冲，策略执行期间看到的是一份不再变化的快照
+            # 合并也在锁里，和 run_strategy 里的清空互斥
+            with self.lock_quotes_update:
+                pending_quotes = self.pending_quotes
+                self.pending_quotes = {}
+                self.merge_quotes(self.cache_quotes, pending_quotes)
+
+            t0 = time.perf_counter()
+            try:
+                self.run_strategy(curr_date, curr_time, curr_seconds)
+            except Exception as e:
+                logging.error(f'策略执行异常 {curr_time}:{curr_seconds} {e}')
+            finally:
+                cost = time.perf_counter() - t0     # 抛异常的执行也按实际耗时统计
+                with self.strategy_condition:
+                    self.strategy_running = False
+                    self.strategy_stats['runs'] += 1
+                    self.strategy_stats['last_cost'] = cost
+                    self.strategy_stats['max_cost'] = max(self.strategy_stats['max_cost'], cost)
+
+                if cost > self.execute_budget:
+                    logging.warning(f'策略线程累计超时触发{self.strategy_stats["overruns"]}次 '
+                                    f'合并跳过{self.strategy_stats["coalesced"]}次')
 
     # ================
     # 监测主策略执行
@@ -133,8 +427,12 @@ class XtSubscriber:
 
         if self.ding_messager is not None:
             self.ding_messager.send_text(f'[{self.account_id}]{self.strategy_name}:{"启动" if notice else "恢复"}')
-        self.cache_limits['sub_seq'] = xtdata.subscribe_whole_quote(self.code_list, callback=self.callback_sub_whole)
-        xtdata.enable_hello = False
+        self.last_push_monotonic = clock_monotonic()
+        self.cache_limits['sub_seq'] = self.quote_source.subscribe_whole_quote(
+            self.code_list, callback=self.callback_sub_whole)
+        self.is_subscribed = True
+        if self.quote_source is xtdata:
+            xtdata.enable_hello = False
         print('[启动行情订阅]', end='')
 
     def unsubscribe_tick(self, notice=True):
@@ -144,68 +442,79 @@ class XtSubscriber:
         if 'sub_seq' in self.cache_limits:
             if self.ding_messager is not None:
                 self.ding_messager.send_text(f'[{self.account_id}]{self.strategy_name}:{"关闭" if notice else "暂停"}')
-            xtdata.unsubscribe_quote(self.cache_limits['sub_seq'])
+            self.quote_source.unsubscribe_quote(self.cache_limits['sub_seq'])
+            self.is_subscribed = False
             print('\n[关闭行情订阅]')
 
+        latency_recorder.flush()
+
+    # 看门狗发现断流时调用，不发送启停通知
+    def resubscribe_tick(self):
+        if 'sub_seq' in self.cache_limits:
+            self.quote_source.unsubscribe_quote(self.cache_limits['sub_seq'])
+        self.cache_limits['sub_seq'] = self.quote_source.subscribe_whole_quote(
+            self.code_list, callback=self.callback_sub_whole)
+        print('[重新订阅行情]', end='')
+
     def update_code_list(self, code_list: list[str]):
         # 防止没数据不打点
         code_list += ['000001.SH']
         self.code_list = code_list
 
+        # 列表里有 'SH' 'SZ' 这类市场代码时仍然按全市场处理
+        if all('.' in code for code in code_list):
+            self.watched_codes = frozenset(code_list)
+        else:
+            self.watched_codes = None
+
     # ================
     # 盘中实时的tick历史
     # ================
     def record_tick_to_memory(self, quotes):
         # 记录 tick 历史
-        for code in quotes:
-            if code not in self.today_ticks:
-                self.today_ticks[code] = []
-
-            quote = quotes[code]
-            tick_time = datetime.datetime.fromtimestamp(quote['time'] / 1000).strftime('%H:%M:%S')
-            self.today_ticks[code].append([
-                tick_time,                          # 成交时间，格式：%H:%M:%S
-                round(quote['lastPrice'], 2),       # 成交价格
-                round(quote['volume'], 0),          # 累计成交量（手）
-                round(quote['askPrice'][0], 2),     # 卖一价格
-                round(quote['askVol'][0], 2),       # 卖一数量
-                round(quote['bidPrice'][0], 2),     # 买一价格
-                round(quote['bidVol'][0], 2),       # 买一数量
-            ])
+        self.today_ticks.append_quotes(quotes)
+
+        # 写入 tick 流水，由后台线程落盘
+        if self.tick_journal is None:
+            self.open_tick_journal()
+        self.tick_journal.put(quotes)
+
+    def open_tick_journal(self):
+        curr_date = datetime.datetime.now().strftime('%Y-%m-%d')
+        self.tick_journal = TickJournalWriter(get_tick_journal_path(curr_date))
+        self.tick_journal.start()
+
+    def close_tick_journal(self):
+        if self.tick_journal is not None:
+            self.tick_journal.close()
+            print(f'当日{self.tick_journal.record_count}条tick已写入 {self.tick_journal.path}')
+            self.tick_journal = None
 
     def clean_ticks_history(self):
         if not check_today_is_open_day(datetime.datetime.now().strftime('%Y-%m-%d')):
             return
+        self.close_tick_journal()
         self.today_ticks.clear()
-        print(f"已清除tick缓存")
+        print("已清除tick缓存")
+
+    def clean_bars_history(self):
+        if not check_today_is_open_day(datetime.datetime.now().strftime('%Y-%m-%d')):
+            return
+        self.today_bars.clear()
+        print("已清除分钟线缓存")
 
     def save_tick_history(self):
         if not check_today_is_open_day(datetime.datetime.now().strftime('%Y-%m-%d')):
             return
-        json_file = './_cache/debug/tick_history.json'
-        with open(json_file, 'w') as file:
-            json.dump(self.today_ticks, file, indent=4)
-        print(f"当日tick数据已存储为 {json_file} 文件")
+        # 盘中已经持续落盘，收盘后只需要把剩余的写完并关闭文件
+        self.close_tick_journal()
 
     # ================
     # 盘前下载数据缓存
     # ================
     def download_from_akshare(self, target_codes: list, start: str, end: str, adjust: str, columns: list[str]):
-        print(f'Prepared time range: {start} - {end}')
-        t0 = datetime.datetime.now()
-
-        group_size = 200
-        for i in range(0, len(target_codes), group_size):
-            sub_codes = [sub_code for sub_code in target_codes[i:i + group_size]]
-            time.sleep(1)
-            print(i, sub_codes)  # 已更新数量
-            for code in sub_codes:
-                df = get_ak_market(code, start, end, columns=columns, adjust=adjust)
-                if df is not None:
-                    self.cache_history[code] = df
-
-        t1 = datetime.datetime.now()
-        print(f'Prepared TIME COST: {t1 - t0}')
+        downloader = HistoryDownloader(backend='akshare')
+        self.cache_history.update(downloader.download(target_codes, start, end, adjust, columns))
 
     def download_cache_history(
         self,
@@ -215,7 +524,20 @@ class XtSubscriber:
         end: str,
         adjust: str,
         columns: list[str],
+        downloader: Optional[HistoryDownloader] = None,    # 缺省用 akshare 并发下载
+        history_store: Optional[DailyHistoryStore] = None,  # 按股票增量存储的日线库，提供时不再按日期整体缓存
     ):
+        if isinstance(self.cache_history, HistoryPanel):
+            self.cache_history = {}  # 面板只读，重新加载前换回字典
+
+        if history_store is not None:
+            self.cache_history.clear()
+            self.cache_history.update(history_store.load_window(code_list, start, end, adjust, columns))
+            print(f'{len(self.cache_history)} of {len(code_list)} histories loaded from {history_store.root}')
+
+            self.build_history_panel()
+            return
+
         temp_indicators = load_pickle(cache_path)
         if temp_indicators is not None and len(temp_indicators) > 0:
             # 如果有缓存就读缓存
@@ -225,10 +547,21 @@ class XtSubscriber:
         else:
             # 如果没缓存就刷新白名单
             self.cache_history.clear()
-            self.download_from_akshare(code_list, start, end, adjust, columns)
+            if downloader is None:
+                downloader = HistoryDownloader(backend='akshare')
+            partial_path = cache_path + '.part'  # 中途失败重启时从这里续传
+            self.cache_history.update(downloader.download(code_list, start, end, adjust, columns, partial_path))
             save_pickle(cache_path, self.cache_history)
+            HistoryDownloader.clean_partial(partial_path)
             print(f'{len(self.cache_history)} of {len(code_list)} histories saved to {cache_path}')
 
+        self.build_history_panel()
+
+    # 把下载好的日线整理成面板，卖出时按股票取零拷贝视图
+    def build_history_panel(self):
+        if self.use_history_panel and len(self.cache_history) > 0:
+            self.cache_history = HistoryPanel.from_frames(self.cache_history)
+
     # ================
     # 盘后报告总结
     # ================
@@ -253,7 +586,7 @@ class XtSubscriber:
         txt += '\n>\n> '
         txt += f'剩余现金: {round(asset.cash, 2)}元'
 
-        txt += f'\n>\n>'
+        txt += '\n>\n>'
         txt += f'资产总计: {round(asset.total_asset, 2)}元'
 
         self.ding_messager.send_markdown(title, txt)
@@ -263,13 +596,8 @@ class XtSubscriber:
         if not check_today_is_open_day(today):
             return
 
-        if not os.path.exists(self.path_deal):
-            return
-
         if self.open_today_deal_report:
-            df = pd.read_csv(self.path_deal, encoding='gbk')
-            if '日期' in df.columns:
-                df = df[df['日期'] == today]
+            df = load_deals(self.path_deal, today, today)
 
             if len(df) > 0:
                 title = f'{self.strategy_name} {today} 记录 {len(df)} 条'
@@ -313,11 +641,15 @@ class XtSubscriber:
     def start_scheduler(self):
         random_time = f'08:{str(math.floor(random() * 60)).zfill(2)}'
         schedule.every().day.at(random_time).do(random_check_open_day)
+        schedule.every().day.at('08:05').do(self.stock_names.refresh_in_background)  # 每天刷新一次股票名称缓存
 
         if self.open_tick:
             schedule.every().day.at('09:10').do(self.clean_ticks_history)
             schedule.every().day.at('15:10').do(self.save_tick_history)
 
+        if self.today_bars is not None:
+            schedule.every().day.at('09:10').do(self.clean_bars_history)
+
         schedule.every().day.at('09:30').do(self.subscribe_tick)
         schedule.every().day.at('11:30').do(self.unsubscribe_tick, False)
 
@@ -352,11 +684,11 @@ def random_check_open_day():
 # ================
 # 持仓自动发现
 # ================
-def update_position_held(lock: threading.Lock, delegate: XtDelegate, path: str):
+def update_position_held(lock: threading.Lock, delegate: BaseDelegate, path: str):
     with lock:
         positions = delegate.check_positions()
 
-        held_days = load_json(path)
+        held_days = load_state(path)
 
         # 添加未被缓存记录的持仓
         for position in positions:
@@ -374,7 +706,7 @@ def update_position_held(lock: threading.Lock, delegate: XtDelegate, path: str):
                     if code not in position_codes:
                         del held_days[code]
 
-        save_json(path, held_days)
+        save_state(path, held_days)
 
 
 # ================================
@@ -0,0 +1,160 @@
+import os
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from reader.reader_market import get_ak_market, get_ts_markets
+from tools.utils_basic import is_stock
+from tools.utils_cache import load_pickle, save_pickle
+
+
+# ================
+# 令牌桶限速
+# ================
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate                    # 每秒补充的令牌数
+        self.capacity = capacity            # 桶容量，允许的瞬时突发请求数
+        self.tokens = float(capacity)
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    # 阻塞直到取到一个令牌
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+                self.last_time = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# ================
+# 盘前历史行情并发下载
+# ================
+class HistoryDownloader:
+    def __init__(
+        self,
+        backend: str = 'akshare',   # akshare 按单个股票下载；tushare 按批次下载，不支持复权
+        max_workers: int = 8,       # 并发线程数
+        rate: float = 5.0,          # 每秒最多发起的请求数
+        burst: int = 5,             # 瞬时突发请求数
+        retries: int = 2,           # 失败后的重试次数
+        backoff: float = 1.0,       # 第一次重试前的等待，之后每次翻倍，单位（秒）
+        batch_size: int = 50,       # tushare 每次请求的股票数量，注意单次返回不超过 6000 行
+        save_every: int = 100,      # 每完成多少支保存一次中间结果
+    ):
+        assert backend in ['akshare', 'tushare'], f'不支持的下载源 {backend}'
+        self.backend = backend
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.save_every = save_every
+
+        self.lock = threading.Lock()
+        self.results: Dict[str, pd.DataFrame] = {}
+        self.failed: List[str] = []
+
+    def _fetch_ak(self, code: str, start: str, end: str, adjust: str, columns: List[str]) -> Dict[str, pd.DataFrame]:
+        df = get_ak_market(code, start, end, columns=columns, adjust=adjust)
+        return {code: df} if df is not None else {}
+
+    def _fetch_ts(self, codes: List[str], start: str, end: str, columns: List[str]) -> Dict[str, pd.DataFrame]:
+        df = get_ts_markets(codes, start, end, columns=columns)
+        if df is None:
+            return {}
+        return {
+            code: group.drop(columns=['ts_code']).reset_index(drop=True)
+            for code, group in df.groupby('ts_code')
+        }
+
+    # 一个任务是一支股票（akshare）或一批股票（tushare），失败或没取到数据时按指数退避重试
+    def _run_task(self, codes: List[str], start: str, end: str, adjust: str, columns: List[str]) -> List[str]:
+        wait = self.backoff
+        ans = {}
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                if self.backend == 'tushare':
+                    ans = self._fetch_ts(codes, start, end, columns)
+                else:
+                    ans = self._fetch_ak(codes[0], start, end, adjust, columns)
+            except Exception as e:
+                print(f'[下载失败]{codes[0]} 等{len(codes)}支 第{attempt + 1}次: {e}')
+                ans = {}
+
+            if len(ans) > 0 or attempt >= self.retries:
+                break
+            time.sleep(wait)
+            wait *= 2
+
+        with self.lock:
+            self.results.update(ans)
+            missing = [code for code in codes if code not in ans]
+            self.failed.extend(missing)
+        return missing
+
+    def download(
+        self,
+        codes: List[str],
+        start: str,
+        end: str,
+        adjust: str = '',
+        columns: List[str] = None,
+        partial_path: Optional[str] = None,     # 中间结果的 pickle，中断后再次下载会从这里续传
+    ) -> Dict[str, pd.DataFrame]:
+        print(f'Prepared time range: {start} - {end}')
+        t0 = datetime.datetime.now()
+
+        self.results = {}
+        self.failed = []
+        if partial_path is not None:
+            partial = load_pickle(partial_path)
+            if partial is not None:
+                self.results.update(partial)
+                print(f'{len(partial)} histories resumed from {partial_path}')
+
+        # akshare 只能下载股票，其他代码直接跳过
+        todo = [code for code in codes if code not in self.results]
+        if self.backend == 'akshare':
+            todo = [code for code in todo if is_stock(code)]
+            tasks = [[code] for code in todo]
+        else:
+            tasks = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+
+        total = len(todo)
+        done = 0
+        last_saved = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._run_task, task, start, end, adjust, columns): task for task in tasks}
+            for future in as_completed(futures):
+                done += len(futures[future])
+                print(f'\r[下载进度] {done}/{total} 失败:{len(self.failed)} '
+                      f'耗时:{(datetime.datetime.now() - t0).seconds}s', end='')
+
+                if partial_path is not None and done - last_saved >= self.save_every:
+                    last_saved = done
+                    with self.lock:
+                        save_pickle(partial_path, dict(self.results))
+
+        t1 = datetime.datetime.now()
+        print(f'\nPrepared TIME COST: {t1 - t0}')
+        if len(self.failed) > 0:
+            print(f'{len(self.failed)} codes failed: {self.failed[:20]}')
+        return self.results
+
+    # 完整结果落盘之后删除中间结果
+    @staticmethod
+    def clean_partial(partial_path: str) -> None:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
@@ -0,0 +1,115 @@
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from reader.reader_download import HistoryDownloader
+from tools.utils_cache import load_pickle, save_pickle, load_json, save_json
+from tools.utils_calendar import get_trading_calendar
+
+
+# ================================
+# 按股票分文件的日线库，每天只补新增的交易日
+# ================================
+class DailyHistoryStore:
+    def __init__(
+        self,
+        root: str,                                      # 存储目录，每种复权方式一个子目录
+        downloader: Optional[HistoryDownloader] = None, # 缺省用 akshare 并发下载
+    ):
+        self.root = root
+        self.downloader = downloader if downloader is not None else HistoryDownloader(backend='akshare')
+
+    def _get_dir(self, adjust: str) -> str:
+        path = os.path.join(self.root, adjust if adjust != '' else 'none')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    # 每支股票的已存范围 { code: [首日, 末日] }，日期格式 %Y%m%d，避免为了判断是否最新去读全部文件
+    def _load_index(self, adjust: str) -> Dict[str, List[str]]:
+        return load_json(os.path.join(self._get_dir(adjust), '_index.json'))
+
+    def _save_index(self, adjust: str, index: Dict[str, List[str]]) -> None:
+        save_json(os.path.join(self._get_dir(adjust), '_index.json'), index)
+
+    def _get_path(self, adjust: str, code: str) -> str:
+        return os.path.join(self._get_dir(adjust), f'{code}.pkl')
+
+    def load(self, code: str, adjust: str = '') -> Optional[pd.DataFrame]:
+        return load_pickle(self._get_path(adjust, code))
+
+    # 用交易日历统计 (last, end] 之间缺了几个交易日
+    @staticmethod
+    def count_missing_days(last: str, end: str) -> int:
+        return get_trading_calendar().count_after(last, end)
+
+    # 把新数据接到已存数据后面，重叠那一天的收盘价对不上说明复权因子变了，需要整段重下
+    @staticmethod
+    def _merge(stored: pd.DataFrame, fetched: pd.DataFrame) -> Optional[pd.DataFrame]:
+        last = stored['datetime'].values[-1]
+        overlap = fetched[fetched['datetime'] == last]
+        if len(overlap) > 0 and abs(overlap['close'].values[0] - stored['close'].values[-1]) > 1e-6:
+            return None
+        appended = fetched[fetched['datetime'] > last]
+        return pd.concat([stored, appended], ignore_index=True)
+
+    def update(self, codes: List[str], start: str, end: str, adjust: str = '', columns: List[str] = None) -> None:
+        """
+        start / end example: '20241231'
+        """
+        index = self._load_index(adjust)
+
+        # 按需要下载的起始日分组，通常已存的股票末日相同，只需要一次下载
+        full_codes = []
+        append_groups: Dict[str, List[str]] = {}
+        for code in codes:
+            if code not in index or index[code][0] > start:
+                full_codes.append(code)
+            elif index[code][1] < end and self.count_missing_days(index[code][1], end) > 0:
+                append_groups.setdefault(index[code][1], []).append(code)
+
+        for last, group in append_groups.items():
+            print(f'{len(group)} histories append from {last}')
+            fetched = self.downloader.download(group, last, end, adjust, columns)
+            for code in group:
+                if code not in fetched:
+                    continue
+                merged = self._merge(self.load(code, adjust), fetched[code])
+                if merged is None:
+                    full_codes.append(code)     # 除权除息后前复权价格整体变化
+                    continue
+                save_pickle(self._get_path(adjust, code), merged)
+                index[code] = [merged['datetime'].values[0], merged['datetime'].values[-1]]
+
+        if len(full_codes) > 0:
+            print(f'{len(full_codes)} histories download from {start}')
+            fetched = self.downloader.download(full_codes, start, end, adjust, columns)
+            for code, df in fetched.items():
+                df = df.reset_index(drop=True)
+                save_pickle(self._get_path(adjust, code), df)
+                index[code] = [df['datetime'].values[0], df['datetime'].values[-1]]
+
+        self._save_index(adjust, index)
+
+    # 取出 [start, end] 区间的日线，已经最新时不访问网络
+    def load_window(
+        self,
+        codes: List[str],
+        start: str,
+        end: str,
+        adjust: str = '',
+        columns: List[str] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        self.update(codes, start, end, adjust, columns)
+
+        ans = {}
+        for code in codes:
+            df = self.load(code, adjust)
+            if df is None:
+                continue
+            df = df[(df['datetime'] >= start) & (df['datetime'] <= end)].reset_index(drop=True)
+            if columns is not None:
+                df = df[columns]
+            if len(df) > 0:
+                ans[code] = df
+        return ans
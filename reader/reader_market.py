@@ -53,6 +53,7 @@ def get_ts_markets(
             'trade_date': 'datetime',
         })
         df['amount'] *= 1000
+        try_times += 1
     if len(df) > 0:
         if columns is not None:
             return df[::-1][['ts_code'] + columns]
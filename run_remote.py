@@ -7,11 +7,16 @@ from credentials import *
 
 from tools.utils_basic import logging_init, is_symbol
 from tools.utils_cache import *
+from tools.utils_clock import compile_time_ranges, in_minute_ranges, get_time_minute
 from tools.utils_ding import DingMessager
+from tools.utils_sqlite import SqliteTradeDB
+from tools.utils_state import JournalStateStore
 
 from delegate.xt_delegate import xt_get_ticks
 from delegate.xt_subscriber import XtSubscriber, update_position_held
 
+from reader.reader_history import DailyHistoryStore
+
 from trader.buyer import BaseBuyer as Buyer
 from trader.pools import StocksPoolBlackEmpty as Pool
 from trader.seller_groups import LTT2GroupSeller as Seller
@@ -25,6 +30,9 @@ SELECTION_ID = 'LTDB'
 DING_MESSAGER = DingMessager(DING_SECRET, DING_TOKENS)
 IS_PROD = True
 IS_DEBUG = True
+USE_SQLITE = False      # 交易状态存到 SQLite，多个策略进程共用同一个 PATH_BASE 时打开
+USE_JOURNAL = False     # 交易状态常驻内存写追加日志，只有本进程使用这个 PATH_BASE 时才能打开
+USE_HISTORY_STORE = False   # 日线按股票增量存到 PATH_HIST，关闭时沿用按日的 pickle 缓存
 
 PATH_BASE = CACHE_BASE_PATH
 
@@ -32,8 +40,11 @@ PATH_ASSETS = PATH_BASE + '/assets.csv'         # 记录历史净值
 PATH_DEAL = PATH_BASE + '/deal_hist.csv'        # 记录历史成交
 PATH_HELD = PATH_BASE + '/held_days.json'       # 记录持仓日期
 PATH_MAXP = PATH_BASE + '/max_price.json'       # 记录历史最高
+PATH_STAT = PATH_BASE + '/trade_state.db'       # USE_SQLITE 时的交易状态库
 PATH_LOGS = PATH_BASE + '/logs.txt'             # 用来存储选股和委托操作
+PATH_LTCY = PATH_BASE + '/latency_{}.jsonl'     # 用来按日记录各环节耗时
 PATH_INFO = PATH_BASE + '/temp_{}.pkl'          # 用来缓存当天的指标信息
+PATH_HIST = PATH_BASE + '/history'              # 按股票增量存储的日线
 
 lock_of_disk_cache = threading.Lock()           # 操作磁盘文件缓存的锁
 
@@ -53,6 +64,7 @@ class PoolConf:
 
 class BuyConf:
     time_ranges = [['09:31', '11:00']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 10
     order_premium = 0.09    # 保证成功买入成交的溢价
 
@@ -66,8 +78,11 @@ class BuyConf:
 
 class SellConf:
     time_ranges = [['09:30', '11:30'], ['13:00', '15:00']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 5
     order_premium = 0.09            # 保证成功卖出成交的溢价
+    batch_sell = False              # 所有持仓按数组一次判断卖点，和逐个判断对照验证之前保持关闭
+    open_stop_orders = False        # 硬止损止盈挂本地条件单，推送到达时直接检查，验证之前保持关闭
 
     switch_time_range = ['14:30', '14:57']
     switch_hold_days = 5            # 持仓天数
@@ -107,7 +122,7 @@ def held_increase() -> None:
     update_position_held(lock_of_disk_cache, my_delegate, PATH_HELD)
     if all_held_inc(lock_of_disk_cache, PATH_HELD):
         logging.warning('===== 所有持仓计数 +1 =====')
-        print(f'All held stock day +1!')
+        print('All held stock day +1!')
 
 
 def refresh_code_list():
@@ -130,6 +145,9 @@ def prepare_history() -> None:
 
     start = get_prev_trading_date(now, PoolConf.day_count)
     end = get_prev_trading_date(now, 1)
+    if start is None or end is None:
+        print('交易日历不可用，跳过历史数据准备')
+        return
 
     # 只有持仓列表
     positions = my_delegate.check_positions()
@@ -142,7 +160,9 @@ def prepare_history() -> None:
         end=end,
         adjust=PoolConf.price_adjust,
         columns=PoolConf.columns,
+        history_store=DailyHistoryStore(PATH_HIST) if USE_HISTORY_STORE else None,
     )
+    my_seller.prepare_indicators(my_suber.cache_history)  # 盘前算好指标的前缀状态，盘中只更新当天
 
 
 # ======== 买点 ========
@@ -153,7 +173,7 @@ def check_stock_codes(selected_codes: list[str], quotes: Dict) -> List[Dict[str,
 
     for code in selected_codes:
         if code not in quotes:
-            debug(code, f'本次quotes没数据')
+            debug(code, '本次quotes没数据')
             continue
 
         # if code not in my_pool.cache_whitelist:
@@ -248,7 +268,8 @@ def scan_buy(quotes: Dict, curr_date: str, positions: List) -> None:
 
 def scan_sell(quotes: Dict, curr_date: str, curr_time: str, positions: List) -> None:
     max_prices, held_days = update_max_prices(lock_of_disk_cache, quotes, positions, PATH_MAXP, PATH_HELD)
-    my_seller.execute_sell(quotes, curr_date, curr_time, positions, held_days, max_prices, my_suber.cache_history)
+    my_seller.execute_sell(quotes, curr_date, curr_time, positions, held_days, max_prices, my_suber.cache_history,
+                           my_suber.take_changed_codes('sell'), my_suber.today_bars)
 
 
 # ======== 框架 ========
@@ -256,17 +277,17 @@ def scan_sell(quotes: Dict, curr_date: str, curr_time: str, positions: List) ->
 
 def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quotes: Dict) -> bool:
     positions = my_delegate.check_positions()
+    curr_minute = get_time_minute(curr_time)
+    curr_second = int(curr_seconds)
 
-    for time_range in SellConf.time_ranges:
-        if time_range[0] <= curr_time <= time_range[1]:
-            if int(curr_seconds) % SellConf.interval == 0:
-                scan_sell(curr_quotes, curr_date, curr_time, positions)
+    if in_minute_ranges(curr_minute, SellConf.minute_ranges):
+        if curr_second % SellConf.interval == 0:
+            scan_sell(curr_quotes, curr_date, curr_time, positions)
 
-    for time_range in BuyConf.time_ranges:
-        if time_range[0] <= curr_time <= time_range[1]:
-            if int(curr_seconds) % BuyConf.interval == 0:
-                scan_buy(curr_quotes, curr_date, positions)
-                return True
+    if in_minute_ranges(curr_minute, BuyConf.minute_ranges):
+        if curr_second % BuyConf.interval == 0:
+            scan_buy(curr_quotes, curr_date, positions)
+            return True
 
     return True
 
@@ -274,6 +295,14 @@ def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quo
 if __name__ == '__main__':
     logging_init(path=PATH_LOGS, level=logging.INFO)
     print(f'正在启动 {STRATEGY_NAME}{"" if IS_PROD else "(模拟)"}...')
+
+    # 默认每次加锁读改写 json 文件；可以统一存到 SQLite，或者单进程时常驻内存写追加日志
+    if USE_SQLITE:
+        register_sqlite_backends(SqliteTradeDB(PATH_STAT), PATH_HELD, PATH_MAXP, PATH_DEAL, PATH_ASSETS)
+    elif USE_JOURNAL:
+        register_state_backend(PATH_HELD, JournalStateStore(PATH_HELD))
+        register_state_backend(PATH_MAXP, JournalStateStore(PATH_MAXP))
+
     if IS_PROD:
         from delegate.xt_callback import XtCustomCallback
         from delegate.xt_delegate import XtDelegate, get_holding_position_count
@@ -335,7 +364,9 @@ if __name__ == '__main__':
         path_deal=PATH_DEAL,
         path_assets=PATH_ASSETS,
         execute_strategy=execute_strategy,
+        path_latency=PATH_LTCY,
         ding_messager=DING_MESSAGER,
+        tick_checker=my_seller.check_stops,
         open_today_deal_report=True,
         open_today_hold_report=True,
     )
@@ -365,3 +396,4 @@ if __name__ == '__main__':
     finally:
         schedule.clear()
         my_delegate.shutdown()
+        close_state_backends()
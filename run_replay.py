@@ -0,0 +1,41 @@
+import json
+import logging
+import importlib
+
+from tools.utils_basic import logging_init
+
+from delegate.replay_delegate import ReplayDelegate, ReplayPosition
+from tools.utils_replay import replay_strategy
+
+# ======== 配置 ========
+
+STRATEGY_MODULE = 'run_shield'                      # 要回放的策略脚本
+REPLAY_DATE = '2024-12-31'                          # 回放日期
+TICK_PATH = './_cache/debug/ticks_2024-12-31.bin'   # 二进制流水或者旧版 tick_history.json
+SPEED = 0                                           # 回放倍速，1 为实时，0 为尽快
+
+PATH_REPLAY = './_cache/debug/replay'               # 回放产生的持仓天数、最高价、成交记录
+PATH_LOGS = PATH_REPLAY + '/logs.txt'
+
+# 回放开始时的持仓
+INIT_POSITIONS = [
+    ReplayPosition('000001.SZ', 1000, 10.00),
+]
+
+
+if __name__ == '__main__':
+    logging_init(path=PATH_LOGS, level=logging.INFO)
+    print(f'正在回放 {STRATEGY_MODULE} {REPLAY_DATE} ...')
+
+    strategy = importlib.import_module(STRATEGY_MODULE)
+    report = replay_strategy(
+        module=strategy,
+        tick_path=TICK_PATH,
+        curr_date=REPLAY_DATE,
+        delegate=ReplayDelegate(positions=INIT_POSITIONS),
+        replay_dir=PATH_REPLAY,
+        speed=SPEED,
+    )
+
+    print()
+    print(json.dumps(report, ensure_ascii=False, indent=4))
@@ -7,7 +7,10 @@ from credentials import *
 
 from tools.utils_basic import logging_init, is_symbol
 from tools.utils_cache import *
+from tools.utils_clock import compile_time_ranges, in_minute_ranges, get_time_minute
 from tools.utils_ding import DingMessager
+from tools.utils_sqlite import SqliteTradeDB
+from tools.utils_state import JournalStateStore
 
 from delegate.xt_subscriber import XtSubscriber, update_position_held
 
@@ -21,6 +24,8 @@ STRATEGY_NAME = '进攻监控'
 DING_MESSAGER = DingMessager(DING_SECRET, DING_TOKENS)
 IS_PROD = True
 IS_DEBUG = True
+USE_SQLITE = False      # 交易状态存到 SQLite，多个策略进程共用同一个 PATH_BASE 时打开
+USE_JOURNAL = False     # 交易状态常驻内存写追加日志，只有本进程使用这个 PATH_BASE 时才能打开
 
 PATH_BASE = CACHE_BASE_PATH
 
@@ -28,7 +33,19 @@ PATH_ASSETS = PATH_BASE + '/assets.csv'         # 记录历史净值
 PATH_DEAL = PATH_BASE + '/deal_hist.csv'        # 记录历史成交
 PATH_HELD = PATH_BASE + '/held_days.json'       # 记录持仓日期
 PATH_MAXP = PATH_BASE + '/max_price.json'       # 记录历史最高
+PATH_STAT = PATH_BASE + '/trade_state.db'       # USE_SQLITE 时的交易状态库
 PATH_LOGS = PATH_BASE + '/logs.txt'             # 用来存储选股和委托操作
+PATH_LTCY = PATH_BASE + '/latency_{}.jsonl'     # 用来按日记录各环节耗时
+
+# 策略执行节奏，实盘和回放共用
+# 默认按整秒执行，策略在行情回调线程里跑
+# 需要更快的突破盯盘时改成：
+#   'execute_mode': 'interval_ms', 'execute_interval_ms': 300, 'open_strategy_worker': True
+# 每 300 毫秒扫描一次，check_positions 在策略线程里查询，不阻塞行情回调
+EXECUTE_CADENCE = {
+    'execute_mode': 'second',
+    'open_strategy_worker': False,
+}
 
 lock_of_disk_cache = threading.Lock()           # 操作磁盘文件缓存的锁
 
@@ -48,6 +65,7 @@ class PoolConf:
 
 class BuyConf:
     time_ranges = [['09:31', '11:30'], ['13:00', '14:57']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 1            # 扫描买入间隔，60的约数：1-6, 10, 12, 15, 20, 30
     order_premium = 0.00    # 保证市价单成交的溢价，单位（元）
 
@@ -59,6 +77,7 @@ class BuyConf:
 
 class SellConf:
     time_ranges = [['09:31', '11:30'], ['13:00', '14:57']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 1                    # 扫描买入间隔，60的约数：1-6, 10, 12, 15, 20, 30
     order_premium = 0.03            # 保证市价单成交的溢价，单位（元）
 
@@ -111,9 +130,10 @@ def refresh_code_list():
 # ======== 买点 ========
 
 
-def select_stocks(quotes: Dict) -> List[Dict[str, any]]:
+def select_stocks(quotes: Dict, changed_codes: Optional[Dict] = None) -> List[Dict[str, any]]:
     selections = []
-    for code in quotes:
+    scan_codes = quotes if changed_codes is None else [code for code in changed_codes if code in quotes]
+    for code in scan_codes:
         if code not in BuyConf.break_targets.keys():
             debug(code, f'不在监控名单')
             continue
@@ -152,7 +172,7 @@ def select_stocks(quotes: Dict) -> List[Dict[str, any]]:
 
 
 def scan_buy(quotes: Dict, curr_date: str, positions: List) -> None:
-    selections = select_stocks(quotes)
+    selections = select_stocks(quotes, my_suber.take_changed_codes('buy'))
 
     # 选出一个以上的股票
     if len(selections) > 0:
@@ -195,12 +215,13 @@ def scan_buy(quotes: Dict, curr_date: str, positions: List) -> None:
 
 def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quotes: Dict) -> bool:
     positions = my_delegate.check_positions()
+    curr_minute = get_time_minute(curr_time)
+    curr_second = int(curr_seconds)
 
-    for time_range in BuyConf.time_ranges:
-        if time_range[0] <= curr_time <= time_range[1]:
-            if int(curr_seconds) % BuyConf.interval == 0:
-                scan_buy(curr_quotes, curr_date, positions)
-                return True
+    if in_minute_ranges(curr_minute, BuyConf.minute_ranges):
+        if curr_second % BuyConf.interval == 0:
+            scan_buy(curr_quotes, curr_date, positions)
+            return True
 
     return False
 
@@ -208,6 +229,14 @@ def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quo
 if __name__ == '__main__':
     logging_init(path=PATH_LOGS, level=logging.INFO)
     print(f'正在启动 {STRATEGY_NAME}{"" if IS_PROD else "(模拟)"}...')
+
+    # 默认每次加锁读改写 json 文件；可以统一存到 SQLite，或者单进程时常驻内存写追加日志
+    if USE_SQLITE:
+        register_sqlite_backends(SqliteTradeDB(PATH_STAT), PATH_HELD, PATH_MAXP, PATH_DEAL, PATH_ASSETS)
+    elif USE_JOURNAL:
+        register_state_backend(PATH_HELD, JournalStateStore(PATH_HELD))
+        register_state_backend(PATH_MAXP, JournalStateStore(PATH_MAXP))
+
     if IS_PROD:
         from delegate.xt_callback import XtCustomCallback
         from delegate.xt_delegate import XtDelegate
@@ -269,6 +298,8 @@ if __name__ == '__main__':
         path_deal=PATH_DEAL,
         path_assets=PATH_ASSETS,
         execute_strategy=execute_strategy,
+        **EXECUTE_CADENCE,
+        path_latency=PATH_LTCY,
         ding_messager=DING_MESSAGER,
     )
     my_suber.start_scheduler()
@@ -295,3 +326,4 @@ if __name__ == '__main__':
     finally:
         schedule.clear()
         my_delegate.shutdown()
+        close_state_backends()
@@ -7,7 +7,10 @@ from credentials import *
 
 from tools.utils_basic import logging_init, is_symbol
 from tools.utils_cache import *
+from tools.utils_clock import compile_time_ranges, in_minute_ranges, get_time_minute
 from tools.utils_ding import DingMessager
+from tools.utils_sqlite import SqliteTradeDB
+from tools.utils_state import JournalStateStore
 
 from delegate.xt_delegate import xt_get_ticks
 from delegate.xt_subscriber import XtSubscriber, update_position_held
@@ -24,6 +27,8 @@ STRATEGY_NAME = '问财选股'
 DING_MESSAGER = DingMessager(DING_SECRET, DING_TOKENS)
 IS_PROD = False
 IS_DEBUG = True
+USE_SQLITE = False      # 交易状态存到 SQLite，多个策略进程共用同一个 PATH_BASE 时打开
+USE_JOURNAL = False     # 交易状态常驻内存写追加日志，只有本进程使用这个 PATH_BASE 时才能打开
 
 PATH_BASE = CACHE_BASE_PATH
 
@@ -31,7 +36,9 @@ PATH_ASSETS = PATH_BASE + '/assets.csv'         # 记录历史净值
 PATH_DEAL = PATH_BASE + '/deal_hist.csv'        # 记录历史成交
 PATH_HELD = PATH_BASE + '/held_days.json'       # 记录持仓日期
 PATH_MAXP = PATH_BASE + '/max_price.json'       # 记录历史最高
+PATH_STAT = PATH_BASE + '/trade_state.db'       # USE_SQLITE 时的交易状态库
 PATH_LOGS = PATH_BASE + '/logs.txt'             # 用来存储选股和委托操作
+PATH_LTCY = PATH_BASE + '/latency_{}.jsonl'     # 用来按日记录各环节耗时
 
 lock_of_disk_cache = threading.Lock()           # 操作磁盘文件缓存的锁
 
@@ -51,6 +58,7 @@ class PoolConf:
 
 class BuyConf:
     time_ranges = [['14:47', '14:57']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 15           # 扫描买入间隔，60的约数：1-6, 10, 12, 15, 20, 30
     order_premium = 0.02    # 保证市价单成交的溢价，单位（元）
 
@@ -61,8 +69,11 @@ class BuyConf:
 
 class SellConf:
     time_ranges = [['09:31', '11:30'], ['13:00', '14:57']]
+    minute_ranges = compile_time_ranges(time_ranges, inclusive_end=True)  # 启动时编译成分钟区间
     interval = 1                    # 扫描买入间隔，60的约数：1-6, 10, 12, 15, 20, 30
     order_premium = 0.02            # 保证市价单成交的溢价，单位（元）
+    batch_sell = False              # 所有持仓按数组一次判断卖点，和逐个判断对照验证之前保持关闭
+    open_stop_orders = False        # 硬止损止盈挂本地条件单，推送到达时直接检查，验证之前保持关闭
 
     switch_time_range = ['14:30', '14:57']
     switch_hold_days = 3            # 持仓天数
@@ -200,7 +211,8 @@ def scan_buy(quotes: Dict, curr_date: str, positions: List) -> None:
 
 def scan_sell(quotes: Dict, curr_date: str, curr_time: str, positions: List) -> None:
     max_prices, held_days = update_max_prices(lock_of_disk_cache, quotes, positions, PATH_MAXP, PATH_HELD)
-    my_seller.execute_sell(quotes, curr_date, curr_time, positions, held_days, max_prices, cache_history)
+    my_seller.execute_sell(quotes, curr_date, curr_time, positions, held_days, max_prices, cache_history,
+                           my_suber.take_changed_codes('sell'), my_suber.today_bars)
 
 
 # ======== 框架 ========
@@ -208,17 +220,17 @@ def scan_sell(quotes: Dict, curr_date: str, curr_time: str, positions: List) ->
 
 def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quotes: Dict) -> bool:
     positions = my_delegate.check_positions()
+    curr_minute = get_time_minute(curr_time)
+    curr_second = int(curr_seconds)
 
-    for time_range in SellConf.time_ranges:
-        if time_range[0] <= curr_time <= time_range[1]:
-            if int(curr_seconds) % SellConf.interval == 0:
-                scan_sell(curr_quotes, curr_date, curr_time, positions)
+    if in_minute_ranges(curr_minute, SellConf.minute_ranges):
+        if curr_second % SellConf.interval == 0:
+            scan_sell(curr_quotes, curr_date, curr_time, positions)
 
-    for time_range in BuyConf.time_ranges:
-        if time_range[0] <= curr_time <= time_range[1]:
-            if int(curr_seconds) % BuyConf.interval == 0:
-                scan_buy(curr_quotes, curr_date, positions)
-                return True
+    if in_minute_ranges(curr_minute, BuyConf.minute_ranges):
+        if curr_second % BuyConf.interval == 0:
+            scan_buy(curr_quotes, curr_date, positions)
+            return True
 
     return False
 
@@ -226,6 +238,14 @@ def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quo
 if __name__ == '__main__':
     logging_init(path=PATH_LOGS, level=logging.INFO)
     print(f'正在启动 {STRATEGY_NAME}{"" if IS_PROD else "(模拟)"}...')
+
+    # 默认每次加锁读改写 json 文件；可以统一存到 SQLite，或者单进程时常驻内存写追加日志
+    if USE_SQLITE:
+        register_sqlite_backends(SqliteTradeDB(PATH_STAT), PATH_HELD, PATH_MAXP, PATH_DEAL, PATH_ASSETS)
+    elif USE_JOURNAL:
+        register_state_backend(PATH_HELD, JournalStateStore(PATH_HELD))
+        register_state_backend(PATH_MAXP, JournalStateStore(PATH_MAXP))
+
     if IS_PROD:
         from delegate.xt_callback import XtCustomCallback
         from delegate.xt_delegate import XtDelegate, get_holding_position_count
@@ -287,7 +307,9 @@ if __name__ == '__main__':
         path_deal=PATH_DEAL,
         path_assets=PATH_ASSETS,
         execute_strategy=execute_strategy,
+        path_latency=PATH_LTCY,
         ding_messager=DING_MESSAGER,
+        tick_checker=my_seller.check_stops,
     )
     my_suber.start_scheduler()
 
@@ -313,3 +335,4 @@ if __name__ == '__main__':
     finally:
         schedule.clear()
         my_delegate.shutdown()
+        close_state_backends()
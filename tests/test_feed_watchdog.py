@@ -0,0 +1,109 @@
+import datetime
+
+import pytest
+
+from delegate.feed_watchdog import FeedWatchdog
+from tools.utils_clock import VirtualClock, set_virtual_clock, clock_monotonic
+
+
+class FakeDing:
+    def __init__(self):
+        self.texts = []
+
+    def send_text(self, text, alert=False):
+        self.texts.append(text)
+
+
+class FakeSubscriber:
+    def __init__(self):
+        self.account_id = '**0000'
+        self.strategy_name = '测试'
+        self.ding_messager = FakeDing()
+        self.is_subscribed = True
+        self.last_push_monotonic = clock_monotonic()
+        self.resubscribes = 0
+
+    def push(self):
+        self.last_push_monotonic = clock_monotonic()
+
+    def resubscribe_tick(self):
+        self.resubscribes += 1
+
+
+@pytest.fixture
+def clock():
+    clock = VirtualClock(datetime.datetime(2024, 12, 31, 10, 0, 0))
+    set_virtual_clock(clock)
+    yield clock
+    set_virtual_clock(None)
+
+
+def advance(clock: VirtualClock, seconds: float) -> None:
+    clock.set(clock.now() + datetime.timedelta(seconds=seconds))
+
+
+def test_expected_interval_by_session(clock):
+    watchdog = FeedWatchdog(FakeSubscriber())
+    for hhmm, interval in [('09:10', None), ('09:20', 10.0), ('09:27', None), ('10:00', 3.0),
+                           ('12:00', None), ('13:30', 3.0), ('14:58', 10.0), ('15:05', None)]:
+        clock.set(datetime.datetime(2024, 12, 31, int(hhmm[:2]), int(hhmm[3:])))
+        assert watchdog.expected_interval() == interval, hhmm
+        assert watchdog.in_session() == (interval is not None)
+
+
+def test_resubscribe_with_backoff_and_recover(clock):
+    suber = FakeSubscriber()
+    watchdog = FeedWatchdog(suber, backoff=2.0, alert_after_retries=3)
+
+    advance(clock, 5)
+    watchdog.check()
+    assert watchdog.gap_start is None       # 不到 2 倍推送间隔
+
+    advance(clock, 2)
+    watchdog.check()
+    assert watchdog.gap_start is not None and suber.resubscribes == 0
+
+    advance(clock, 5)                       # 12 秒，到 4 倍推送间隔
+    watchdog.check()
+    assert suber.resubscribes == 1
+    advance(clock, 1)
+    watchdog.check()
+    assert suber.resubscribes == 1          # 退避 2 秒
+    advance(clock, 1)
+    watchdog.check()
+    advance(clock, 4)
+    watchdog.check()
+    assert suber.resubscribes == 3
+    assert len(suber.ding_messager.texts) == 1
+
+    advance(clock, 1)
+    suber.push()
+    watchdog.check()
+    assert watchdog.gap_start is None and watchdog.retries == 0
+    assert watchdog.events[-1]['gap_seconds'] == 19.0
+    assert watchdog.events[-1]['time'] == '10:00:19'
+    assert len(suber.ding_messager.texts) == 2   # 告警过的要发恢复通知
+
+
+def test_call_auction_tolerates_sparse_pushes(clock):
+    clock.set(datetime.datetime(2024, 12, 31, 9, 20, 0))
+    suber = FakeSubscriber()
+    watchdog = FeedWatchdog(suber)
+
+    advance(clock, 15)
+    watchdog.check()
+    assert watchdog.gap_start is None       # 连续竞价的标准下早就该重新订阅了
+
+    advance(clock, 30)
+    watchdog.check()
+    assert suber.resubscribes == 1
+
+
+def test_lunch_break_is_not_watched(clock):
+    clock.set(datetime.datetime(2024, 12, 31, 11, 29, 50))
+    suber = FakeSubscriber()
+    watchdog = FeedWatchdog(suber)
+
+    advance(clock, 5 * 60)
+    watchdog.check()
+    assert watchdog.gap_start is None and suber.resubscribes == 0
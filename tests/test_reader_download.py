@@ -0,0 +1,61 @@
+import threading
+
+import pandas as pd
+
+from reader.reader_download import HistoryDownloader
+from tools.utils_cache import save_pickle
+
+
+def make_frame(code: str) -> pd.DataFrame:
+    return pd.DataFrame({'datetime': ['20241230', '20241231'], 'close': [float(code[:2]), float(code[:2]) + 0.1]})
+
+
+# 按股票代码决定每次请求的结果，记录请求次数
+class FakeFetch:
+    def __init__(self, flaky=(), broken=()):
+        self.flaky = set(flaky)         # 第一次请求抛异常，重试成功
+        self.broken = set(broken)       # 一直取不到数据
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, code, start, end, adjust, columns):
+        with self.lock:
+            self.calls[code] = self.calls.get(code, 0) + 1
+            attempt = self.calls[code]
+        if code in self.broken:
+            return {}
+        if code in self.flaky and attempt == 1:
+            raise ConnectionError('reset by peer')
+        return {code: make_frame(code)}
+
+
+def make_downloader(fetch: FakeFetch) -> HistoryDownloader:
+    downloader = HistoryDownloader(max_workers=4, rate=1000.0, burst=100, retries=2, backoff=0.0)
+    downloader._fetch_ak = fetch
+    return downloader
+
+
+def test_retries_and_failures():
+    fetch = FakeFetch(flaky=['600001.SH'], broken=['000002.SZ'])
+    downloader = make_downloader(fetch)
+    codes = ['000001.SZ', '000002.SZ', '600001.SH', '300001.SZ', '510300.SH']   # ETF 不走 akshare 股票接口
+
+    ans = downloader.download(codes, '20241230', '20241231')
+    assert sorted(ans) == ['000001.SZ', '300001.SZ', '600001.SH']
+    assert ans['600001.SH']['close'].tolist() == [60.0, 60.1]
+    assert downloader.failed == ['000002.SZ']
+    assert fetch.calls == {'000001.SZ': 1, '000002.SZ': 3, '600001.SH': 2, '300001.SZ': 1}
+
+
+def test_resume_from_partial(tmp_path):
+    partial_path = str(tmp_path / 'partial.pkl')
+    save_pickle(partial_path, {'000001.SZ': make_frame('000001.SZ')})
+
+    fetch = FakeFetch()
+    downloader = make_downloader(fetch)
+    ans = downloader.download(['000001.SZ', '600001.SH'], '20241230', '20241231', partial_path=partial_path)
+    assert sorted(ans) == ['000001.SZ', '600001.SH']
+    assert fetch.calls == {'600001.SH': 1}      # 已经下载过的不再请求
+
+    HistoryDownloader.clean_partial(partial_path)
+    assert not (tmp_path / 'partial.pkl').exists()
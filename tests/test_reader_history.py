@@ -0,0 +1,118 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import tools.utils_calendar as utils_calendar
+from reader.reader_history import DailyHistoryStore
+from tools.utils_calendar import TradingCalendar
+
+DAYS = ['20241225', '20241226', '20241227', '20241230', '20241231', '20250102', '20250103']
+
+
+def make_bars(days, closes) -> pd.DataFrame:
+    return pd.DataFrame({
+        'datetime': days,
+        'open': closes,
+        'close': closes,
+        'volume': [100] * len(days),
+    })
+
+
+# 按下载区间从一份"远端"日线里切片，记录每次下载的参数
+class FakeDownloader:
+    def __init__(self, remote):
+        self.remote = remote        # { code: DataFrame }
+        self.calls = []
+
+    def download(self, codes, start, end, adjust, columns):
+        self.calls.append((sorted(codes), start, end))
+        ans = {}
+        for code in codes:
+            df = self.remote[code]
+            df = df[(df['datetime'] >= start) & (df['datetime'] <= end)].reset_index(drop=True)
+            if len(df) > 0:
+                ans[code] = df
+        return ans
+
+
+@pytest.fixture(autouse=True)
+def calendar(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / 'open_days.csv')
+    pd.DataFrame({'trade_date': [f'{d[:4]}-{d[4:6]}-{d[6:]}' for d in DAYS]}).to_csv(csv_path)
+    monkeypatch.setattr(utils_calendar, '_calendar', TradingCalendar(csv_path))
+
+
+def test_merge_dedupes_overlap():
+    stored = make_bars(DAYS[:3], [1.0, 2.0, 3.0])
+    fetched = make_bars(DAYS[2:5], [3.0, 4.0, 5.0])
+    merged = DailyHistoryStore._merge(stored, fetched)
+    assert merged['datetime'].tolist() == DAYS[:5]
+    assert merged['close'].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_merge_rejects_changed_adjustment():
+    stored = make_bars(DAYS[:3], [1.0, 2.0, 3.0])
+    fetched = make_bars(DAYS[2:5], [2.7, 4.0, 5.0])     # 重叠那一天的前复权收盘价变了
+    assert DailyHistoryStore._merge(stored, fetched) is None
+
+
+def test_count_missing_days():
+    assert DailyHistoryStore.count_missing_days('20241227', '20250103') == 4
+    assert DailyHistoryStore.count_missing_days('20250103', '20250103') == 0
+    assert DailyHistoryStore.count_missing_days('20241228', '20241230') == 1
+
+
+def test_load_window_appends_only_new_days(tmp_path):
+    remote = {'000001.SZ': make_bars(DAYS, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0])}
+    downloader = FakeDownloader(remote)
+    store = DailyHistoryStore(str(tmp_path / 'history'), downloader=downloader)
+
+    ans = store.load_window(['000001.SZ'], DAYS[0], DAYS[4], columns=['datetime', 'close'])
+    assert ans['000001.SZ']['close'].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert list(ans['000001.SZ'].columns) == ['datetime', 'close']
+
+    # 已经最新时不再下载
+    store.load_window(['000001.SZ'], DAYS[0], DAYS[4])
+    assert len(downloader.calls) == 1
+
+    # 往后滚动窗口只从上次末日开始补
+    ans = store.load_window(['000001.SZ'], DAYS[2], DAYS[6])
+    assert downloader.calls[-1] == (['000001.SZ'], DAYS[4], DAYS[6])
+    assert ans['000001.SZ']['datetime'].tolist() == DAYS[2:]
+    assert store.load('000001.SZ')['datetime'].tolist() == DAYS
+
+
+def test_full_download_when_adjustment_changes(tmp_path):
+    remote = {'000001.SZ': make_bars(DAYS[:5], [1.0, 2.0, 3.0, 4.0, 5.0])}
+    downloader = FakeDownloader(remote)
+    store = DailyHistoryStore(str(tmp_path / 'history'), downloader=downloader)
+    store.load_window(['000001.SZ'], DAYS[0], DAYS[4])
+
+    # 除权之后远端整段前复权价格都变了
+    remote['000001.SZ'] = make_bars(DAYS, [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5])
+    ans = store.load_window(['000001.SZ'], DAYS[0], DAYS[6])
+    assert downloader.calls[1] == (['000001.SZ'], DAYS[4], DAYS[6])    # 先尝试追加
+    assert downloader.calls[2] == (['000001.SZ'], DAYS[0], DAYS[6])    # 对不上之后整段重下
+    assert ans['000001.SZ']['close'].tolist() == [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5]
+
+
+def test_index_round_trip(tmp_path):
+    root = str(tmp_path / 'history')
+    remote = {
+        '000001.SZ': make_bars(DAYS[:5], [1.0, 2.0, 3.0, 4.0, 5.0]),
+        '600000.SH': make_bars(DAYS[1:5], [7.0, 7.1, 7.2, 7.3]),
+    }
+    store = DailyHistoryStore(root, downloader=FakeDownloader(remote))
+    store.update(['000001.SZ', '600000.SH'], DAYS[0], DAYS[4], adjust='qfq')
+
+    with open(os.path.join(root, 'qfq', '_index.json')) as r:
+        index = json.load(r)
+    assert index == {'000001.SZ': [DAYS[0], DAYS[4]], '600000.SH': [DAYS[1], DAYS[4]]}
+
+    # 新实例读回索引，已最新的不再下载；600000.SH 首日晚于 start 需要整段重下
+    downloader = FakeDownloader(remote)
+    store = DailyHistoryStore(root, downloader=downloader)
+    store.update(['000001.SZ', '600000.SH'], DAYS[0], DAYS[4], adjust='qfq')
+    assert downloader.calls == [(['600000.SH'], DAYS[0], DAYS[4])]
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.seller_groups import ClassicGroupSeller, ShieldGroupSeller, T3BLGroupSeller, CDBLGroupSeller
+
+
+class Position:
+    def __init__(self, stock_code: str, open_price: float, can_use_volume: int):
+        self.stock_code = stock_code
+        self.open_price = open_price
+        self.can_use_volume = can_use_volume
+
+
+# 只记录委托，不真的下单
+class FakeDelegate:
+    def __init__(self):
+        self.callback = None
+        self.orders = []
+
+    def order_market_close(self, code, price, volume, remark, strategy_name):
+        self.orders.append((code, '市价', round(price, 3), volume, remark))
+
+    def order_limit_close(self, code, price, volume, remark, strategy_name):
+        self.orders.append((code, '限价', round(price, 3), volume, remark))
+
+
+class SellConf:
+    order_premium = 0.03
+    hard_time_range = ['09:31', '14:59']
+    earn_limit = 1.12
+    risk_limit = 0.97
+    risk_tight = 0.002
+    switch_time_range = ['14:30', '14:59']
+    switch_hold_days = 2
+    switch_demand_daily_up = 0.003
+    fall_time_range = ['09:31', '14:59']
+    fall_from_top = [(1.02, 1.05, 0.02), (1.05, 9.99, 0.03)]
+    return_time_range = ['09:31', '14:59']
+    return_of_profit = [(1.03, 1.07, 0.5), (1.07, 9.99, 0.3)]
+    ma_time_range = ['09:31', '14:59']
+    ma_above = 5
+
+
+def make_market(seed: int, n: int = 40):
+    rng = np.random.default_rng(seed)
+    positions, quotes, held_days, max_prices, histories = [], {}, {}, {}, {}
+    for k in range(n):
+        code = f'{600000 + k}.SH'
+        open_price = round(float(rng.uniform(5, 50)), 2)
+        positions.append(Position(code, open_price, int(rng.integers(0, 5)) * 100))
+        price = round(open_price * float(rng.uniform(0.92, 1.15)), 2)
+        quotes[code] = {'lastPrice': price, 'lastClose': open_price, 'high': price, 'low': price}
+        held_days[code] = int(rng.integers(0, 6))
+        if rng.random() < 0.8:
+            max_prices[code] = round(max(price, open_price) * float(rng.uniform(1.0, 1.1)), 2)
+        closes = open_price * rng.uniform(0.95, 1.05, 10)
+        histories[code] = pd.DataFrame({'close': closes, 'high': closes * 1.01, 'low': closes * 0.99})
+    return positions, quotes, held_days, max_prices, histories
+
+
+def run_seller(seller_class, batch_sell: bool, market, curr_time: str):
+    conf = type('Conf', (SellConf,), {'batch_sell': batch_sell})
+    delegate = FakeDelegate()
+    seller = seller_class('测试', delegate, conf)
+    positions, quotes, held_days, max_prices, histories = market
+    seller.execute_sell(quotes, '2024-12-31', curr_time, positions, held_days, max_prices, histories)
+    return seller, delegate.orders
+
+
+@pytest.mark.parametrize('seller_class', [ClassicGroupSeller, ShieldGroupSeller, T3BLGroupSeller, CDBLGroupSeller])
+@pytest.mark.parametrize('curr_time', ['10:15', '14:45'])
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_sequential(seller_class, curr_time, seed):
+    market = make_market(seed)
+    seq_seller, seq_orders = run_seller(seller_class, False, market, curr_time)
+    bat_seller, bat_orders = run_seller(seller_class, True, market, curr_time)
+
+    assert len(seq_orders) > 0
+    assert sorted(bat_orders) == sorted(seq_orders)
+    # 批量判断和逐个判断走同一套规则统计
+    assert [(s['rule'], s['calls'], s['hits']) for s in bat_seller.rule_stats()] == \
+        [(s['rule'], s['calls'], s['hits']) for s in seq_seller.rule_stats()]
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import trader.seller_groups as seller_groups
+from trader.seller_groups import GroupSellers
+
+GROUP_SELLERS = [
+    cls for cls in vars(seller_groups).values()
+    if isinstance(cls, type) and issubclass(cls, GroupSellers) and cls is not GroupSellers
+]
+
+
+class Position:
+    def __init__(self, stock_code: str, open_price: float, can_use_volume: int):
+        self.stock_code = stock_code
+        self.open_price = open_price
+        self.can_use_volume = can_use_volume
+
+
+class FakeDelegate:
+    def __init__(self):
+        self.callback = None
+        self.orders = []
+
+    def order_market_close(self, code, price, volume, remark, strategy_name):
+        self.orders.append((code, price, volume, remark))
+
+    def order_limit_close(self, code, price, volume, remark, strategy_name):
+        self.orders.append((code, price, volume, remark))
+
+
+class SellConf:
+    order_premium = 0.03
+    hard_time_range = ['09:31', '14:59']
+    earn_limit = 1.12
+    risk_limit = 0.97
+    risk_tight = 0.002
+    switch_time_range = ['14:30', '14:59']
+    switch_hold_days = 2
+    switch_demand_daily_up = 0.003
+    fall_time_range = ['09:31', '14:59']
+    fall_from_top = [(1.02, 1.05, 0.02), (1.05, 9.99, 0.03)]
+    return_time_range = ['09:31', '14:59']
+    return_of_profit = [(1.03, 1.07, 0.5), (1.07, 9.99, 0.3)]
+    opening_time_range = ['14:40', '14:59']
+    open_low_rate = 0.99
+    open_vol_rate = 0.6
+    ma_time_range = ['09:31', '14:59']
+    ma_above = 5
+    cci_time_range = ['09:31', '14:59']
+    cci_upper = 200.0
+    cci_lower = 0.0
+    wr_time_range = ['09:31', '14:59']
+    wr_cross = 25.0
+
+
+def make_cases(seed: int, n: int = 60):
+    rng = np.random.default_rng(seed)
+    cases = []
+    for k in range(n):
+        code = f'{600000 + k}.SH'
+        closes = 10 * np.cumprod(rng.uniform(0.95, 1.05, 40))
+        history = pd.DataFrame({
+            'close': closes,
+            'high': closes * rng.uniform(1.0, 1.04, 40),
+            'low': closes * rng.uniform(0.96, 1.0, 40),
+            'volume': rng.uniform(1e5, 1e6, 40),
+        })
+        held_day = int(rng.integers(0, 6))
+        open_price = round(float(closes[-held_day - 1]), 2)
+        price = round(float(closes[-1] * rng.uniform(0.92, 1.08)), 2)
+        quote = {
+            'lastPrice': price, 'lastClose': round(float(closes[-1]), 2),
+            'high': price * 1.01, 'low': price * 0.99, 'volume': float(rng.uniform(1e4, 1e6)),
+        }
+        max_price = round(max(price, open_price) * float(rng.uniform(1.0, 1.1)), 2) if rng.random() < 0.8 else None
+        cases.append(dict(
+            code=code, quote=quote, position=Position(code, open_price, 100 * int(rng.integers(1, 5))),
+            held_day=held_day, max_price=max_price, history=history,
+        ))
+    return cases
+
+
+def make_seller(seller_class):
+    delegate = FakeDelegate()
+    return seller_class('测试', delegate, SellConf), delegate
+
+
+# 改造前的写法：按父类顺序逐个调用 check_sell
+def legacy_first_rule(seller, case: dict, curr_time: str):
+    for parent in seller.get_group_bases():
+        if parent.check_sell(seller, curr_date='2024-12-31', curr_time=curr_time, **case):
+            return parent.__name__
+    return None
+
+
+def compiled_first_rule(seller, case: dict, curr_time: str):
+    for rule in seller.get_active_rules(curr_time):
+        if rule(curr_date='2024-12-31', curr_time=curr_time, **case):
+            return rule.name
+    return None
+
+
+@pytest.mark.parametrize('seller_class', GROUP_SELLERS, ids=lambda cls: cls.__name__)
+def test_compiled_rules_match_legacy_chain(seller_class):
+    legacy_seller, legacy_delegate = make_seller(seller_class)
+    compiled_seller, compiled_delegate = make_seller(seller_class)
+
+    fired = 0
+    for curr_time in ['09:45', '10:32', '14:35', '14:50']:
+        for case in make_cases(seed=len(curr_time) + int(curr_time[-2:])):
+            legacy_delegate.orders.clear()
+            compiled_delegate.orders.clear()
+            legacy_rule = legacy_first_rule(legacy_seller, case, curr_time)
+            compiled_rule = compiled_first_rule(compiled_seller, case, curr_time)
+
+            assert compiled_rule == legacy_rule, (curr_time, case['code'])
+            assert compiled_delegate.orders == legacy_delegate.orders, (curr_time, case['code'])
+            fired += legacy_rule is not None
+    assert fired > 0
@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from tools.utils_clock import VirtualClock, set_virtual_clock
+from trader.seller_stops import StopOrderBook
+
+
+@pytest.fixture
+def clock() -> VirtualClock:
+    clock = VirtualClock(datetime.datetime(2024, 12, 31, 10, 0, 0))
+    set_virtual_clock(clock)
+    yield clock
+    set_virtual_clock(None)
+
+
+def quote(price: float) -> dict:
+    return {'lastPrice': price}
+
+
+def test_fires_once_and_cancels_other_stops(clock):
+    book = StopOrderBook(cooldown=60)
+    book.place('000001.SZ', 'stop_loss', 9.7, 100, '止损')
+    book.place('000001.SZ', 'take_profit', 11.0, 100, '止盈')
+    book.place_trailing('000001.SZ', 0.05, 10.5, 100, '移动止损')
+    assert len(book) == 3
+
+    assert book.check({'000001.SZ': quote(10.0)}) == []
+
+    fired = book.check({'000001.SZ': quote(9.6)})
+    assert [order.kind for order, _ in fired] == ['stop_loss']
+    assert '000001.SZ' not in book     # 同一股票的其余条件单一起撤掉
+    assert book.check({'000001.SZ': quote(9.0)}) == []
+
+
+def test_nearest_level_fires_first(clock):
+    book = StopOrderBook()
+    book.place('000001.SZ', 'take_profit', 11.0, 100, '止盈')
+    book.place('600000.SH', 'stop_loss', 6.5, 100, '止损')
+    fired = book.check({'000001.SZ': quote(11.2), '600000.SH': quote(6.6)})
+    assert [(order.code, order.kind) for order, _ in fired] == [('000001.SZ', 'take_profit')]
+
+
+def test_trailing_follows_high(clock):
+    book = StopOrderBook()
+    book.place_trailing('000001.SZ', 0.1, 10.0, 100, '移动止损')
+    assert book.check({'000001.SZ': quote(12.0)}) == []     # 最高价上移到 12，触发价 10.8
+    assert book.check({'000001.SZ': quote(10.9)}) == []
+    fired = book.check({'000001.SZ': quote(10.8)})
+    assert len(fired) == 1 and fired[0][0].high == 12.0
+
+
+def test_cooldown_dedups_stop_and_scan(clock):
+    book = StopOrderBook(cooldown=60)
+    book.place('000001.SZ', 'stop_loss', 9.7, 100, '止损')
+    assert len(book.check({'000001.SZ': quote(9.5)})) == 1
+
+    # 冷却期内扫描不能再卖，重新挂的条件单也不会触发
+    assert book.recently_fired('000001.SZ')
+    assert not book.mark_sold('000001.SZ')
+    book.place('000001.SZ', 'stop_loss', 9.7, 100, '止损')
+    assert book.check({'000001.SZ': quote(9.5)}) == []
+
+    clock.set(clock.now() + datetime.timedelta(seconds=61))
+    assert not book.recently_fired('000001.SZ')
+    assert book.mark_sold('000001.SZ')
+
+    # 扫描刚卖过，条件单不再触发
+    book.place('000001.SZ', 'stop_loss', 9.7, 100, '止损')
+    assert book.check({'000001.SZ': quote(9.5)}) == []
+    assert book.recently_sold('000001.SZ')
+
+
+def test_retain_drops_closed_positions(clock):
+    book = StopOrderBook()
+    book.place('000001.SZ', 'stop_loss', 9.7, 100, '止损')
+    book.place('600000.SH', 'stop_loss', 6.7, 100, '止损')
+    book.retain({'600000.SH'})
+    assert '000001.SZ' not in book and '600000.SH' in book
@@ -0,0 +1,63 @@
+import numpy as np
+
+from trader.seller_triggers import TriggerTable
+
+
+class Position:
+    def __init__(self, stock_code: str, open_price: float):
+        self.stock_code = stock_code
+        self.open_price = open_price
+
+
+def make_table():
+    calls = []
+
+    def build(cost_price, held_day, max_price):
+        calls.append((cost_price, held_day, max_price))
+        triggers = {'hard_loss': (cost_price * 0.97, '硬止损3%')}
+        if max_price is not None:
+            triggers['fall'] = (max_price * 0.95, '回落5%')
+        return triggers
+
+    return TriggerTable(build), calls
+
+
+def test_sync_rebuilds_only_changed_inputs():
+    table, calls = make_table()
+    positions = [Position('000001.SZ', 10.0), Position('600000.SH', 7.0)]
+
+    changed = table.sync(positions, {'000001.SZ': 1, '600000.SH': 2}, {'000001.SZ': 11.0})
+    assert sorted(changed) == ['000001.SZ', '600000.SH']
+    assert len(calls) == 2
+
+    # 输入不变时不重算
+    assert table.sync(positions, {'000001.SZ': 1, '600000.SH': 2}, {'000001.SZ': 11.0}) == []
+    assert len(calls) == 2
+
+    # 最高价变化只重算这一个
+    assert table.sync(positions, {'000001.SZ': 1, '600000.SH': 2}, {'000001.SZ': 12.0}) == ['000001.SZ']
+    assert table.rows['000001.SZ']['fall'][0] == 12.0 * 0.95
+    assert table.rebuilds == 3
+
+
+def test_sync_prunes_closed_and_untracked_positions():
+    table, _ = make_table()
+    table.sync([Position('000001.SZ', 10.0), Position('600000.SH', 7.0)], {'000001.SZ': 1, '600000.SH': 1}, {})
+    assert len(table) == 2
+
+    # 已清仓的删掉，没有持仓天数记录的不进表
+    table.sync([Position('000001.SZ', 10.0), Position('000002.SZ', 5.0)], {'000001.SZ': 1}, {})
+    assert '600000.SH' not in table
+    assert '000002.SZ' not in table
+    assert table.keys == {'000001.SZ': (10.0, 1, None)}
+
+
+def test_column_and_reason():
+    table, _ = make_table()
+    table.sync([Position('000001.SZ', 10.0), Position('600000.SH', 7.0)],
+               {'000001.SZ': 1, '600000.SH': 1}, {'600000.SH': 8.0})
+
+    fall = table.column(['000001.SZ', '600000.SH', '000002.SZ'], 'fall')
+    assert np.isnan(fall[0]) and fall[1] == 8.0 * 0.95 and np.isnan(fall[2])
+    assert table.reason('000001.SZ', 'hard_loss') == '硬止损3%'
+    assert set(table.to_frame()['code']) == {'000001.SZ', '600000.SH'}
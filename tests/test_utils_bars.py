@@ -0,0 +1,63 @@
+import datetime
+
+from tools.utils_bars import BarStore, get_bar_minute
+
+
+def quote(hhmmss: str, price: float, volume: int, amount: float) -> dict:
+    tick_time = datetime.datetime.strptime(f'2024-12-31 {hhmmss}', '%Y-%m-%d %H:%M:%S')
+    return {'time': int(tick_time.timestamp() * 1000), 'lastPrice': price, 'volume': volume, 'amount': amount}
+
+
+def feed(store: BarStore, ticks: list) -> None:
+    for hhmmss, price, volume, amount in ticks:
+        store.update_quotes({'000001.SZ': quote(hhmmss, price, volume, amount)})
+
+
+def test_get_bar_minute_boundaries():
+    assert get_bar_minute(9 * 60 + 25, 1) == 570        # 集合竞价归入第一根
+    assert get_bar_minute(9 * 60 + 34, 5) == 570
+    assert get_bar_minute(9 * 60 + 35, 5) == 575
+    assert get_bar_minute(11 * 60 + 30, 1) == 689       # 11:30 收盘那一笔归入 11:29
+    assert get_bar_minute(11 * 60 + 30, 5) == 685
+    assert get_bar_minute(15 * 60, 1) == 899
+    assert get_bar_minute(15 * 60, 5) == 895
+
+
+def test_bar_closes_at_minute_boundary():
+    store = BarStore([1, 5])
+    feed(store, [
+        ('09:25:00', 10.0, 100, 1000.0),
+        ('09:30:30', 10.2, 150, 1510.0),
+        ('09:30:59', 9.9, 200, 2005.0),
+        ('09:31:00', 10.1, 260, 2611.0),    # 整分第一笔开新的一分钟线
+        ('09:34:59', 10.3, 300, 3023.0),
+        ('09:35:00', 10.4, 310, 3127.0),    # 五分钟线在 09:35 换根
+    ])
+
+    one = store.get_series('000001.SZ', 1).to_frame()
+    assert one['datetime'].tolist() == ['09:30', '09:31', '09:34', '09:35']
+    assert one.iloc[0][['open', 'high', 'low', 'close']].tolist() == [10.0, 10.2, 9.9, 9.9]
+    assert one['volume'].tolist() == [200, 60, 40, 10]
+
+    five = store.get_series('000001.SZ', 5).to_frame()
+    assert five['datetime'].tolist() == ['09:30', '09:35']
+    assert five.iloc[0][['open', 'high', 'low', 'close']].tolist() == [10.0, 10.3, 9.9, 10.3]
+    assert five['volume'].tolist() == [300, 10]
+    assert five['amount'].tolist() == [3023.0, 104.0]
+
+
+def test_session_close_folds_into_last_bar():
+    store = BarStore([1, 5])
+    feed(store, [
+        ('11:29:58', 10.0, 100, 1000.0),
+        ('11:30:00', 10.1, 120, 1202.0),    # 上午收盘那一笔
+        ('09:00:00', 9.0, 50, 450.0),       # 乱序的旧推送直接丢掉
+        ('14:59:59', 10.2, 130, 1304.0),
+        ('15:00:00', 10.3, 180, 1819.0),
+    ])
+
+    one = store.get_series('000001.SZ', 1).to_frame()
+    assert one['datetime'].tolist() == ['11:29', '14:59']
+    assert one['close'].tolist() == [10.1, 10.3]
+    assert one['volume'].tolist() == [120, 60]
+    assert store.get_series('000001.SZ', 5).to_frame()['datetime'].tolist() == ['11:25', '14:55']
@@ -0,0 +1,99 @@
+import os
+import datetime
+
+import pandas as pd
+import pytest
+
+import tools.utils_calendar as utils_calendar
+from tools.utils_cache import get_prev_trading_date
+from tools.utils_calendar import TradingCalendar
+
+DAYS = ['2024-12-27', '2024-12-30', '2024-12-31', '2025-01-02', '2025-01-03']
+
+
+@pytest.fixture
+def calendar(tmp_path) -> TradingCalendar:
+    csv_path = str(tmp_path / 'open_days.csv')
+    pd.DataFrame({'trade_date': DAYS}).to_csv(csv_path)
+    return TradingCalendar(csv_path)
+
+
+def test_is_open_and_covers(calendar):
+    assert calendar.is_open('2024-12-31')
+    assert calendar.is_open('20250102')
+    assert not calendar.is_open('2025-01-01')
+    assert calendar.covers('2025-06-30')
+    assert not calendar.covers('2026-01-05')
+
+
+def test_prev_next_inside_range(calendar):
+    assert calendar.prev('2025-01-02') == '2024-12-31'
+    assert calendar.prev('2025-01-01') == '2024-12-31'     # 非交易日按之前最近的算
+    assert calendar.prev('2025-01-03', 3) == '2024-12-30'
+    assert calendar.next('2024-12-31') == '2025-01-02'
+    assert calendar.next('2024-12-28', 2) == '2024-12-31'
+
+
+def test_prev_next_at_edges(calendar):
+    assert calendar.prev('2024-12-27') is None
+    assert calendar.prev('2024-12-30', 2) is None
+    assert calendar.prev('2024-01-01') is None
+    assert calendar.next('2025-01-03') is None
+    assert calendar.next('2025-01-02', 2) is None
+    assert calendar.prev('2025-03-01') == '2025-01-03'     # 超出范围之后只能给出最后一天
+
+
+def test_range_and_count_after(calendar):
+    assert calendar.range('2024-12-28', '2025-01-02') == ['2024-12-30', '2024-12-31', '2025-01-02']
+    assert calendar.count_after('2024-12-27', '2025-01-03') == 4
+    assert calendar.count_after('2025-01-03', '2024-12-27') == 0
+
+
+def test_sessions(calendar):
+    assert calendar.sessions('2025-01-01') == []
+    assert len(calendar.sessions('2024-12-31')) == 3
+    assert calendar.in_session(datetime.datetime(2024, 12, 31, 10, 0))
+    assert not calendar.in_session(datetime.datetime(2024, 12, 31, 12, 0))
+
+
+def test_binary_cache_reload(calendar):
+    assert os.path.exists(calendar.bin_path)
+    os.remove(calendar.csv_path)
+    reloaded = TradingCalendar(calendar.csv_path)
+    assert reloaded.days == DAYS
+
+
+def test_empty_calendar(tmp_path):
+    calendar = TradingCalendar(str(tmp_path / 'missing.csv'))
+    assert len(calendar) == 0
+    assert calendar.prev('2024-12-31') is None
+    assert not calendar.covers('2024-12-31')
+
+
+def test_prev_trading_date_refreshes_once(calendar, monkeypatch):
+    monkeypatch.setattr(utils_calendar, '_calendar', calendar)
+    refreshes = []
+
+    def refresh():
+        refreshes.append(1)
+        calendar._set_days(DAYS + ['2026-01-05', '2026-01-06'])
+
+    monkeypatch.setattr(calendar, 'refresh', refresh)
+    assert get_prev_trading_date(datetime.datetime(2025, 1, 3, 9, 0), 2) == '20241231'
+    assert refreshes == []
+    assert get_prev_trading_date(datetime.datetime(2026, 1, 6, 9, 0), 2) == '20250103'     # 刷新后覆盖到新的一年
+    assert refreshes == [1]
+
+
+def test_prev_trading_date_missing_returns_none(calendar, monkeypatch):
+    monkeypatch.setattr(utils_calendar, '_calendar', calendar)
+    refreshes = []
+
+    def refresh():
+        refreshes.append(1)
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(calendar, 'refresh', refresh)
+    assert get_prev_trading_date(datetime.datetime(2026, 1, 6, 9, 0), 1) is None   # 不再按工作日估算
+    assert get_prev_trading_date(datetime.datetime(2025, 1, 3, 9, 0), 10) is None  # 往前不够 10 天
+    assert refreshes == [1, 1]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mytt.MyTT import MA, CCI, WR, MACD
+from tools.utils_indicator import RollingIndicators
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, 80))
+    high = close + rng.uniform(0, 0.3, 80)
+    low = close - rng.uniform(0, 0.3, 80)
+    return pd.DataFrame({'close': close, 'high': high, 'low': low})
+
+
+# 在 history 后面拼接当日K线，用 MyTT 全量计算作为对照
+def full(history: pd.DataFrame, price: float, high: float, low: float):
+    close = np.append(history['close'].values, price)
+    highs = np.append(history['high'].values, high)
+    lows = np.append(history['low'].values, low)
+    return close, highs, lows
+
+
+@pytest.mark.parametrize('price, high, low', [
+    (10.5, 10.8, 10.1),
+    (8.0, 10.0, 7.5),       # 创新低
+    (14.0, 14.2, 12.0),     # 创新高
+])
+def test_rolling_matches_mytt(history, price, high, low):
+    state = RollingIndicators(history)
+    close, highs, lows = full(history, price, high, low)
+
+    for n in [5, 10, 20]:
+        assert state.ma(n, price) == pytest.approx(MA(close, n)[-1])
+
+    prev_cci, curr_cci = state.cci(price, high, low)
+    cci = CCI(close, highs, lows, 14)
+    assert prev_cci == pytest.approx(cci[-2])
+    assert curr_cci == pytest.approx(cci[-1])
+
+    prev_wr, curr_wr = state.wr(price, high, low)
+    wr = WR(close, highs, lows, 14)
+    assert prev_wr == pytest.approx(wr[-2])
+    assert curr_wr == pytest.approx(wr[-1])
+
+    prev_macd, curr_macd = state.macd(price)
+    _, _, macd = MACD(close)
+    assert prev_macd == pytest.approx(macd[-2], abs=1e-3)
+    assert curr_macd == pytest.approx(macd[-1], abs=1e-3)
+
+
+def test_rolling_short_history_returns_nan(history):
+    state = RollingIndicators(history.head(3))
+    assert np.isnan(state.ma(5, 10.0))
+    assert np.isnan(state.cci(10.0, 10.2, 9.8)[1])
+    assert np.isnan(state.wr(10.0, 10.2, 9.8)[1])
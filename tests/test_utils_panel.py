@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from tools.utils_panel import HistoryPanel, PANEL_FIELDS
+
+
+def make_frame(days, closes) -> pd.DataFrame:
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({
+        'datetime': days,
+        'open': closes - 0.1,
+        'high': closes + 0.2,
+        'low': closes - 0.2,
+        'close': closes,
+        'volume': np.arange(len(days)) * 100.0 + 100,
+    })
+
+
+def make_panel() -> HistoryPanel:
+    return HistoryPanel.from_frames({
+        '000001.SZ': make_frame(['20241226', '20241227', '20241230', '20241231'], [10.0, 10.1, 10.2, 10.3]),
+        '600000.SH': make_frame(['20241227', '20241231'], [7.0, 7.2]),         # 中间停牌一天
+        '300001.SZ': make_frame(['20241230', '20241231'], [20.0, 21.0]),       # 新股，前面没有数据
+    })
+
+
+def test_shape_and_date_axis():
+    panel = make_panel()
+    assert panel.data.shape == (3, 4, len(PANEL_FIELDS))
+    assert panel.dates.tolist() == ['20241226', '20241227', '20241230', '20241231']
+    assert panel.codes == ['000001.SZ', '600000.SH', '300001.SZ']
+
+
+def test_missing_days_are_nan_and_aligned():
+    panel = make_panel()
+    close = panel.field('close')
+    np.testing.assert_array_equal(close[panel.rows(['000001.SZ'])][0], [10.0, 10.1, 10.2, 10.3])
+    np.testing.assert_array_equal(close[1], [np.nan, 7.0, np.nan, 7.2])
+    np.testing.assert_array_equal(close[2], [np.nan, np.nan, 20.0, 21.0])
+    np.testing.assert_array_equal(panel.window('close', 1)[:, 0], [10.3, 7.2, 21.0])
+    assert np.isnan(panel.field('amount')).all()       # 原始数据没有的字段保持缺失
+
+
+def test_views_skip_missing_days():
+    panel = make_panel()
+
+    suspended = panel['600000.SH']
+    assert len(suspended) == 2
+    assert suspended['datetime'].tolist() == ['20241227', '20241231']
+    assert suspended['close'].tolist() == [7.0, 7.2]
+    assert suspended.to_frame()['volume'].tolist() == [100.0, 200.0]
+
+    listed = panel['300001.SZ']
+    assert (listed.start, listed.stop, listed.gaps) == (2, 4, None)     # 没有缺口时是零拷贝切片
+    assert listed['close'].tolist() == [20.0, 21.0]
+    assert not listed.values_of('close').flags.writeable
@@ -0,0 +1,98 @@
+import datetime
+import types
+
+import pytest
+
+import delegate.xt_subscriber as xt_subscriber
+from delegate.replay_delegate import ReplayDelegate, ReplayPosition
+from tools.utils_cache import load_json
+from tools.utils_replay import replay_strategy
+from tools.utils_tick import TickJournalWriter
+from trader.seller_groups import ShieldGroupSeller
+
+
+class FakeStockNames:
+    def get_name(self, code: str) -> str:
+        return code
+
+
+class SellConf:
+    order_premium = 0.02
+    hard_time_range = ['09:31', '14:57']
+    earn_limit = 1.20
+    risk_limit = 0.97
+    risk_tight = 0.002
+    fall_time_range = ['09:31', '14:57']
+    fall_from_top = [(1.02, 1.05, 0.02), (1.05, 9.99, 0.03)]
+    return_time_range = ['09:31', '14:57']
+    return_of_profit = [(1.10, 9.99, 0.5)]
+
+
+# 两支股票各一段价格：000001.SZ 冲高回落，600000.SH 一路下跌
+PRICE_PATHS = {
+    '000001.SZ': [10.0, 10.05, 10.1, 10.1, 10.0, 9.9, 9.7, 9.6, 9.5, 9.5],
+    '600000.SH': [7.0, 6.95, 6.9, 6.85, 6.7, 6.6, 6.6, 6.5, 6.5, 6.4],
+}
+
+
+def write_journal(path: str) -> None:
+    writer = TickJournalWriter(path)
+    writer.start()
+    start = datetime.datetime(2024, 12, 31, 9, 40, 0)
+    for step in range(len(PRICE_PATHS['000001.SZ'])):
+        tick_time = int((start + datetime.timedelta(seconds=30 * step)).timestamp() * 1000)
+        writer.put({code: {
+            'time': tick_time, 'lastPrice': prices[step], 'volume': 1000 * (step + 1),
+            'askPrice': [prices[step] + 0.01], 'askVol': [10], 'bidPrice': [prices[step] - 0.01], 'bidVol': [10],
+        } for code, prices in PRICE_PATHS.items()})
+    writer.close()
+
+
+def make_module() -> types.ModuleType:
+    module = types.ModuleType('replay_under_test')
+    module.STRATEGY_NAME = '回放测试'
+    module.Seller = ShieldGroupSeller
+    module.SellConf = SellConf
+    module.EXECUTE_CADENCE = {'execute_mode': 'second', 'open_strategy_worker': True}
+    max_prices = {}
+
+    def execute_strategy(curr_date: str, curr_time: str, curr_seconds: str, curr_quotes: dict) -> bool:
+        for code, quote in curr_quotes.items():
+            max_prices[code] = max(max_prices.get(code, 0.0), quote['high'])
+        module.my_seller.execute_sell(
+            curr_quotes, curr_date, curr_time, module.my_delegate.check_positions(),
+            load_json(module.PATH_HELD), dict(max_prices), {})
+        return False
+
+    module.execute_strategy = execute_strategy
+    return module
+
+
+def run_replay(tick_path: str, replay_dir: str) -> dict:
+    delegate = ReplayDelegate([ReplayPosition('000001.SZ', 1000, 9.5), ReplayPosition('600000.SH', 1000, 7.0)])
+    module = make_module()
+    report = replay_strategy(module, tick_path, '2024-12-31', delegate, replay_dir=replay_dir,
+                             last_closes={'000001.SZ': 9.9, '600000.SH': 7.1})
+    assert not module.my_suber.open_strategy_worker    # 不限速回放时策略在回调里执行
+    return report
+
+
+@pytest.fixture(autouse=True)
+def stock_names(monkeypatch):
+    monkeypatch.setattr(xt_subscriber, 'StockNames', FakeStockNames)
+
+
+def test_tiny_journal_replays_to_same_orders(tmp_path):
+    tick_path = str(tmp_path / 'ticks.bin')
+    write_journal(tick_path)
+
+    first = run_replay(tick_path, str(tmp_path / 'first'))
+    second = run_replay(tick_path, str(tmp_path / 'second'))
+
+    assert first['ticks'] == 20 and first['batches'] == 10
+    assert first['orders'] == second['orders']
+    assert [(order['order_time'][11:], order['code'], order['remark']) for order in first['orders']] == [
+        ('09:42:00', '600000.SH', '硬止损3%'),       # 6.7 跌破 7.0 * 0.972
+        ('09:43:00', '000001.SZ', '涨5%回落'),       # 最高 10.1，回落 3% 到 9.797 以下
+    ]
+    assert [order['volume'] for order in first['orders']] == [1000, 1000]
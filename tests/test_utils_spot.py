@@ -0,0 +1,86 @@
+import sys
+import time
+import types
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.utils_spot import SpotProvider
+
+
+# 代替 akshare 的全市场行情接口，记录调用次数
+@pytest.fixture
+def fake_akshare(monkeypatch):
+    module = types.ModuleType('akshare')
+    module.calls = 0
+
+    def stock_zh_a_spot_em():
+        module.calls += 1
+        time.sleep(0.05)
+        return pd.DataFrame({
+            '代码': ['600000', '000001', '300750', '688001'],
+            '名称': ['浦发银行', '平安银行', '宁德时代', '华兴源创'],
+            '总市值': [2e11, np.nan, 1e12, 5e9],
+            '流通市值': [2e11, 1e10, np.nan, 4e9],
+        })
+
+    module.stock_zh_a_spot_em = stock_zh_a_spot_em
+    monkeypatch.setitem(sys.modules, 'akshare', module)
+    return module
+
+
+def test_reuses_snapshot_within_ttl(fake_akshare, tmp_path):
+    provider = SpotProvider(ttl=60, path=str(tmp_path / 'spot.pkl'))
+    first = provider.get()
+    assert provider.get() is first
+    assert fake_akshare.calls == 1
+
+
+def test_refetches_after_ttl(fake_akshare, tmp_path):
+    provider = SpotProvider(ttl=0.2, path=str(tmp_path / 'spot.pkl'))
+    first = provider.get()
+    time.sleep(0.3)
+    assert provider.get() is not first
+    assert fake_akshare.calls == 2
+
+
+def test_disk_copy_shared_between_providers(fake_akshare, tmp_path):
+    path = str(tmp_path / 'spot.pkl')
+    SpotProvider(ttl=60, path=path).get()
+    other = SpotProvider(ttl=60, path=path)     # 另一个进程
+    assert len(other.get()) == 4
+    assert fake_akshare.calls == 1
+    assert other.fetches == 0
+
+
+def test_concurrent_refresh_is_single_flight(fake_akshare, tmp_path):
+    provider = SpotProvider(ttl=60, path=str(tmp_path / 'spot.pkl'))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake_akshare.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_keeps_stale_snapshot_when_refresh_fails(fake_akshare, tmp_path):
+    provider = SpotProvider(ttl=0.1, path=str(tmp_path / 'spot.pkl'))
+    first = provider.get()
+    time.sleep(0.2)
+
+    def fail():
+        raise RuntimeError('offline')
+    fake_akshare.stock_zh_a_spot_em = fail
+    assert provider.get() is first
+
+
+def test_indexes(fake_akshare, tmp_path):
+    snapshot = SpotProvider(ttl=60, path=str(tmp_path / 'spot.pkl')).get()
+    assert snapshot.codes_with_prefixes({'60', '30'}) == ['300750.SZ', '600000.SH']
+    assert snapshot.market_value_limited_codes({'6', '30'}, 1e9, 5e11) == ['600000.SH', '688001.SH']
+    assert snapshot.circulation_mv() == {'000001.SZ': 1e10, '600000.SH': 2e11, '688001.SH': 4e9}
+    assert snapshot.code_names()['300750.SZ'] == '宁德时代'
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from tools.utils_sqlite import SqliteTradeDB
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / 'trade_state.db')
+
+
+def test_inc_all_once_per_marker_across_connections(db_path):
+    a = SqliteTradeDB(db_path)
+    b = SqliteTradeDB(db_path)
+    held_a = a.state('held_days')
+    held_b = b.state('held_days')
+    held_a.set_items({'000001.SZ': 0, '600000.SH': 2})
+
+    assert held_a.inc_all('_inc_date', '2024-12-31')
+    assert not held_b.inc_all('_inc_date', '2024-12-31')   # 另一个进程同一天不再重复加
+    assert held_b.view() == {'000001.SZ': 1, '600000.SH': 3, '_inc_date': '2024-12-31'}
+
+    assert held_b.inc_all('_inc_date', '2025-01-02')
+    assert held_a.get('000001.SZ') == 2
+    a.close()
+    b.close()
+
+
+def test_data_version_reloads_view_after_other_commit(db_path):
+    a = SqliteTradeDB(db_path)
+    b = SqliteTradeDB(db_path)
+    view = a.state('max_prices').view()
+    assert view == {}
+
+    version = a.data_version()
+    a.state('max_prices').set_items({'000001.SZ': 10.0})
+    assert a.data_version() == version     # 本连接的提交不改变 data_version
+
+    b.state('max_prices').set_items({'600000.SH': 7.0})
+    assert a.data_version() != version
+    assert a.state('max_prices').view() == {'000001.SZ': 10.0, '600000.SH': 7.0}
+    a.close()
+    b.close()
+
+
+def test_replace_keeps_concurrent_writes(db_path):
+    a = SqliteTradeDB(db_path)
+    b = SqliteTradeDB(db_path)
+    held_a = a.state('held_days')
+    held_b = b.state('held_days')
+    held_a.set_items({'000001.SZ': 1})
+
+    var_a = dict(held_a.view())
+    var_b = dict(held_b.view())
+    var_a['600000.SH'] = 0
+    var_b['000002.SZ'] = 0
+    del var_b['000001.SZ']
+    held_a.replace(var_a)
+    held_b.replace(var_b)
+
+    assert held_a.view() == {'600000.SH': 0, '000002.SZ': 0}
+    a.close()
+    b.close()
+
+
+def test_migrates_json_and_csv_once(db_path, tmp_path):
+    held_path = str(tmp_path / 'held_days.json')
+    deal_path = str(tmp_path / 'deal_hist.csv')
+    assets_path = str(tmp_path / 'assets.csv')
+    with open(held_path, 'w') as w:
+        json.dump({'000001.SZ': 3}, w)
+    with open(deal_path, 'w', encoding='gbk') as w:
+        w.write('日期,时间,代码,名称,类型,注释,成交价,成交量\n')
+        w.write('2024-12-30,09:31:00,000001.SZ,平安银行,卖出,止损,12.3,100\n')
+    with open(assets_path, 'w') as w:
+        w.write('date,asset\n2024-12-30,100000.0\n')
+
+    for _ in range(2):
+        db = SqliteTradeDB(db_path)
+        db.migrate_deals(deal_path)
+        db.migrate_assets(assets_path)
+        assert db.state('held_days', migrate_path=held_path).view() == {'000001.SZ': 3}
+        db.close()
+
+    db = SqliteTradeDB(db_path)
+    deals = db.query_deals('2024-01-01', '2024-12-31')
+    assert deals['代码'].tolist() == ['000001.SZ']
+    assert db.add_asset('2024-12-31', 100500.0) == 100000.0
+    assert len(db.query_assets('2024-01-01', '2024-12-31')) == 2
+    db.close()
@@ -0,0 +1,72 @@
+import json
+import os
+
+from tools.utils_state import JournalStateStore
+
+
+def read_json(path: str) -> dict:
+    with open(path, 'r') as r:
+        return json.load(r)
+
+
+def test_recovers_from_journal_after_crash(tmp_path):
+    path = str(tmp_path / 'held_days.json')
+    store = JournalStateStore(path, compact_every=1000, compact_interval=3600)
+    store.set_items({'000001.SZ': 0, '600000.SH': 3})
+    store.del_items(['600000.SH'])
+    store.inc_all('_inc_date', '2024-12-31')
+    # 不调用 close，模拟进程崩溃：快照还是空的，日志里有全部写入
+    assert read_json(path) == {}
+
+    recovered = JournalStateStore(path)
+    assert recovered.view() == {'000001.SZ': 1, '_inc_date': '2024-12-31'}
+    assert read_json(path) == recovered.view()          # 恢复之后立即压缩
+    assert os.path.getsize(path + '.journal') == 0
+
+
+def test_ignores_torn_last_journal_line(tmp_path):
+    path = str(tmp_path / 'max_price.json')
+    store = JournalStateStore(path, compact_every=1000, compact_interval=3600)
+    store.set_items({'000001.SZ': 10.5})
+    with open(path + '.journal', 'a') as w:
+        w.write('{"op": "set", "items": {"000001.SZ": 99')   # 写到一半崩溃
+
+    recovered = JournalStateStore(path)
+    assert recovered.get('000001.SZ') == 10.5
+
+
+def test_compacts_after_threshold(tmp_path):
+    path = str(tmp_path / 'held_days.json')
+    store = JournalStateStore(path, compact_every=2, compact_interval=3600)
+    store.set_items({'a': 1})
+    assert read_json(path) == {}
+    store.set_items({'b': 2})
+    assert read_json(path) == {'a': 1, 'b': 2}
+    assert os.path.getsize(path + '.journal') == 0
+
+    store.set_items({'c': 3})
+    store.close()
+    assert read_json(path) == {'a': 1, 'b': 2, 'c': 3}
+
+
+def test_inc_all_is_idempotent_per_marker(tmp_path):
+    path = str(tmp_path / 'held_days.json')
+    store = JournalStateStore(path)
+    store.set_items({'000001.SZ': 0})
+    assert store.inc_all('_inc_date', '2024-12-31')
+    assert not store.inc_all('_inc_date', '2024-12-31')
+    assert store.get('000001.SZ') == 1
+
+    # 重放日志时同一天的 inc_all 也只生效一次
+    with open(path + '.journal', 'a') as w:
+        w.write(json.dumps({'op': 'inc_all', 'key': '_inc_date', 'value': '2024-12-31'}) + '\n')
+    assert JournalStateStore(path).get('000001.SZ') == 1
+
+
+def test_published_view_is_not_mutated_by_writes(tmp_path):
+    store = JournalStateStore(str(tmp_path / 'held_days.json'))
+    store.set_items({'a': 1})
+    view = store.view()
+    store.set_items({'b': 2})
+    assert view == {'a': 1}
+    assert store.view() == {'a': 1, 'b': 2}
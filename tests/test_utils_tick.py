@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+from tools.utils_tick import TickStore, TickJournalWriter, TickJournalReader, \
+    TICK_JOURNAL_HEADER, TICK_RECORD_DTYPE
+
+
+def make_quote(tick_time: int, price: float, volume: int) -> dict:
+    return {
+        'time': tick_time,
+        'lastPrice': price,
+        'volume': volume,
+        'askPrice': [price + 0.01],
+        'askVol': [10],
+        'bidPrice': [price - 0.01],
+        'bidVol': [20],
+    }
+
+
+def test_tick_store_append_and_view():
+    store = TickStore(capacity=2)
+    for i in range(5):  # 超过初始容量，触发扩容
+        store.append_quotes({'000001.SZ': make_quote(1000 + i, 10.0 + i, 100 * i)})
+    store.append_quotes({'600000.SH': make_quote(2000, 7.0, 1)})
+
+    assert store.codes() == ['000001.SZ', '600000.SH']
+    assert store.column('000001.SZ', 'price').tolist() == [10.0, 11.0, 12.0, 13.0, 14.0]
+    assert store.column('000001.SZ', 'time', -2).tolist() == [1003, 1004]
+    assert store.view('600000.SH')['bid_vol'].tolist() == [20]
+    assert store.column('000002.SZ', 'price') is None
+    assert not store.column('000001.SZ', 'price').flags.writeable
+
+
+def test_tick_journal_round_trip(tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    writer = TickJournalWriter(path, flush_interval=0.05)
+    writer.start()
+    writer.put({'000001.SZ': make_quote(1000, 10.0, 1), '600000.SH': make_quote(1000, 7.0, 2)})
+    writer.put({'000001.SZ': make_quote(2000, 10.5, 3)})
+    writer.close()
+
+    reader = TickJournalReader(path)
+    assert len(reader) == 3
+    assert sorted(reader.codes()) == ['000001.SZ', '600000.SH']
+    ticks = reader.load('000001.SZ')
+    assert ticks['time'].tolist() == [1000, 2000]
+    assert ticks['price'].tolist() == [10.0, 10.5]
+    assert ticks['ask_price'].tolist() == [10.01, 10.51]
+    assert reader.load('000002.SZ') is None
+
+
+def test_tick_journal_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    writer = TickJournalWriter(path, flush_interval=0.05)
+    writer.start()
+    writer.put({'000001.SZ': make_quote(1000, 10.0, 1)})
+    writer.close()
+
+    # 模拟崩溃时写了半条记录
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (TICK_RECORD_DTYPE.itemsize // 2))
+    assert len(TickJournalReader(path)) == 1   # 读取时忽略半条记录
+
+    # 重新打开时截掉半条记录，后续记录不会错位
+    writer = TickJournalWriter(path, flush_interval=0.05)
+    writer.start()
+    writer.put({'000001.SZ': make_quote(2000, 11.0, 2)})
+    writer.close()
+
+    assert (os.path.getsize(path) - TICK_JOURNAL_HEADER.itemsize) % TICK_RECORD_DTYPE.itemsize == 0
+    reader = TickJournalReader(path)
+    assert reader.load('000001.SZ')['price'].tolist() == [10.0, 11.0]
+
+
+def test_tick_journal_drops_bad_records(tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    writer = TickJournalWriter(path, flush_interval=0.05)
+    writer.start()
+    writer.put({
+        '000001.SZ': make_quote(1000, 10.0, 1),
+        'TOO_LONG_CODE.SZ': make_quote(1000, 1.0, 1),   # 超过 12 字节
+        '000002.SZ': {'time': 1000},                     # 字段缺失
+    })
+    writer.put({'000003.SZ': make_quote(2000, 3.0, 1)})
+    writer.close()
+
+    assert writer.dropped_count == 2
+    reader = TickJournalReader(path)
+    assert sorted(reader.codes()) == ['000001.SZ', '000003.SZ']
+    assert np.isclose(reader.load('000003.SZ')['price'][0], 3.0)
@@ -0,0 +1,58 @@
+import json
+import time
+
+import tools.utils_timing as utils_timing
+from tools.utils_timing import LatencyRecorder
+
+
+class FakeTime:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+
+def read_rows(path: str) -> list:
+    with open(path) as r:
+        return [json.loads(line) for line in r]
+
+
+def test_finished_minutes_written_off_thread(tmp_path, monkeypatch):
+    clock = FakeTime(1735610400.0)     # 2024-12-31 10:00（UTC+8）
+    monkeypatch.setattr(utils_timing, 'time', clock)
+    path = str(tmp_path / 'latency_{}.jsonl')
+    recorder = LatencyRecorder(path)
+
+    for ms in [1, 2, 3]:
+        recorder.record('order_sell', ms / 1000)
+    assert recorder.writer is None          # 同一分钟内不碰磁盘
+
+    clock.now += 60
+    recorder.record('order_sell', 0.005)
+    assert recorder.writer is not None      # 跨分钟交给写盘线程
+    assert [row['count'] for row in recorder.summary()] == [1]
+
+    recorder.stop()
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+    rows = read_rows(str(files[0]))
+    assert [(row['stage'], row['count'], row['max_ms']) for row in rows] == \
+        [('order_sell', 3, 3.0), ('order_sell', 1, 5.0)]
+    assert rows[0]['minute'] != rows[1]['minute']
+    assert recorder.writer is None and recorder.finished == []
+
+
+def test_without_path_discards(monkeypatch):
+    clock = FakeTime(1735610400.0)
+    monkeypatch.setattr(utils_timing, 'time', clock)
+    recorder = LatencyRecorder()
+
+    recorder.record('quote_merge', 0.001)
+    clock.now += 60
+    recorder.record('quote_merge', 0.001)
+    recorder.flush()
+    assert recorder.writer is None and recorder.finished == []
@@ -0,0 +1,130 @@
+import datetime
+import json
+import threading
+import time
+
+import pytest
+
+import delegate.xt_subscriber as xt_subscriber
+from delegate.synthetic_feed import SyntheticWholeQuote
+from delegate.xt_subscriber import XtSubscriber
+from tools.utils_clock import VirtualClock, set_virtual_clock
+
+
+class FakeStockNames:
+    def get_name(self, code: str) -> str:
+        return code
+
+
+@pytest.fixture
+def suber(tmp_path, monkeypatch):
+    monkeypatch.setattr(xt_subscriber, 'StockNames', FakeStockNames)
+    return XtSubscriber(
+        account_id='0000',
+        strategy_name='测试',
+        delegate=None,
+        path_deal=str(tmp_path / 'deal.csv'),
+        path_assets=str(tmp_path / 'assets.csv'),
+        execute_strategy=lambda *args: None,
+    )
+
+
+def quote(price: float, volume: float) -> dict:
+    return {'lastPrice': price, 'volume': volume, 'time': 0}
+
+
+def test_changed_codes_on_price_or_volume(suber):
+    assert suber.take_changed_codes('sell') is None     # 第一次没有基准
+
+    suber.merge_quotes(suber.cache_quotes, {'000001.SZ': quote(10.0, 100), '600000.SH': quote(7.0, 50)})
+    assert suber.take_changed_codes('sell') == {'000001.SZ': (None, 10.0), '600000.SH': (None, 7.0)}
+
+    # 价格不变但放量，也要重新检查
+    suber.merge_quotes(suber.cache_quotes, {'000001.SZ': quote(10.0, 300), '600000.SH': quote(7.0, 50)})
+    assert suber.take_changed_codes('sell') == {'000001.SZ': (10.0, 10.0)}
+
+    # 价格和成交量都没变
+    suber.merge_quotes(suber.cache_quotes, {'000001.SZ': quote(10.0, 300)})
+    assert suber.take_changed_codes('sell') == {}
+
+    # 同一轮多次变动只保留第一次变动前的价格
+    suber.merge_quotes(suber.cache_quotes, {'000001.SZ': quote(10.1, 400)})
+    suber.merge_quotes(suber.cache_quotes, {'000001.SZ': quote(10.2, 500)})
+    assert suber.take_changed_codes('sell') == {'000001.SZ': (10.0, 10.2)}
+
+
+def write_seeds(tmp_path) -> tuple:
+    path_sh = tmp_path / 'mktdt00.txt'
+    path_sz = tmp_path / 'sjshq.txt'
+    path_sh.write_text('\n'.join(
+        f'MD002|{code}|名称|0|0|{price}|0|0|0|{price}|' for code, price in [('600000', 7.0), ('600004', 9.0)]))
+    path_sz.write_text('\n'.join(
+        json.dumps({'code': code, 'pre_close': price, 'traded': price})
+        for code, price in [('000001.SZ', 10.0), ('000002.SZ', 8.0), ('300001.SZ', 20.0)]))
+    return str(path_sh), str(path_sz)
+
+
+def test_watched_filter_drops_unsubscribed_codes(suber, tmp_path):
+    path_sh, path_sz = write_seeds(tmp_path)
+    feed = SyntheticWholeQuote(seed=0, path_sh=path_sh, path_sz=path_sz)
+    set_virtual_clock(VirtualClock(datetime.datetime(2024, 12, 31, 10, 0, 0)))
+    try:
+        suber.update_code_list(['000001.SZ', '600000.SH'])
+        push = feed.step(feed._select(['SH', 'SZ']))    # 全推行情带着全市场的股票
+        assert len(push) == 5
+
+        suber.callback_sub_whole(push)
+    finally:
+        set_virtual_clock(None)
+
+    assert sorted(suber.cache_quotes) == ['000001.SZ', '600000.SH']
+    assert suber.quote_filter_stats == {'kept': 2, 'dropped': 3}
+
+    suber.update_code_list(['SH', 'SZ'])                 # 市场代码按全市场处理，不过滤
+    assert len(suber.filter_quotes(push)) == 5
+
+
+def test_strategy_worker_coalesces_triggers(tmp_path, monkeypatch):
+    monkeypatch.setattr(xt_subscriber, 'StockNames', FakeStockNames)
+    entered = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def execute_strategy(curr_date, curr_time, curr_seconds, curr_quotes):
+        runs.append((curr_seconds, {code: quote['lastPrice'] for code, quote in curr_quotes.items()}))
+        entered.set()
+        release.wait(5)
+        return False
+
+    suber = XtSubscriber(
+        account_id='0000',
+        strategy_name='测试',
+        delegate=None,
+        path_deal=str(tmp_path / 'deal.csv'),
+        path_assets=str(tmp_path / 'assets.csv'),
+        execute_strategy=execute_strategy,
+        open_strategy_worker=True,
+    )
+
+    def push(quotes: dict, curr_seconds: str) -> None:
+        with suber.lock_quotes_update:
+            suber.pending_quotes.update(quotes)
+        suber.notify_strategy_worker('2024-12-31', '10:00', curr_seconds)
+
+    push({'000001.SZ': quote(10.0, 100)}, '01')
+    assert entered.wait(5)
+
+    # 策略还在执行，期间的推送只进前台缓冲，触发只保留最新一次
+    push({'000001.SZ': quote(10.1, 200)}, '02')
+    push({'600000.SH': quote(7.0, 50)}, '03')
+    assert runs == [('01', {'000001.SZ': 10.0})]
+    release.set()
+
+    for _ in range(500):
+        if suber.strategy_stats['runs'] >= 2:
+            break
+        time.sleep(0.01)
+    assert runs[1] == ('03', {'000001.SZ': 10.1, '600000.SH': 7.0})
+    assert suber.strategy_stats['runs'] == 2
+    assert suber.strategy_stats['coalesced'] == 1
+    assert suber.strategy_stats['overruns'] == 2
@@ -0,0 +1,157 @@
+import datetime
+from typing import Dict, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+# 分钟线列存储的字段与类型
+BAR_COLUMNS = {
+    'minute': np.int32,         # K线开始的分钟数，从零点算起，例如 09:30 为 570
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64,         # K线内成交量（手）
+    'amount': np.float64,       # K线内成交额
+}
+
+MORNING_OPEN = 9 * 60 + 30      # 09:30
+MORNING_CLOSE = 11 * 60 + 30    # 11:30
+NOON_OPEN = 13 * 60             # 13:00
+NOON_CLOSE = 15 * 60            # 15:00
+
+
+# 把 tick 所在的分钟归到交易时段内的某一根 K线，返回 K线开始的分钟数
+# 集合竞价归入第一根，11:30 和 15:00 收盘那一笔归入最后一根
+def get_bar_minute(minute: int, period: int) -> int:
+    if minute < NOON_OPEN:
+        session_open = MORNING_OPEN
+        minute = min(max(minute, MORNING_OPEN), MORNING_CLOSE - 1)
+    else:
+        session_open = NOON_OPEN
+        minute = min(minute, NOON_CLOSE - 1)
+    return session_open + (minute - session_open) // period * period
+
+
+def minute_to_time(minute: int) -> str:
+    return f'{minute // 60:02d}:{minute % 60:02d}'
+
+
+# ================
+# 单个股票单个周期的分钟线
+# ================
+class BarSeries:
+    def __init__(self, period: int, capacity: int = 256):
+        self.period = period                        # K线周期，单位（分钟）
+        self.size = 0
+        self.capacity = capacity
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(capacity, dtype=dtype)
+            for name, dtype in BAR_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            new_column = np.empty(self.capacity, dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            self.columns[name] = new_column
+
+    # 用一笔成交更新：同一根K线内只改高低收和量额，跨K线时新开一根
+    def update(self, minute: int, price: float, volume: int, amount: float) -> None:
+        bar_minute = get_bar_minute(minute, self.period)
+        columns = self.columns
+        i = self.size - 1
+
+        if i >= 0 and columns['minute'][i] == bar_minute:
+            if price > columns['high'][i]:
+                columns['high'][i] = price
+            if price < columns['low'][i]:
+                columns['low'][i] = price
+            columns['close'][i] = price
+            columns['volume'][i] += volume
+            columns['amount'][i] += amount
+            return
+
+        if self.size >= self.capacity:
+            self._grow()
+
+        i = self.size
+        columns['minute'][i] = bar_minute
+        columns['open'][i] = price
+        columns['high'][i] = price
+        columns['low'][i] = price
+        columns['close'][i] = price
+        columns['volume'][i] = volume
+        columns['amount'][i] = amount
+        self.size = i + 1
+
+    # 零拷贝取出某一列，最后一根是还没走完的K线
+    def column(self, name: str, start: Optional[int] = None, stop: Optional[int] = None) -> np.ndarray:
+        view = self.columns[name][:self.size][start:stop]
+        view.flags.writeable = False
+        return view
+
+    # 转成和日线 history 相同列名的 DataFrame，方便直接套用 MyTT 指标
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame({name: self.columns[name][:self.size].copy() for name in BAR_COLUMNS})
+        df.insert(0, 'datetime', [minute_to_time(int(m)) for m in df.pop('minute')])
+        return df
+
+
+# ================
+# 全部股票的分钟线，由行情推送增量聚合
+# ================
+class BarStore:
+    def __init__(self, periods: Iterable[int] = (1, 5)):
+        self.periods: List[int] = sorted(set(periods))
+        self.bars: Dict[str, Dict[int, BarSeries]] = {}         # { code: { period: BarSeries } }
+        self.last_totals: Dict[str, tuple] = {}                 # { code: (累计成交量, 累计成交额) }
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.bars
+
+    def clear(self) -> None:
+        self.bars.clear()
+        self.last_totals.clear()
+
+    def get(self, code: str) -> Optional[Dict[int, BarSeries]]:
+        return self.bars.get(code)
+
+    def get_series(self, code: str, period: int) -> Optional[BarSeries]:
+        if code in self.bars:
+            return self.bars[code].get(period)
+        return None
+
+    # 行情回调使用的写入接口，quotes 格式同 xtdata.subscribe_whole_quote 的推送
+    # 推送里是当日累计的成交量和成交额，与上一笔相减得到这一笔的量额
+    def update_quotes(self, quotes: Dict[str, Dict]) -> None:
+        bars = self.bars
+        last_totals = self.last_totals
+        for code in quotes:
+            quote = quotes[code]
+            price = quote['lastPrice']
+            if price <= 0:
+                continue
+
+            total_volume = quote['volume']
+            total_amount = quote['amount']
+            prev_volume, prev_amount = last_totals.get(code, (0, 0.0))
+            if total_volume < prev_volume:
+                continue  # 乱序的旧推送
+            last_totals[code] = (total_volume, total_amount)
+
+            tick_time = datetime.datetime.fromtimestamp(quote['time'] / 1000)
+            minute = tick_time.hour * 60 + tick_time.minute
+
+            if code not in bars:
+                bars[code] = {period: BarSeries(period) for period in self.periods}
+            for series in bars[code].values():
+                series.update(minute, price, total_volume - prev_volume, total_amount - prev_amount)
@@ -10,10 +10,16 @@ import pandas as pd
 import akshare as ak
 
 from tools.utils_basic import symbol_to_code
+from tools.utils_calendar import get_trading_calendar
+from tools.utils_spot import get_spot_snapshot
+from tools.utils_timing import latency_timed
 
 trade_day_cache = {}
 trade_max_year_key = 'max_year'
-TRADE_DAY_CACHE_PATH = '_cache/_open_day_list_sina.csv'
+STOCK_NAMES_CACHE_PATH = '_cache/_stock_names.pkl'
+
+# 状态文件路径 -> 常驻内存的存储后端，注册过的路径不再每次读写 json 文件
+state_backends = {}
 
 
 # 指数常量
@@ -36,9 +42,14 @@ class IndexSymbol:
 
 
 # 查询股票名称
+# 第一次查询时才加载：优先读磁盘缓存，没有缓存时只解析本地行情文件，启动过程不访问网络
+# 缓存不是当天的则在后台线程从网络刷新并落盘
 class StockNames:
     _instance = None
     _data = None
+    _date = ''                  # 缓存的刷新日期
+    _lock = threading.Lock()
+    _refreshing = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -47,13 +58,49 @@ class StockNames:
         return cls._instance
 
     def __init__(self):
-        if self._data is None:
-            self.load_codes_and_names()
+        pass
 
     def load_codes_and_names(self):
-        print('Loading codes and names...', end='')
-        self._data = get_stock_codes_and_names()
-        print('Complete!')
+        with StockNames._lock:
+            if StockNames._data is not None:
+                return
+
+            cache = load_pickle(STOCK_NAMES_CACHE_PATH)
+            if cache is not None:
+                StockNames._data = cache['names']
+                StockNames._date = cache['date']
+            else:
+                StockNames._data = get_local_codes_and_names()
+
+        if StockNames._date != datetime.datetime.now().strftime('%Y-%m-%d'):
+            self.refresh_in_background()
+
+    # 从网络刷新并写入磁盘缓存，失败时保留原来的数据
+    def refresh(self):
+        try:
+            data = get_stock_codes_and_names()
+        except Exception as e:
+            print(f'[刷新股票名称失败:{e}]')
+            return
+
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        save_pickle(STOCK_NAMES_CACHE_PATH, {'date': today, 'names': data})
+        StockNames._data = data
+        StockNames._date = today
+
+    def refresh_in_background(self):
+        with StockNames._lock:
+            if StockNames._refreshing:
+                return
+            StockNames._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                StockNames._refreshing = False
+
+        threading.Thread(target=run, name='stock-names-refresh', daemon=True).start()
 
     def get_name(self, code) -> str:
         if self._data is None:
@@ -64,26 +111,33 @@ class StockNames:
         return '[Unknown]'
 
 
+# 从本地行情文件读取股票名称，不访问网络
+def get_local_codes_and_names() -> Dict[str, str]:
+    ans = {}
+
+    if os.path.exists('./_data/mktdt00.txt'):
+        with open('./_data/mktdt00.txt', 'r', errors='replace') as r:
+            lines = r.readlines()
+            for line in lines:
+                arr = line.split('|')
+                if len(arr) > 2 and len(arr[1]) == 6:
+                    ans[arr[1] + '.SH'] = arr[2]
+
+    if os.path.exists('./_data/sjshq.txt'):
+        with open('./_data/sjshq.txt', 'r', encoding='utf-8', errors='replace') as r:
+            lines = r.readlines()
+            for line in lines:
+                arr = json.loads(line)
+                ans[arr['code']] = arr['name']
+
+    return ans
+
+
 # 获取股票的中文名称
 def get_stock_codes_and_names() -> Dict[str, str]:
-    ans = {}
+    ans = get_local_codes_and_names()
 
-    with open('./_data/mktdt00.txt', 'r', errors='replace') as r:
-        lines = r.readlines()
-        for line in lines:
-            arr = line.split('|')
-            if len(arr) > 2 and len(arr[1]) == 6:
-                ans[arr[1] + '.SH'] = arr[2]
-
-    with open('./_data/sjshq.txt', 'r', encoding='utf-8', errors='replace') as r:
-        lines = r.readlines()
-        for line in lines:
-            arr = json.loads(line)
-            ans[arr['code']] = arr['name']
-
-    df = ak.stock_zh_a_spot_em()
-    df['代码'] = df['代码'].apply(lambda x: symbol_to_code(x))
-    ans.update(dict(zip(df['代码'], df['名称'])))
+    ans.update(get_spot_snapshot().code_names())
     return ans
 
 
@@ -126,8 +180,54 @@ def save_json(path: str, var: dict) -> None:
         w.write(json.dumps(var, indent=4))
 
 
+# ==========
+# 持仓状态存储后端
+# ==========
+
+
+# 把状态文件交给存储后端管理，例如 JournalStateStore(PATH_HELD)
+def register_state_backend(path: str, backend) -> None:
+    state_backends[path] = backend
+
+
+# 进程退出前压缩快照并关闭
+def close_state_backends() -> None:
+    for backend in state_backends.values():
+        backend.close()
+    state_backends.clear()
+
+
+# 持仓天数、最高价、成交记录、资产记录都交给同一个 SQLite 库，第一次打开时导入原来的 json 和 csv
+def register_sqlite_backends(db, path_held: str, path_maxp: str, path_deal: str, path_assets: str) -> None:
+    db.migrate_deals(path_deal)
+    db.migrate_assets(path_assets)
+    register_state_backend(path_held, db.state('held_days', migrate_path=path_held))
+    register_state_backend(path_maxp, db.state('max_prices', migrate_path=path_maxp))
+    register_state_backend(path_deal, db)
+    register_state_backend(path_assets, db)
+
+
+# 读取状态，注册过后端的返回副本，可以随意修改
+def load_state(path: str) -> dict:
+    if path in state_backends:
+        return dict(state_backends[path].view())
+    return load_json(path)
+
+
+# 存储状态，全覆盖写入
+def save_state(path: str, var: dict) -> None:
+    if path in state_backends:
+        state_backends[path].replace(var)
+    else:
+        save_json(path, var)
+
+
 # 删除json缓存中的单个key-value，key为字符串
 def del_key(lock: threading.Lock, path: str, key: str) -> None:
+    if path in state_backends:
+        state_backends[path].del_items([key])
+        return
+
     with lock:
         temp_json = load_json(path)
         if key in temp_json:
@@ -137,6 +237,10 @@ def del_key(lock: threading.Lock, path: str, key: str) -> None:
 
 # 删除json缓存中的多个个key-value，key为字符串
 def del_keys(lock: threading.Lock, path: str, keys: List[str]) -> None:
+    if path in state_backends:
+        state_backends[path].del_items(keys)
+        return
+
     with lock:
         temp_json = load_json(path)
         for key in keys:
@@ -147,12 +251,18 @@ def del_keys(lock: threading.Lock, path: str, keys: List[str]) -> None:
 
 # 所有缓存持仓天数+1，_inc_date为单日判重标记位
 def all_held_inc(held_operation_lock: threading.Lock, path: str) -> bool:
+    today = datetime.datetime.now().strftime('%Y-%m-%d')
+    inc_date_key = '_inc_date'
+
+    if path in state_backends:
+        try:
+            return state_backends[path].inc_all(inc_date_key, today)
+        except:
+            return False
+
     with held_operation_lock:
         held_days = load_json(path)
 
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        inc_date_key = '_inc_date'
-
         try:
             if (inc_date_key not in held_days) or (held_days[inc_date_key] != today):
                 held_days[inc_date_key] = today
@@ -170,6 +280,10 @@ def all_held_inc(held_operation_lock: threading.Lock, path: str) -> bool:
 
 # 增加新的持仓记录
 def new_held(held_operation_lock: threading.Lock, path: str, codes: List[str]) -> None:
+    if path in state_backends:
+        state_backends[path].set_items({code: 0 for code in codes})
+        return
+
     with held_operation_lock:
         held_days = load_json(path)
         for code in codes:
@@ -178,6 +292,7 @@ def new_held(held_operation_lock: threading.Lock, path: str, codes: List[str]) -
 
 
 # 更新持仓股买入开始最高价格
+@latency_timed('update_max_prices')
 def update_max_prices(
     lock: threading.Lock,
     quotes: dict,
@@ -186,13 +301,21 @@ def update_max_prices(
     path_held_days: str,
     ignore_open_day: bool = True,  # 是否忽略开仓日，从次日开始计算最高价
 ):
-    held_days = load_json(path_held_days)
+    # 注册了存储后端时直接读内存里的只读字典
+    if path_held_days in state_backends:
+        held_days = state_backends[path_held_days].view()
+    else:
+        held_days = load_json(path_held_days)
 
-    with lock:
-        max_prices = load_json(path_max_prices)
+    backend = state_backends.get(path_max_prices)
+    if backend is not None:
+        max_prices = backend.view()
+    else:
+        with lock:
+            max_prices = load_json(path_max_prices)
 
     # 更新历史最高
-    updated = False
+    changes = {}
     for position in positions:
         code = position.stock_code
         if code in held_days:  # 只更新持仓超过一天的
@@ -206,15 +329,18 @@ def update_max_prices(
 
                 if code in max_prices:
                     if max_prices[code] < high_price:
-                        max_prices[code] = round(high_price, 3)
-                        updated = True
+                        changes[code] = round(high_price, 3)
                 else:
-                    max_prices[code] = round(high_price, 3)
-                    updated = True
+                    changes[code] = round(high_price, 3)
 
-    if updated:
-        with lock:
-            save_json(path_max_prices, max_prices)
+    if len(changes) > 0:
+        if backend is not None:
+            backend.set_items(changes)
+            max_prices = backend.view()
+        else:
+            max_prices.update(changes)
+            with lock:
+                save_json(path_max_prices, max_prices)
 
     return max_prices, held_days
 
@@ -247,6 +373,10 @@ def record_deal(
     price: float,
     volume: int,
 ):
+    if path in state_backends:
+        state_backends[path].record_deal(timestamp, code, name, order_type, remark, price, volume)
+        return
+
     with lock:
         if not os.path.exists(path):
             with open(path, 'w') as w:
@@ -263,8 +393,26 @@ def record_deal(
             ])
 
 
+# 读取日期区间内的成交记录，日期格式 %Y-%m-%d，包含两端
+def load_deals(path: str, start: str, end: str) -> pd.DataFrame:
+    if path in state_backends:
+        return state_backends[path].query_deals(start, end)
+
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['日期', '时间', '代码', '名称', '类型', '注释', '成交价', '成交量'])
+
+    df = pd.read_csv(path, encoding='gbk')
+    if '日期' in df.columns:
+        df = df[(df['日期'] >= start) & (df['日期'] <= end)]
+    return df
+
+
 # 获取总仓位价格增幅
 def get_total_asset_increase(path_assets: str, curr_date: str, curr_asset: float) -> Optional[float]:
+    if path_assets in state_backends:
+        prev_asset = state_backends[path_assets].add_asset(curr_date, curr_asset)
+        return curr_asset - prev_asset if prev_asset is not None else None
+
     if os.path.exists(path_assets):
         df = pd.read_csv(path_assets)
         prev_asset = df.tail(1)['asset'].values[0]
@@ -284,18 +432,30 @@ def get_total_asset_increase(path_assets: str, curr_date: str, curr_asset: float
 
 # 获取磁盘缓存的交易日列表
 def get_disk_trade_day_list_and_update_max_year() -> list:
-    # 读磁盘，这里可以有内存缓存的速度优化
-    df = pd.read_csv(TRADE_DAY_CACHE_PATH)
-    trade_dates = pd.to_datetime(df['trade_date']).dt.strftime('%Y-%m-%d').values
-    trade_day_cache[trade_max_year_key] = trade_dates[-1][:4]
-    return trade_dates
+    calendar = get_trading_calendar()
+    trade_day_cache[trade_max_year_key] = calendar.max_year
+    return calendar.days
 
 
 # 获取前n个交易日，返回格式 %Y%m%d
-def get_prev_trading_date(now: datetime.datetime, count: int) -> str:
-    trading_day_list = get_disk_trade_day_list_and_update_max_year()
-    trading_index = list(trading_day_list).index(now.strftime('%Y-%m-%d'))
-    return trading_day_list[trading_index - count].replace('-', '')
+def get_prev_trading_date(now: datetime.datetime, count: int) -> Optional[str]:
+    calendar = get_trading_calendar()
+    curr_date = now.strftime('%Y-%m-%d')
+
+    prev_date = calendar.prev(curr_date, count) if calendar.covers(curr_date) else None
+    if prev_date is None:
+        # 日历没覆盖到今年或者往前不够 count 天时刷新一次再查
+        try:
+            calendar.refresh()
+        except Exception as e:
+            print(f'[刷新交易日历失败:{e}]')
+        prev_date = calendar.prev(curr_date, count) if calendar.covers(curr_date) else None
+
+    if prev_date is None:
+        # 不按工作日估算，节假日前后会取错窗口，交给调用方放弃本次任务
+        print(f'[交易日历缺少 {curr_date} 前{count}个交易日]')
+        return None
+    return prev_date.replace('-', '')
 
 
 # 检查当日是否是交易日，使用sina数据源
@@ -303,33 +463,17 @@ def check_today_is_open_day_sina(curr_date: str) -> bool:
     """
     curr_date example: '2024-12-31'
     """
-    curr_year = curr_date[:4]
-
-    # 内存缓存
-    if curr_date in trade_day_cache:
-        if curr_year <= trade_day_cache[trade_max_year_key]:
-            return trade_day_cache[curr_date]
-
-    # 文件缓存
-    if os.path.exists(TRADE_DAY_CACHE_PATH):  # 文件缓存存在
-        trade_day_list = get_disk_trade_day_list_and_update_max_year()
-        if curr_year <= trade_day_cache[trade_max_year_key]:  # 未过期
-            ans = curr_date in trade_day_list
-            trade_day_cache[curr_date] = ans
-            print(f'[{curr_date} is {ans} trade day in memory]')
-            return ans
-
-    # 网络缓存
-    df = ak.tool_trade_date_hist_sina()
-    df.to_csv(TRADE_DAY_CACHE_PATH)
-    print(f'Cache trade day list {curr_year} - {int(curr_year) + 1} in {TRADE_DAY_CACHE_PATH}.')
-
-    trade_day_list = get_disk_trade_day_list_and_update_max_year()
-    if curr_year <= trade_day_cache[trade_max_year_key]:  # 未过期
-        ans = curr_date in trade_day_list
-        trade_day_cache[curr_date] = ans
-        print(f'[{curr_date} is {ans} trade day in memory]')
-        return ans
+    calendar = get_trading_calendar()
+
+    # 文件缓存不存在或者已过期，从网络刷新
+    if not calendar.covers(curr_date):
+        try:
+            calendar.refresh()
+        except Exception as e:
+            print(f'[刷新交易日历失败:{e}]')
+
+    if calendar.covers(curr_date):
+        return calendar.is_open(curr_date)
 
     # 实在拿不到数据默认为True
     print(f'[DO NOT KNOW {curr_date}, default to True trade day]')
@@ -362,12 +506,7 @@ def get_index_constituent_codes(index_symbol: str) -> list:
 
 # 获取市值符合范围的code列表
 def get_market_value_limited_codes(code_prefixes: Set[str], min_value: int, max_value: int) -> list[str]:
-    df = ak.stock_zh_a_spot_em()
-    df = df.sort_values('代码')
-    df = df[['代码', '名称', '总市值', '流通市值']]
-    df = df[(min_value < df['总市值']) & (df['总市值'] < max_value)]
-    df = df[df['代码'].str.startswith(tuple(code_prefixes))]
-    return [symbol_to_code(symbol) for symbol in list(df['代码'].values)]
+    return get_spot_snapshot().market_value_limited_codes(code_prefixes, min_value, max_value)
 
 
 # 根据两位数前缀获取股票列表
@@ -375,17 +514,9 @@ def get_prefixes_stock_codes(prefixes: Set[str]) -> List[str]:
     """
     prefixes: 六位数的两位数前缀
     """
-    df = ak.stock_zh_a_spot_em()
-    return [
-        symbol_to_code(symbol)
-        for symbol in df['代码'].values
-        if symbol[:2] in prefixes
-    ]
+    return get_spot_snapshot().codes_with_prefixes(prefixes)
 
 
 # 获取流通市值，单位（元）
 def get_stock_codes_and_circulation_mv() -> Dict[str, int]:
-    df = ak.stock_zh_a_spot_em()
-    df['代码'] = df['代码'].apply(lambda x: symbol_to_code(x))
-    df = df[['代码', '流通市值']].dropna()
-    return dict(zip(df['代码'], df['流通市值']))
+    return get_spot_snapshot().circulation_mv()
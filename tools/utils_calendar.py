@@ -0,0 +1,140 @@
+import os
+import bisect
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+TRADE_DAY_CACHE_PATH = '_cache/_open_day_list_sina.csv'
+
+# 交易日内的时段：开盘集合竞价、上午连续竞价、下午连续竞价（含收盘集合竞价）
+SESSION_TIMES = [('09:15', '09:25'), ('09:30', '11:30'), ('13:00', '15:00')]
+
+
+# '%Y%m%d' 或 '%Y-%m-%d' 统一成 '%Y-%m-%d'
+def _normalize(date: str) -> str:
+    if len(date) == 8:
+        return f'{date[:4]}-{date[4:6]}-{date[6:]}'
+    return date[:10]
+
+
+# ================================
+# 交易日历：启动时加载一次，判断交易日 O(1)，前后推算 O(log n)
+# 除了 refresh() 之外不访问网络
+# ================================
+class TradingCalendar:
+    def __init__(self, csv_path: str = TRADE_DAY_CACHE_PATH):
+        self.csv_path = csv_path                        # 新浪交易日历的 csv 缓存
+        self.bin_path = os.path.splitext(csv_path)[0] + '.npy'  # 紧凑的二进制缓存，int32 的 %Y%m%d
+        self.days: List[str] = []                       # 升序的交易日，格式 %Y-%m-%d
+        self.index: Dict[str, int] = {}                 # 交易日 -> 在 days 里的下标
+        self.max_year = ''                              # 日历覆盖到的最后一年
+        self.lock = threading.Lock()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __contains__(self, date: str) -> bool:
+        return self.is_open(date)
+
+    def _set_days(self, days: List[str]) -> None:
+        self.days = days
+        self.index = {day: i for i, day in enumerate(days)}
+        self.max_year = days[-1][:4] if len(days) > 0 else ''
+
+    # 优先读二进制缓存，csv 更新过时重新生成
+    def load(self) -> None:
+        with self.lock:
+            if os.path.exists(self.bin_path) and (
+                    not os.path.exists(self.csv_path)
+                    or os.path.getmtime(self.bin_path) >= os.path.getmtime(self.csv_path)):
+                values = np.load(self.bin_path)
+                self._set_days([f'{v // 10000:04d}-{v // 100 % 100:02d}-{v % 100:02d}' for v in values.tolist()])
+                return
+
+            if not os.path.exists(self.csv_path):
+                self._set_days([])
+                return
+
+            df = pd.read_csv(self.csv_path)
+            days = sorted(pd.to_datetime(df['trade_date']).dt.strftime('%Y-%m-%d').values.tolist())
+            self._set_days(days)
+            self._save_bin()
+
+    def _save_bin(self) -> None:
+        values = np.array([int(day.replace('-', '')) for day in self.days], dtype=np.int32)
+        with open(self.bin_path, 'wb') as w:
+            np.save(w, values)
+
+    # 显式从网络刷新，一般在日历快要过期时调用
+    def refresh(self) -> None:
+        import akshare as ak
+        df = ak.tool_trade_date_hist_sina()
+        os.makedirs(os.path.dirname(self.csv_path) or '.', exist_ok=True)
+        df.to_csv(self.csv_path)
+        print(f'Cache trade day list until {str(df["trade_date"].values[-1])[:4]} in {self.csv_path}.')
+        with self.lock:
+            self._set_days(sorted(pd.to_datetime(df['trade_date']).dt.strftime('%Y-%m-%d').values.tolist()))
+            self._save_bin()
+
+    # 日历是否覆盖到这一天所在的年份，没覆盖时 is_open 的结果不可信
+    def covers(self, date: str) -> bool:
+        return len(self.days) > 0 and _normalize(date)[:4] <= self.max_year
+
+    def is_open(self, date: str) -> bool:
+        return _normalize(date) in self.index
+
+    # 之前第 n 个交易日，date 本身不算
+    def prev(self, date: str, n: int = 1) -> Optional[str]:
+        i = bisect.bisect_left(self.days, _normalize(date)) - n
+        return self.days[i] if 0 <= i < len(self.days) else None
+
+    # 之后第 n 个交易日，date 本身不算
+    def next(self, date: str, n: int = 1) -> Optional[str]:
+        i = bisect.bisect_right(self.days, _normalize(date)) + n - 1
+        return self.days[i] if 0 <= i < len(self.days) else None
+
+    # [start, end] 之间的交易日
+    def range(self, start: str, end: str) -> List[str]:
+        i = bisect.bisect_left(self.days, _normalize(start))
+        j = bisect.bisect_right(self.days, _normalize(end))
+        return self.days[i:j]
+
+    # (start, end] 之间的交易日数量
+    def count_after(self, start: str, end: str) -> int:
+        i = bisect.bisect_right(self.days, _normalize(start))
+        j = bisect.bisect_right(self.days, _normalize(end))
+        return max(0, j - i)
+
+    # 交易日的各个时段，非交易日返回空列表
+    def sessions(self, date: str) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+        date = _normalize(date)
+        if not self.is_open(date):
+            return []
+        return [(
+            datetime.datetime.strptime(f'{date} {start}', '%Y-%m-%d %H:%M'),
+            datetime.datetime.strptime(f'{date} {end}', '%Y-%m-%d %H:%M'),
+        ) for start, end in SESSION_TIMES]
+
+    def in_session(self, now: datetime.datetime) -> bool:
+        if not self.is_open(now.strftime('%Y-%m-%d')):
+            return False
+        curr_time = now.strftime('%H:%M')
+        return any(start <= curr_time < end for start, end in SESSION_TIMES)
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+# 进程内共用一个日历
+def get_trading_calendar() -> TradingCalendar:
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = TradingCalendar()
+    return _calendar
@@ -0,0 +1,100 @@
+import time
+import datetime
+import functools
+from typing import List, Optional, Tuple
+
+
+# ================
+# 可替换的当前时间
+# ================
+class VirtualClock:
+    def __init__(self, start: datetime.datetime):
+        self.curr = start
+
+    def set(self, curr: datetime.datetime) -> None:
+        self.curr = curr
+
+    def now(self) -> datetime.datetime:
+        return self.curr
+
+
+_virtual_clock: Optional[VirtualClock] = None
+
+
+# 安装虚拟时钟，传 None 恢复使用系统时间
+def set_virtual_clock(clock: Optional[VirtualClock]) -> None:
+    global _virtual_clock
+    _virtual_clock = clock
+
+
+# 盘中逻辑统一用这个取当前时间，回放时由虚拟时钟接管
+def clock_now() -> datetime.datetime:
+    if _virtual_clock is not None:
+        return _virtual_clock.now()
+    return datetime.datetime.now()
+
+
+# 计算执行间隔用的时钟，单位（秒）；回放时按虚拟时钟走，和实盘的节奏一致
+def clock_monotonic() -> float:
+    if _virtual_clock is not None:
+        return _virtual_clock.now().timestamp()
+    return time.monotonic()
+
+
+# ================
+# 整数交易时钟
+# ================
+MINUTE_STRINGS = [f'{m // 60:02d}:{m % 60:02d}' for m in range(24 * 60)]    # 分钟数 -> '%H:%M'
+SECOND_STRINGS = [f'{s:02d}' for s in range(60)]                             # 秒数 -> '%S'
+TRADING_SESSIONS = [(9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60)]         # 连续竞价时段，单位（分钟）
+
+
+@functools.lru_cache(maxsize=16)
+def _format_date(date: datetime.date) -> str:
+    return date.strftime('%Y-%m-%d')
+
+
+# 兼容字符串接口：'%H:%M' 或 '%H:%M:%S' 转成当日的分钟数，结果缓存
+@functools.lru_cache(maxsize=4096)
+def get_time_minute(curr_time: str) -> int:
+    return int(curr_time[:2]) * 60 + int(curr_time[3:5])
+
+
+# 把配置里的 ['09:31', '14:57'] 编译成分钟数的左闭右开区间，inclusive_end 表示结束那一分钟也算在内
+def compile_time_range(time_range: List[str], inclusive_end: bool = False) -> Tuple[int, int]:
+    start = get_time_minute(time_range[0])
+    end = get_time_minute(time_range[1])
+    return start, end + 1 if inclusive_end else end
+
+
+def compile_time_ranges(time_ranges: List[List[str]], inclusive_end: bool = False) -> List[Tuple[int, int]]:
+    return [compile_time_range(time_range, inclusive_end) for time_range in time_ranges]
+
+
+def in_minute_ranges(minute: int, minute_ranges: List[Tuple[int, int]]) -> bool:
+    for start, end in minute_ranges:
+        if start <= minute < end:
+            return True
+    return False
+
+
+# 所在的连续竞价时段下标，不在交易时段返回 -1
+def get_session_index(minute: int) -> int:
+    for i, (start, end) in enumerate(TRADING_SESSIONS):
+        if start <= minute < end:
+            return i
+    return -1
+
+
+# 每次行情回调只计算一次的时间，整数字段用于比较，字符串字段兼容旧接口
+class TradingClock:
+    def __init__(self, now: datetime.datetime):
+        self.now = now
+        self.minute = now.hour * 60 + now.minute        # 当日分钟数
+        self.second = now.second
+        self.day_seconds = self.minute * 60 + self.second
+        self.session = get_session_index(self.minute)
+
+        self.date = _format_date(now.date())            # '%Y-%m-%d'
+        self.time = MINUTE_STRINGS[self.minute]         # '%H:%M'
+        self.seconds = SECOND_STRINGS[self.second]      # '%S'
@@ -0,0 +1,100 @@
+import math
+from typing import Dict, Tuple
+
+import numpy as np
+
+from mytt.MyTT import CCI, WR, EMA, RD
+
+
+# ================================
+# 日内滚动指标：盘前用历史日线算好前缀状态，盘中只更新"今天"这一根
+# 结果与在 history 后面拼接当日K线再用 MyTT 全量计算一致
+# ================================
+class RollingIndicators:
+    def __init__(
+        self,
+        history,                # DataFrame 或 PanelHistory，至少有 close / high / low
+        cci_n: int = 14,
+        wr_n: int = 14,
+        macd_short: int = 12,
+        macd_long: int = 26,
+        macd_m: int = 9,
+    ):
+        self.source = history   # 记下来源，history 换了说明重新下载过，需要重建
+        close = np.asarray(history['close'].values, dtype=np.float64)
+        high = np.asarray(history['high'].values, dtype=np.float64)
+        low = np.asarray(history['low'].values, dtype=np.float64)
+        self.close = close
+        self.length = len(close)
+
+        self.last_close = close[-1] if self.length > 0 else math.nan
+        self.last_high = high[-1] if self.length > 0 else math.nan
+        self.last_low = low[-1] if self.length > 0 else math.nan
+
+        # MA：按需缓存最近 N-1 天收盘价之和
+        self.ma_sums: Dict[int, float] = {}
+
+        # CCI：最近 N-1 天的典型价，以及昨天的 CCI
+        self.cci_n = cci_n
+        tp = (high + low + close) / 3
+        self.cci_tail = [float(v) for v in tp[-(cci_n - 1):]] if self.length >= cci_n - 1 else None
+        self.cci_prev = float(CCI(close, high, low, cci_n)[-1]) if self.length > 0 else math.nan
+
+        # WR：最近 N-1 天的最高价和最低价，以及昨天的 WR
+        self.wr_n = wr_n
+        self.wr_high = float(high[-(wr_n - 1):].max()) if self.length >= wr_n - 1 else None
+        self.wr_low = float(low[-(wr_n - 1):].min()) if self.length >= wr_n - 1 else None
+        self.wr_prev = float(WR(close, high, low, wr_n)[-1]) if self.length > 0 else math.nan
+
+        # MACD：昨天的两条 EMA 和 DEA，以及昨天的 MACD 柱
+        self.macd_alpha_short = 2 / (macd_short + 1)
+        self.macd_alpha_long = 2 / (macd_long + 1)
+        self.macd_alpha_m = 2 / (macd_m + 1)
+        if self.length > 0:
+            ema_short = EMA(close, macd_short)
+            ema_long = EMA(close, macd_long)
+            dif = ema_short - ema_long
+            dea = EMA(dif, macd_m)
+            self.ema_short = float(ema_short[-1])
+            self.ema_long = float(ema_long[-1])
+            self.dea = float(dea[-1])
+            self.macd_prev = float(RD((dif[-1] - dea[-1]) * 2))
+        else:
+            self.ema_short = self.ema_long = self.dea = self.macd_prev = math.nan
+
+    # 含今天在内的 N 日均线
+    def ma(self, n: int, curr_price: float) -> float:
+        if self.length < n - 1:
+            return math.nan
+        if n not in self.ma_sums:
+            self.ma_sums[n] = float(self.close[self.length - (n - 1):].sum()) if n > 1 else 0.0
+        return (self.ma_sums[n] + curr_price) / n
+
+    # (昨天的 CCI, 今天的 CCI)
+    def cci(self, curr_price: float, curr_high: float, curr_low: float) -> Tuple[float, float]:
+        if self.cci_tail is None:
+            return self.cci_prev, math.nan
+        values = self.cci_tail + [(curr_high + curr_low + curr_price) / 3]
+        mean = sum(values) / self.cci_n
+        avedev = sum(abs(v - mean) for v in values) / self.cci_n
+        if avedev == 0:
+            return self.cci_prev, math.nan
+        return self.cci_prev, (values[-1] - mean) / (0.015 * avedev)
+
+    # (昨天的 WR, 今天的 WR)
+    def wr(self, curr_price: float, curr_high: float, curr_low: float) -> Tuple[float, float]:
+        if self.wr_high is None:
+            return self.wr_prev, math.nan
+        hhv = max(self.wr_high, curr_high)
+        llv = min(self.wr_low, curr_low)
+        if hhv == llv:
+            return self.wr_prev, math.nan
+        return self.wr_prev, float(RD((hhv - curr_price) / (hhv - llv) * 100))
+
+    # (昨天的 MACD 柱, 今天的 MACD 柱)
+    def macd(self, curr_price: float) -> Tuple[float, float]:
+        ema_short = self.ema_short + self.macd_alpha_short * (curr_price - self.ema_short)
+        ema_long = self.ema_long + self.macd_alpha_long * (curr_price - self.ema_long)
+        dif = ema_short - ema_long
+        dea = self.dea + self.macd_alpha_m * (dif - self.dea)
+        return self.macd_prev, float(RD((dif - dea) * 2))
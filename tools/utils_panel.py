@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Iterator
+
+import numpy as np
+import pandas as pd
+
+
+# 面板里存储的字段，顺序即第三维的下标
+PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+# ================================
+# 单个股票的日线视图，模仿 DataFrame 的常用访问方式
+# ================================
+class PanelHistory:
+    def __init__(self, panel: 'HistoryPanel', row: int):
+        self.panel = panel
+        self.row = row
+        self.start, self.stop = panel.ranges[row]
+        self.gaps = panel.gaps[row]
+
+    def __len__(self) -> int:
+        if self.gaps is not None:
+            return len(self.gaps)
+        return self.stop - self.start
+
+    @property
+    def columns(self) -> List[str]:
+        return ['datetime'] + PANEL_FIELDS
+
+    # 没有停牌缺口时是零拷贝的切片，有缺口时只能按有效日期取出副本
+    def values_of(self, name: str) -> np.ndarray:
+        if name == 'datetime':
+            dates = self.panel.dates[self.start:self.stop]
+            return dates if self.gaps is None else self.panel.dates[self.gaps]
+
+        field = self.panel.field_index[name]
+        if self.gaps is None:
+            view = self.panel.data[self.row, self.start:self.stop, field]
+            view.flags.writeable = False
+            return view
+        return self.panel.data[self.row, self.gaps, field]
+
+    def __getitem__(self, name: str) -> pd.Series:
+        return pd.Series(self.values_of(name), name=name, copy=False)
+
+    def __getattr__(self, name: str) -> pd.Series:
+        if name in PANEL_FIELDS or name == 'datetime':
+            return self[name]
+        raise AttributeError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in PANEL_FIELDS or name == 'datetime'
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: self.values_of(name) for name in self.columns})
+
+    def tail(self, n: int = 5) -> pd.DataFrame:
+        return self.to_frame().tail(n)
+
+    # 兼容卖出策略里拼接当日实时K线的写法，返回新的 DataFrame
+    def _append(self, other: Dict, ignore_index: bool = False) -> pd.DataFrame:
+        return pd.concat([self.to_frame(), pd.DataFrame([other])], ignore_index=ignore_index)
+
+
+# ================================
+# cache_history 的面板存储：股票 × 交易日 × 字段
+# ================================
+class HistoryPanel:
+    def __init__(self, codes: List[str], dates: np.ndarray, data: np.ndarray):
+        self.codes = codes                                          # 第一维对应的股票代码
+        self.code_index: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+        self.dates = dates                                          # 共用的日期轴，格式 %Y%m%d
+        self.field_index: Dict[str, int] = {name: i for i, name in enumerate(PANEL_FIELDS)}
+        self.data = data                                            # float64[codes, dates, fields]，缺失为 NaN
+
+        # 每个股票的有效区间 [start, stop)，区间内有停牌缺口的另外记录有效下标
+        self.ranges: List[tuple] = []
+        self.gaps: List[Optional[np.ndarray]] = []
+        valid = ~np.isnan(data[:, :, self.field_index['close']])
+        for row in range(len(codes)):
+            indexes = np.flatnonzero(valid[row])
+            if len(indexes) == 0:
+                self.ranges.append((0, 0))
+                self.gaps.append(None)
+                continue
+            start, stop = int(indexes[0]), int(indexes[-1]) + 1
+            self.ranges.append((start, stop))
+            self.gaps.append(indexes if len(indexes) != stop - start else None)
+
+        self.views: Dict[str, PanelHistory] = {}
+
+    @classmethod
+    def from_frames(cls, histories: Dict[str, pd.DataFrame]) -> 'HistoryPanel':
+        codes = list(histories.keys())
+        dates = np.array(sorted({
+            str(day) for df in histories.values() for day in df['datetime'].values
+        }))
+        date_index = {day: i for i, day in enumerate(dates)}
+
+        data = np.full((len(codes), len(dates), len(PANEL_FIELDS)), np.nan)
+        for row, code in enumerate(codes):
+            df = histories[code]
+            cols = [date_index[str(day)] for day in df['datetime'].values]
+            for field, name in enumerate(PANEL_FIELDS):
+                if name in df.columns:
+                    data[row, cols, field] = df[name].values
+        return cls(codes, dates, data)
+
+    # 按 Dict[str, DataFrame] 的方式使用
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.code_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __getitem__(self, code: str) -> PanelHistory:
+        if code not in self.views:
+            self.views[code] = PanelHistory(self, self.code_index[code])
+        return self.views[code]
+
+    def keys(self) -> List[str]:
+        return self.codes
+
+    def items(self):
+        return ((code, self[code]) for code in self.codes)
+
+    def get(self, code: str, default=None) -> Optional[PanelHistory]:
+        return self[code] if code in self.code_index else default
+
+    # 整个面板某一字段的零拷贝视图 [codes, dates]，用于批量计算指标
+    def field(self, name: str) -> np.ndarray:
+        view = self.data[:, :, self.field_index[name]]
+        view.flags.writeable = False
+        return view
+
+    # 最近 n 个交易日的某一字段 [codes, n]
+    def window(self, name: str, n: int) -> np.ndarray:
+        return self.field(name)[:, -n:]
+
+    # 一组股票在面板里的行号，配合 field / window 取子集
+    def rows(self, codes: List[str]) -> np.ndarray:
+        return np.array([self.code_index[code] for code in codes], dtype=np.int64)
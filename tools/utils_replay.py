@@ -0,0 +1,191 @@
+import os
+import time
+import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tools.utils_cache import load_json, save_json
+from tools.utils_clock import VirtualClock, set_virtual_clock
+from tools.utils_tick import TickJournalReader, load_tick_history_json
+
+
+# 读取录制的tick，支持二进制流水文件和旧版 tick_history.json
+def load_replay_records(path: str, curr_date: str) -> np.ndarray:
+    """
+    curr_date example: '2024-12-31'
+    """
+    if path.endswith('.json'):
+        return load_tick_history_json(path, curr_date)
+
+    records = TickJournalReader(path).records
+    return records[np.argsort(records['time'], kind='stable')]
+
+
+# ================
+# tick 回放驱动
+# ================
+class TickReplayer:
+    def __init__(
+        self,
+        callback,                               # 一般是 XtSubscriber.callback_sub_whole
+        records: np.ndarray,                    # 按时间排好序的 TICK_RECORD_DTYPE 记录
+        speed: float = 0,                       # 回放倍速，1 为实时，0 为尽快
+        batch_ms: int = 1000,                   # 把多少毫秒内的tick合并成一次推送
+        last_closes: Dict[str, float] = None,   # 昨收价，缺省时用当日第一笔价格代替
+    ):
+        self.callback = callback
+        self.records = records
+        self.speed = speed
+        self.batch_ms = batch_ms
+        self.last_closes = last_closes if last_closes is not None else {}
+
+        self.states: Dict[str, Dict] = {}       # 每支股票当日累计的 open / high / low / amount
+        self.callback_costs: List[float] = []
+
+    # 把一条记录还原成 subscribe_whole_quote 推送的格式
+    def make_quote(self, code: str, record) -> Dict:
+        price = float(record['price'])
+        volume = int(record['volume'])
+
+        if code not in self.states:
+            self.states[code] = {
+                'open': price,
+                'high': price,
+                'low': price,
+                'volume': volume,
+                'amount': 0.0,
+            }
+        state = self.states[code]
+        state['high'] = max(state['high'], price)
+        state['low'] = min(state['low'], price)
+        state['amount'] += price * max(0, volume - state['volume']) * 100  # 没有录制成交额，按成交价估算
+        state['volume'] = volume
+
+        return {
+            'time': int(record['time']),
+            'lastPrice': price,
+            'open': state['open'],
+            'high': state['high'],
+            'low': state['low'],
+            'lastClose': self.last_closes.get(code, state['open']),
+            'volume': volume,
+            'amount': state['amount'],
+            'askPrice': [float(record['ask_price'])],
+            'askVol': [int(record['ask_vol'])],
+            'bidPrice': [float(record['bid_price'])],
+            'bidVol': [int(record['bid_vol'])],
+        }
+
+    def run(self) -> Dict:
+        records = self.records
+        if len(records) == 0:
+            return {'ticks': 0, 'batches': 0}
+
+        buckets = records['time'] // self.batch_ms
+        bounds = [0] + list(np.flatnonzero(np.diff(buckets)) + 1) + [len(records)]
+
+        first_time = int(records['time'][0])
+        clock = VirtualClock(datetime.datetime.fromtimestamp(first_time / 1000))
+        set_virtual_clock(clock)
+
+        wall_start = time.perf_counter()
+        try:
+            for i in range(len(bounds) - 1):
+                batch = records[bounds[i]:bounds[i + 1]]
+                batch_time = int(batch['time'][-1])
+
+                # 按倍速等待，保持和录制时相同的节奏
+                if self.speed > 0:
+                    wait = (batch_time - first_time) / 1000 / self.speed - (time.perf_counter() - wall_start)
+                    if wait > 0:
+                        time.sleep(wait)
+
+                quotes = {}
+                for record in batch:
+                    code = record['code'].decode()
+                    quotes[code] = self.make_quote(code, record)
+
+                clock.set(datetime.datetime.fromtimestamp(batch_time / 1000))
+                t0 = time.perf_counter()
+                self.callback(quotes)
+                self.callback_costs.append(time.perf_counter() - t0)
+        finally:
+            set_virtual_clock(None)
+
+        wall_cost = time.perf_counter() - wall_start
+        costs = sorted(self.callback_costs)
+        return {
+            'ticks': len(records),
+            'batches': len(bounds) - 1,
+            'codes': len(self.states),
+            'wall_seconds': round(wall_cost, 3),
+            'ticks_per_second': round(len(records) / wall_cost, 1) if wall_cost > 0 else None,
+            'batches_per_second': round((len(bounds) - 1) / wall_cost, 1) if wall_cost > 0 else None,
+            'callback_p50_ms': round(costs[len(costs) // 2] * 1000, 3),
+            'callback_max_ms': round(costs[-1] * 1000, 3),
+        }
+
+
+# ================
+# 用回放驱动 run_*.py 里的策略
+# ================
+def replay_strategy(
+    module,                     # 已经 import 的策略模块，例如 run_shield
+    tick_path: str,
+    curr_date: str,
+    delegate,                   # 一般是 ReplayDelegate
+    replay_dir: str = './_cache/debug/replay',
+    speed: float = 0,
+    batch_ms: int = 1000,
+    last_closes: Optional[Dict[str, float]] = None,
+) -> Dict:
+    from delegate.xt_subscriber import XtSubscriber
+
+    # 持仓天数和最高价写到回放目录，不污染实盘缓存
+    os.makedirs(replay_dir, exist_ok=True)
+    module.PATH_HELD = replay_dir + '/held_days.json'
+    module.PATH_MAXP = replay_dir + '/max_price.json'
+    module.PATH_DEAL = replay_dir + '/deal_hist.csv'
+
+    # 回放开始时已有的持仓默认持有一天，让卖出策略能够生效
+    held_days = load_json(module.PATH_HELD)
+    for position in delegate.check_positions():
+        if position.stock_code not in held_days:
+            held_days[position.stock_code] = 1
+    save_json(module.PATH_HELD, held_days)
+
+    module.my_delegate = delegate
+    if hasattr(module, 'Buyer'):
+        module.my_buyer = module.Buyer(
+            account_id='replay',
+            strategy_name=module.STRATEGY_NAME,
+            delegate=delegate,
+            parameters=module.BuyConf,
+        )
+    if hasattr(module, 'Seller'):
+        module.my_seller = module.Seller(
+            strategy_name=module.STRATEGY_NAME,
+            delegate=delegate,
+            parameters=module.SellConf,
+        )
+    # 沿用策略模块配置的执行节奏；不限速回放时策略线程和回放不同步，改在回调里执行保证结果可复现
+    cadence = dict(getattr(module, 'EXECUTE_CADENCE', {}))
+    if speed <= 0 and cadence.get('execute_mode') != 'debounce':
+        cadence['open_strategy_worker'] = False
+    module.my_suber = XtSubscriber(
+        account_id='replay',
+        strategy_name=module.STRATEGY_NAME,
+        delegate=delegate,
+        path_deal=module.PATH_DEAL,
+        path_assets=replay_dir + '/assets.csv',
+        execute_strategy=module.execute_strategy,
+        tick_checker=module.my_seller.check_stops if hasattr(module, 'Seller') else None,
+        **cadence,
+    )
+
+    records = load_replay_records(tick_path, curr_date)
+    replayer = TickReplayer(module.my_suber.callback_sub_whole, records, speed, batch_ms, last_closes)
+    report = replayer.run()
+    report['orders'] = [order.to_dict() for order in delegate.orders]
+    return report
@@ -0,0 +1,237 @@
+import os
+import time
+import pickle
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from tools.utils_basic import symbol_to_code
+
+SPOT_CACHE_PATH = '_cache/_spot_snapshot.pkl'
+SPOT_TTL = 300.0                # 全市场快照的默认有效期，单位（秒）
+
+SPOT_COLUMNS = ['代码', '名称', '总市值', '流通市值']
+
+
+# ================================
+# 一次全市场行情快照，构造时建好按前缀、总市值、流通市值的索引，之后只读
+# ================================
+class SpotSnapshot:
+    def __init__(self, df: pd.DataFrame, fetched_at: float):
+        df = df[SPOT_COLUMNS].sort_values('代码').reset_index(drop=True)
+        self.df = df
+        self.fetched_at = fetched_at                                # 拉取时的 time.time()
+
+        self.symbols = df['代码'].astype(str).to_numpy(dtype=str)   # 六位数代码，升序
+        self.codes = np.array([symbol_to_code(symbol) for symbol in self.symbols])
+        self.names = df['名称'].to_numpy(dtype=object)
+        self.total_mv = pd.to_numeric(df['总市值'], errors='coerce').values.astype(np.float64)
+        self.circ_mv = pd.to_numeric(df['流通市值'], errors='coerce').values.astype(np.float64)
+
+        # 两位数前缀 -> 行号（升序）
+        self.prefix_index: Dict[str, np.ndarray] = {
+            prefix: np.flatnonzero(np.char.startswith(self.symbols, prefix))
+            for prefix in sorted(set(symbol[:2] for symbol in self.symbols))
+        }
+        # 按市值升序的行号，缺失值不参与
+        self.total_mv_order = self._sorted_rows(self.total_mv)
+        self.circ_mv_order = self._sorted_rows(self.circ_mv)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @staticmethod
+    def _sorted_rows(values: np.ndarray) -> np.ndarray:
+        rows = np.flatnonzero(~np.isnan(values))
+        return rows[np.argsort(values[rows], kind='stable')]
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    # 代码以任一前缀开头的行号，两位数前缀直接查索引
+    def prefix_rows(self, prefixes: Set[str]) -> np.ndarray:
+        parts = []
+        for prefix in prefixes:
+            if len(prefix) == 2:
+                parts.append(self.prefix_index.get(prefix, np.array([], dtype=np.int64)))
+            else:
+                parts.append(np.flatnonzero(np.char.startswith(self.symbols, prefix)))
+        if len(parts) == 0:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    # 市值在 (min_value, max_value) 开区间内的行号，按代码升序
+    def mv_range_rows(self, min_value: float, max_value: float, circulation: bool = False) -> np.ndarray:
+        values, order = (self.circ_mv, self.circ_mv_order) if circulation else (self.total_mv, self.total_mv_order)
+        sorted_values = values[order]
+        i = np.searchsorted(sorted_values, min_value, side='right')
+        j = np.searchsorted(sorted_values, max_value, side='left')
+        return np.sort(order[i:j])
+
+    def codes_with_prefixes(self, prefixes: Set[str]) -> List[str]:
+        return self.codes[self.prefix_rows(prefixes)].tolist()
+
+    def market_value_limited_codes(self, prefixes: Set[str], min_value: float, max_value: float) -> List[str]:
+        rows = np.intersect1d(self.mv_range_rows(min_value, max_value), self.prefix_rows(prefixes))
+        return self.codes[rows].tolist()
+
+    def circulation_mv(self) -> Dict[str, float]:
+        rows = np.flatnonzero(~np.isnan(self.circ_mv))
+        return dict(zip(self.codes[rows].tolist(), self.circ_mv[rows].tolist()))
+
+    def code_names(self) -> Dict[str, str]:
+        return dict(zip(self.codes.tolist(), self.names.tolist()))
+
+
+# ================================
+# 全市场快照的提供者：有效期内直接复用，多个策略进程通过磁盘副本共享
+# 同一时刻只有一个线程去拉取，其余等它的结果；跨进程用锁文件，拿不到锁的进程等磁盘副本更新
+# ================================
+class SpotProvider:
+    def __init__(
+        self,
+        ttl: float = SPOT_TTL,              # 快照有效期，单位（秒）
+        path: str = SPOT_CACHE_PATH,        # 磁盘副本，多个进程共用
+        lock_timeout: float = 60.0,         # 等其他进程拉取的最长时间，超过视为锁文件残留，单位（秒）
+    ):
+        self.ttl = ttl
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.lock_timeout = lock_timeout
+
+        self.snapshot: Optional[SpotSnapshot] = None
+        self.lock = threading.Lock()
+        self.inflight: Optional[threading.Event] = None     # 正在进行的拉取，其他线程等它完成
+        self.error: Optional[Exception] = None
+        self.fetches = 0                                    # 本进程实际拉取的次数
+
+    def is_fresh(self, snapshot: Optional[SpotSnapshot]) -> bool:
+        return snapshot is not None and snapshot.age() < self.ttl
+
+    def get(self) -> SpotSnapshot:
+        snapshot = self.snapshot
+        if self.is_fresh(snapshot):
+            return snapshot
+
+        with self.lock:
+            if self.is_fresh(self.snapshot):
+                return self.snapshot
+            event = self.inflight
+            leader = event is None
+            if leader:
+                event = self.inflight = threading.Event()
+
+        if not leader:
+            event.wait()
+            if self.snapshot is None:
+                raise self.error
+            return self.snapshot
+
+        try:
+            self.snapshot = self._load_or_fetch()
+            self.error = None
+        except Exception as e:
+            self.error = e
+            if self.snapshot is None:
+                raise
+            print(f'[全市场快照刷新失败，沿用{int(self.snapshot.age())}秒前的数据:{e}]')
+        finally:
+            with self.lock:
+                self.inflight = None
+            event.set()
+        return self.snapshot
+
+    # 强制下次 get() 重新拉取
+    def invalidate(self) -> None:
+        self.snapshot = None
+
+    # ================
+    # 磁盘副本与跨进程锁
+    # ================
+    def _load_disk(self) -> Optional[SpotSnapshot]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception:
+            return None     # 写到一半的旧文件之类，当作没有
+        if time.time() - cache['fetched_at'] >= self.ttl:
+            return None
+        return SpotSnapshot(cache['df'], cache['fetched_at'])
+
+    def _save_disk(self, df: pd.DataFrame, fetched_at: float) -> None:
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'df': df, 'fetched_at': fetched_at}, f)
+        os.replace(temp_path, self.path)
+
+    def _try_lock(self) -> bool:
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) > self.lock_timeout:
+                    os.remove(self.lock_path)       # 拉取的进程崩溃留下的锁文件
+            except OSError:
+                pass
+            return False
+        os.close(fd)
+        return True
+
+    def _unlock(self) -> None:
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+    def _load_or_fetch(self) -> SpotSnapshot:
+        deadline = time.time() + self.lock_timeout
+        while True:
+            snapshot = self._load_disk()
+            if snapshot is not None:
+                return snapshot
+
+            if self._try_lock():
+                try:
+                    snapshot = self._load_disk()    # 拿锁之前别的进程可能刚写完
+                    if snapshot is not None:
+                        return snapshot
+                    return self._fetch()
+                finally:
+                    self._unlock()
+
+            if time.time() > deadline:
+                return self._fetch()
+            time.sleep(0.2)
+
+    def _fetch(self) -> SpotSnapshot:
+        import akshare as ak
+        df = ak.stock_zh_a_spot_em()[SPOT_COLUMNS]
+        fetched_at = time.time()
+        self.fetches += 1
+        self._save_disk(df, fetched_at)
+        return SpotSnapshot(df, fetched_at)
+
+
+_provider: Optional[SpotProvider] = None
+_provider_lock = threading.Lock()
+
+
+# 进程内共用一个快照提供者，传入 ttl 时更新有效期
+def get_spot_provider(ttl: Optional[float] = None) -> SpotProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = SpotProvider()
+    if ttl is not None:
+        _provider.ttl = ttl
+    return _provider
+
+
+def get_spot_snapshot() -> SpotSnapshot:
+    return get_spot_provider().get()
@@ -0,0 +1,312 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# 成交记录的列名，和 deal_hist.csv 保持一致
+DEAL_COLUMNS = ['日期', '时间', '代码', '名称', '类型', '注释', '成交价', '成交量']
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS state (
+        name TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value,
+        PRIMARY KEY (name, key)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS deals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        code TEXT NOT NULL,
+        name TEXT,
+        type TEXT,
+        remark TEXT,
+        price REAL,
+        volume INTEGER
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_deals_date ON deals (date, time)',
+    'CREATE INDEX IF NOT EXISTS idx_deals_code ON deals (code, date)',
+    '''CREATE TABLE IF NOT EXISTS assets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        asset REAL NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_assets_date ON assets (date)',
+    '''CREATE TABLE IF NOT EXISTS migrations (
+        name TEXT PRIMARY KEY
+    )''',
+]
+
+
+# ================================
+# 交易状态的 SQLite 存储，WAL 模式下多个策略进程可以同时读写同一个文件
+# 持仓天数、最高价按 key 单独 upsert，不再整份读改写，进程之间不会互相覆盖
+# ================================
+class SqliteTradeDB:
+    def __init__(
+        self,
+        path: str,                  # 数据库文件，一般放在 CACHE_BASE_PATH 下
+        timeout: float = 30.0,      # 其他进程持有写锁时最多等待多久，单位（秒）
+    ):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.lock:
+            for sql in SCHEMA:
+                self.conn.execute(sql)
+
+        self.tables: Dict[str, SqliteStateTable] = {}
+
+    # 写事务一开始就拿写锁，避免读后写升级锁失败
+    def execute_write(self, statements: List[tuple]) -> None:
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, args in statements:
+                    self.conn.execute(sql, args)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def query(self, sql: str, args: tuple = ()) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    # 其他连接提交之后会变化，用来判断缓存是否过期
+    def data_version(self) -> int:
+        with self.lock:
+            return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    # ================
+    # 持仓状态
+    # ================
+
+    # 第一次使用时从原来的 json 缓存导入
+    def state(self, name: str, migrate_path: Optional[str] = None) -> 'SqliteStateTable':
+        if name not in self.tables:
+            if migrate_path is not None:
+                self.migrate_json(name, migrate_path)
+            self.tables[name] = SqliteStateTable(self, name)
+        return self.tables[name]
+
+    def migrate_json(self, name: str, path: str) -> None:
+        items = {}
+        if os.path.exists(path):
+            with open(path, 'r') as r:
+                text = r.read()
+            if len(text.strip()) > 0:
+                items = json.loads(text)
+
+        self._migrate_once(name, path, [
+            ('INSERT OR IGNORE INTO state (name, key, value) VALUES (?, ?, ?)', (name, key, value))
+            for key, value in items.items()
+        ])
+
+    # 原来的 deal_hist.csv，和 load_deals 一样按 gbk 读取
+    def migrate_deals(self, path: str) -> None:
+        rows = []
+        if os.path.exists(path):
+            df = pd.read_csv(path, encoding='gbk', dtype={'代码': str})
+            rows = df[DEAL_COLUMNS].astype(object).where(df[DEAL_COLUMNS].notna(), None).values.tolist()
+
+        self._migrate_once('deals', path, [(
+            'INSERT INTO deals (date, time, code, name, type, remark, price, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (str(date), str(time), code, name, order_type, remark,
+             None if price is None else float(price), None if volume is None else int(volume)),
+        ) for date, time, code, name, order_type, remark, price, volume in rows])
+
+    # 原来的 assets.csv
+    def migrate_assets(self, path: str) -> None:
+        rows = []
+        if os.path.exists(path):
+            df = pd.read_csv(path)
+            rows = df[['date', 'asset']].values.tolist()
+
+        self._migrate_once('assets', path, [
+            ('INSERT INTO assets (date, asset) VALUES (?, ?)', (str(date), float(asset)))
+            for date, asset in rows
+        ])
+
+    # 每个 name 只导入一次，判断和写入在同一个写事务里，多个进程同时启动也只有一个会导入
+    def _migrate_once(self, name: str, path: str, statements: List[tuple]) -> None:
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self.conn.execute('SELECT 1 FROM migrations WHERE name = ?', (name,)).fetchone() is None:
+                    self.conn.execute('INSERT INTO migrations (name) VALUES (?)', (name,))
+                    for sql, args in statements:
+                        self.conn.execute(sql, args)
+                    if len(statements) > 0:
+                        print(f'[状态导入]{os.path.basename(path)} {len(statements)}条')
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    # ================
+    # 成交记录
+    # ================
+    def record_deal(
+        self,
+        timestamp: str,
+        code: str,
+        name: str,
+        order_type: str,
+        remark: str,
+        price: float,
+        volume: int,
+    ) -> None:
+        dt = datetime.datetime.fromtimestamp(int(timestamp))
+        self.execute_write([(
+            'INSERT INTO deals (date, time, code, name, type, remark, price, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (str(dt.date()), str(dt.time()), code, name, order_type, remark, price, volume),
+        )])
+
+    # 按日期区间查询成交，日期格式 %Y-%m-%d，包含两端
+    def query_deals(self, start: str, end: str, code: Optional[str] = None) -> pd.DataFrame:
+        sql = 'SELECT date, time, code, name, type, remark, price, volume FROM deals WHERE date BETWEEN ? AND ?'
+        args = (start, end)
+        if code is not None:
+            sql += ' AND code = ?'
+            args = (start, end, code)
+        rows = self.query(sql + ' ORDER BY date, time, id', args)
+        return pd.DataFrame(rows, columns=DEAL_COLUMNS)
+
+    # ================
+    # 资产记录
+    # ================
+
+    # 写入当日资产并返回上一条记录，和写入在同一个事务里
+    def add_asset(self, curr_date: str, curr_asset: float) -> Optional[float]:
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute('SELECT asset FROM assets ORDER BY id DESC LIMIT 1').fetchone()
+                self.conn.execute('INSERT INTO assets (date, asset) VALUES (?, ?)', (curr_date, curr_asset))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return row[0] if row is not None else None
+
+    def query_assets(self, start: str, end: str) -> pd.DataFrame:
+        rows = self.query('SELECT date, asset FROM assets WHERE date BETWEEN ? AND ? ORDER BY date, id', (start, end))
+        return pd.DataFrame(rows, columns=['date', 'asset'])
+
+
+# ================================
+# state 表里的一组 key-value，接口和 JournalStateStore 一致，可以注册为状态后端
+# ================================
+class SqliteStateTable:
+    def __init__(self, db: SqliteTradeDB, name: str):
+        self.db = db
+        self.name = name                # held_days / max_prices
+        self.published: Dict = {}       # 只读缓存，数据库有新提交时重新加载
+        self.version = -1
+
+    def _reload(self) -> None:
+        rows = self.db.query('SELECT key, value FROM state WHERE name = ?', (self.name,))
+        self.published = {key: value for key, value in rows}
+
+    def view(self) -> Dict:
+        version = self.db.data_version()
+        if version != self.version:
+            self._reload()
+            self.version = version
+        return self.published
+
+    # 本进程写入之后 data_version 不会变，需要主动刷新缓存
+    def _after_write(self) -> None:
+        self._reload()
+        self.version = self.db.data_version()
+
+    def get(self, key: str, default=None) -> Optional[object]:
+        return self.view().get(key, default)
+
+    def set_items(self, items: Dict) -> None:
+        if len(items) == 0:
+            return
+        self.db.execute_write([(
+            'INSERT INTO state (name, key, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (name, key) DO UPDATE SET value = excluded.value',
+            (self.name, key, value),
+        ) for key, value in items.items()])
+        self._after_write()
+
+    def del_items(self, keys: List[str]) -> None:
+        if len(keys) == 0:
+            return
+        self.db.execute_write([
+            ('DELETE FROM state WHERE name = ? AND key = ?', (self.name, key)) for key in keys
+        ])
+        self._after_write()
+
+    # 调用方在 base 的基础上改成了 items，只把它改动的 key 应用到数据库当前内容上
+    # 其他进程在这期间新增或修改的 key 不会被覆盖
+    def replace(self, items: Dict) -> None:
+        base = self.published
+        upserts = {key: value for key, value in items.items() if key not in base or base[key] != value}
+        deletes = [key for key in base if key not in items]
+
+        db = self.db
+        with db.lock:
+            db.conn.execute('BEGIN IMMEDIATE')
+            try:
+                current = {key: value for key, value in db.conn.execute(
+                    'SELECT key, value FROM state WHERE name = ?', (self.name,)).fetchall()}
+                for key, value in upserts.items():
+                    if key not in current or current[key] != value:
+                        db.conn.execute(
+                            'INSERT INTO state (name, key, value) VALUES (?, ?, ?) '
+                            'ON CONFLICT (name, key) DO UPDATE SET value = excluded.value',
+                            (self.name, key, value))
+                for key in deletes:
+                    if key in current:
+                        db.conn.execute('DELETE FROM state WHERE name = ? AND key = ?', (self.name, key))
+                db.conn.execute('COMMIT')
+            except Exception:
+                db.conn.execute('ROLLBACK')
+                raise
+        self._after_write()
+
+    # 除了标记位之外全部 +1，判断和更新在同一个写事务里，多个进程同时调用也只会加一次
+    def inc_all(self, marker_key: str, marker_value: str) -> bool:
+        db = self.db
+        with db.lock:
+            db.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.conn.execute(
+                    'SELECT value FROM state WHERE name = ? AND key = ?', (self.name, marker_key)).fetchone()
+                if row is not None and row[0] == marker_value:
+                    db.conn.execute('COMMIT')
+                    return False
+                db.conn.execute(
+                    'UPDATE state SET value = value + 1 WHERE name = ? AND key != ?', (self.name, marker_key))
+                db.conn.execute(
+                    'INSERT INTO state (name, key, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name, key) DO UPDATE SET value = excluded.value',
+                    (self.name, marker_key, marker_value))
+                db.conn.execute('COMMIT')
+            except Exception:
+                db.conn.execute('ROLLBACK')
+                raise
+        self._after_write()
+        return True
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+
+# ================================
+# 常驻内存的持仓状态（held_days / max_prices）
+# 写操作先追加到日志文件，定期压缩成原来格式的 json 快照，启动时用快照 + 日志恢复
+# 读操作直接拿当前发布的字典，不加锁也不解析文件，调用方不要修改它
+# 只适合单个进程独占一个文件，多个策略进程共用同一份状态请用 SQLite 存储
+# ================================
+class JournalStateStore:
+    def __init__(
+        self,
+        path: str,                          # json 快照路径，格式和原来的缓存文件一致
+        compact_every: int = 500,           # 日志累计多少条压缩一次
+        compact_interval: float = 300.0,    # 距上次压缩超过多久压缩一次，单位（秒）
+    ):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+
+        self.lock = threading.Lock()
+        self.data: Dict = {}                # 写线程维护的最新状态
+        self.published: Dict = {}           # 发布给读线程的只读副本，每次写入整体替换
+        self.journal = None
+        self.journal_count = 0
+        self.last_compact = time.monotonic()
+
+        self.recover()
+
+    # ================
+    # 恢复与压缩
+    # ================
+    def recover(self) -> None:
+        with self.lock:
+            self.data = self._load_snapshot()
+            replayed = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r') as r:
+                    for line in r:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break           # 崩溃时最后一行可能没写完，之后的都不可信
+                        self._apply(entry)
+                        replayed += 1
+            if replayed > 0:
+                print(f'[状态恢复]{os.path.basename(self.path)} 重放日志{replayed}条')
+            self._compact_locked()
+
+    def _load_snapshot(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as r:
+            text = r.read()
+        return json.loads(text) if len(text.strip()) > 0 else {}
+
+    def compact(self) -> None:
+        with self.lock:
+            self._compact_locked()
+
+    # 先原子替换快照，再清空日志；两步之间崩溃会重放一遍日志，各操作都是幂等的
+    def _compact_locked(self) -> None:
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as w:
+            w.write(json.dumps(self.data, indent=4))
+            w.flush()
+            os.fsync(w.fileno())
+        os.replace(temp_path, self.path)
+
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(self.journal_path, 'w')
+        self.journal_count = 0
+        self.last_compact = time.monotonic()
+        self.published = dict(self.data)
+
+    def close(self) -> None:
+        with self.lock:
+            self._compact_locked()
+            self.journal.close()
+            self.journal = None
+
+    # ================
+    # 读写
+    # ================
+    def view(self) -> Dict:
+        return self.published
+
+    def _apply(self, entry: Dict) -> bool:
+        op = entry['op']
+        if op == 'set':
+            self.data.update(entry['items'])
+        elif op == 'del':
+            for key in entry['keys']:
+                self.data.pop(key, None)
+        elif op == 'replace':
+            self.data = dict(entry['items'])
+        elif op == 'inc_all':
+            # 除了标记位之外全部 +1，标记位已经是当天则不重复执行
+            if self.data.get(entry['key']) == entry['value']:
+                return False
+            for key in self.data:
+                if key != entry['key']:
+                    self.data[key] += 1
+            self.data[entry['key']] = entry['value']
+        return True
+
+    def _write(self, entry: Dict) -> bool:
+        with self.lock:
+            changed = self._apply(entry)
+            if not changed:
+                return False
+
+            self.journal.write(json.dumps(entry, ensure_ascii=False))
+            self.journal.write('\n')
+            self.journal.flush()
+            self.journal_count += 1
+
+            if self.journal_count >= self.compact_every \
+                    or time.monotonic() - self.last_compact >= self.compact_interval:
+                self._compact_locked()
+            else:
+                self.published = dict(self.data)
+            return True
+
+    def set_items(self, items: Dict) -> None:
+        if len(items) > 0:
+            self._write({'op': 'set', 'items': items})
+
+    def del_items(self, keys: List[str]) -> None:
+        keys = [key for key in keys if key in self.data]
+        if len(keys) > 0:
+            self._write({'op': 'del', 'keys': keys})
+
+    def replace(self, items: Dict) -> None:
+        if items != self.data:
+            self._write({'op': 'replace', 'items': items})
+
+    def inc_all(self, marker_key: str, marker_value: str) -> bool:
+        return self._write({'op': 'inc_all', 'key': marker_key, 'value': marker_value})
+
+    def get(self, key: str, default=None) -> Optional[object]:
+        return self.published.get(key, default)
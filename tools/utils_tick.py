@@ -0,0 +1,425 @@
+import os
+import json
+import queue
+import logging
+import datetime
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# tick 列存储的字段与类型
+TICK_COLUMNS = {
+    'time': np.int64,           # 成交时间，毫秒时间戳
+    'price': np.float64,        # 成交价格
+    'volume': np.int64,         # 累计成交量（手）
+    'ask_price': np.float64,    # 卖一价格
+    'ask_vol': np.int64,        # 卖一数量
+    'bid_price': np.float64,    # 买一价格
+    'bid_vol': np.int64,        # 买一数量
+}
+
+
+# ================
+# 单个股票的tick列存
+# ================
+class TickSeries:
+    def __init__(self, capacity: int = 512):
+        self.size = 0
+        self.capacity = capacity
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(capacity, dtype=dtype)
+            for name, dtype in TICK_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    # 容量不足时按两倍扩容，已取出的切片仍然指向旧数组，数据不受影响
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            new_column = np.empty(self.capacity, dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            self.columns[name] = new_column
+
+    def append(
+        self,
+        tick_time: int,
+        price: float,
+        volume: int,
+        ask_price: float,
+        ask_vol: int,
+        bid_price: float,
+        bid_vol: int,
+    ) -> None:
+        if self.size >= self.capacity:
+            self._grow()
+
+        i = self.size
+        columns = self.columns
+        columns['time'][i] = tick_time
+        columns['price'][i] = price
+        columns['volume'][i] = volume
+        columns['ask_price'][i] = ask_price
+        columns['ask_vol'][i] = ask_vol
+        columns['bid_price'][i] = bid_price
+        columns['bid_vol'][i] = bid_vol
+        self.size = i + 1
+
+    # 零拷贝取出某一列的切片，start/stop 语义同 list 切片
+    def column(self, name: str, start: Optional[int] = None, stop: Optional[int] = None) -> np.ndarray:
+        view = self.columns[name][:self.size][start:stop]
+        view.flags.writeable = False
+        return view
+
+    # 零拷贝取出所有列的切片
+    def view(self, start: Optional[int] = None, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return {name: self.column(name, start, stop) for name in self.columns}
+
+    # 转换为旧版 today_ticks 的行格式，只在落盘时使用
+    def to_rows(self) -> List[list]:
+        columns = self.columns
+        rows = []
+        for i in range(self.size):
+            tick_time = datetime.datetime.fromtimestamp(int(columns['time'][i]) / 1000).strftime('%H:%M:%S')
+            rows.append([
+                tick_time,                                  # 成交时间，格式：%H:%M:%S
+                round(float(columns['price'][i]), 2),       # 成交价格
+                int(columns['volume'][i]),                  # 累计成交量（手）
+                round(float(columns['ask_price'][i]), 2),   # 卖一价格
+                int(columns['ask_vol'][i]),                 # 卖一数量
+                round(float(columns['bid_price'][i]), 2),   # 买一价格
+                int(columns['bid_vol'][i]),                 # 买一数量
+            ])
+        return rows
+
+
+# ================
+# 全部股票的tick列存
+# ================
+class TickStore:
+    def __init__(self, capacity: int = 512):
+        self.capacity = capacity                    # 每支股票初始预分配的tick数量
+        self.series: Dict[str, TickSeries] = {}
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.series
+
+    def codes(self) -> List[str]:
+        return list(self.series.keys())
+
+    def clear(self) -> None:
+        self.series.clear()
+
+    def get(self, code: str) -> Optional[TickSeries]:
+        return self.series.get(code)
+
+    # 行情回调使用的写入接口，quotes 格式同 xtdata.subscribe_whole_quote 的推送
+    def append_quotes(self, quotes: Dict[str, Dict]) -> None:
+        series = self.series
+        for code in quotes:
+            quote = quotes[code]
+
+            if code not in series:
+                series[code] = TickSeries(self.capacity)
+
+            ask_price = quote['askPrice']
+            ask_vol = quote['askVol']
+            bid_price = quote['bidPrice']
+            bid_vol = quote['bidVol']
+            series[code].append(
+                quote['time'],
+                quote['lastPrice'],
+                quote['volume'],
+                ask_price[0] if len(ask_price) > 0 else 0.0,
+                ask_vol[0] if len(ask_vol) > 0 else 0,
+                bid_price[0] if len(bid_price) > 0 else 0.0,
+                bid_vol[0] if len(bid_vol) > 0 else 0,
+            )
+
+    # 策略使用的读取接口，返回零拷贝的只读切片，没有数据时返回 None
+    def column(
+        self,
+        code: str,
+        name: str,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ) -> Optional[np.ndarray]:
+        if code not in self.series:
+            return None
+        return self.series[code].column(name, start, stop)
+
+    def view(
+        self,
+        code: str,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ) -> Optional[Dict[str, np.ndarray]]:
+        if code not in self.series:
+            return None
+        return self.series[code].view(start, stop)
+
+    # 转换为旧版 today_ticks 的格式 { code: [[成交时间, 成交价格, 累计成交量, 卖一价, 卖一量, 买一价, 买一量]] }
+    def to_dict(self) -> Dict[str, List[list]]:
+        return {code: series.to_rows() for code, series in self.series.items()}
+
+
+# ================
+# 盘中tick流水日志
+# ================
+
+TICK_JOURNAL_PATH = './_cache/debug/ticks_{}.bin'  # 按日期分文件，日期格式：%Y-%m-%d
+TICK_JOURNAL_MAGIC = b'SQTICK01'
+
+# 定长二进制记录，小端无对齐，每条 68 字节
+TICK_RECORD_DTYPE = np.dtype([
+    ('code', 'S12'),
+    ('time', '<i8'),
+    ('price', '<f8'),
+    ('volume', '<i8'),
+    ('ask_price', '<f8'),
+    ('ask_vol', '<i8'),
+    ('bid_price', '<f8'),
+    ('bid_vol', '<i8'),
+])
+
+# 文件头：魔数 + 单条记录字节数 + 保留位，共 16 字节
+TICK_JOURNAL_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('record_size', '<u4'),
+    ('reserved', '<u4'),
+])
+
+
+def get_tick_journal_path(curr_date: str) -> str:
+    return TICK_JOURNAL_PATH.format(curr_date)
+
+
+TICK_CODE_BYTES = TICK_RECORD_DTYPE['code'].itemsize
+
+
+# 把一次推送的 quotes 转换成定长记录数组，超长代码或字段缺失时抛出异常
+def quotes_to_records(items: List[tuple]) -> np.ndarray:
+    records = np.zeros(len(items), dtype=TICK_RECORD_DTYPE)
+    for i, (code, quote) in enumerate(items):
+        if len(code.encode()) > TICK_CODE_BYTES:
+            raise ValueError(f'股票代码 {code} 超过 {TICK_CODE_BYTES} 字节')
+        ask_price = quote['askPrice']
+        ask_vol = quote['askVol']
+        bid_price = quote['bidPrice']
+        bid_vol = quote['bidVol']
+        records[i] = (
+            code.encode(),
+            quote['time'],
+            quote['lastPrice'],
+            quote['volume'],
+            ask_price[0] if len(ask_price) > 0 else 0.0,
+            ask_vol[0] if len(ask_vol) > 0 else 0,
+            bid_price[0] if len(bid_price) > 0 else 0.0,
+            bid_vol[0] if len(bid_vol) > 0 else 0,
+        )
+    return records
+
+
+def _write_journal_header(file) -> None:
+    header = np.zeros(1, dtype=TICK_JOURNAL_HEADER)
+    header[0] = (TICK_JOURNAL_MAGIC, TICK_RECORD_DTYPE.itemsize, 0)
+    file.write(header.tobytes())
+
+
+# 后台线程持续追加写入，行情回调只负责入队
+class TickJournalWriter:
+    def __init__(self, path: str, flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.flush_interval = flush_interval        # 最长多久刷一次盘，单位（秒）
+        self.record_count = 0
+        self.dropped_count = 0                      # 队列满或者格式错误被丢弃的记录数
+
+        self._queue = queue.Queue(maxsize=max_pending)  # 最多积压多少次推送，写线程跟不上时丢弃新的推送
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = object()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='tick-journal', daemon=True)
+        self._thread.start()
+
+    # 只拷贝 items 列表，quote 字典本身在合并时整体替换，不会被原地修改
+    def put(self, quotes: Dict[str, Dict]) -> None:
+        if len(quotes) > 0:
+            try:
+                self._queue.put_nowait(list(quotes.items()))
+            except queue.Full:
+                if self.dropped_count == 0:
+                    logging.error(f'[tick流水]写入积压，开始丢弃推送 {self.path}')
+                self.dropped_count += len(quotes)
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._queue.put(self._stopping)
+            self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        is_new = (not os.path.exists(self.path)) or os.path.getsize(self.path) == 0
+        with open(self.path, 'ab') as file:
+            if is_new:
+                _write_journal_header(file)
+            else:
+                # 上次崩溃留下的半条记录要截掉，否则后续记录会错位
+                header_size = TICK_JOURNAL_HEADER.itemsize
+                tail = (os.path.getsize(self.path) - header_size) % TICK_RECORD_DTYPE.itemsize
+                if tail > 0:
+                    file.truncate(os.path.getsize(self.path) - tail)
+
+            stopping = False
+            while not stopping:
+                try:
+                    batches = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+
+                # 一次把积压的推送全部取出，合并成一次写入
+                while True:
+                    try:
+                        batches.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if batches[-1] is self._stopping:
+                    batches.pop()
+                    stopping = True
+
+                items = [item for batch in batches for item in batch]
+                if len(items) > 0:
+                    try:
+                        self._write(file, items)
+                    except Exception as e:
+                        logging.error(f'[tick流水]写入失败 {self.path}: {e}')
+
+    def _write(self, file, items: List[tuple]) -> None:
+        try:
+            records = quotes_to_records(items)
+        except Exception:
+            # 整批转换失败时逐条转换，只丢掉有问题的记录
+            parts = []
+            for item in items:
+                try:
+                    parts.append(quotes_to_records([item]))
+                except Exception as e:
+                    self.dropped_count += 1
+                    logging.error(f'[tick流水]丢弃格式错误的记录 {item[0]}: {e}')
+            if len(parts) == 0:
+                return
+            records = np.concatenate(parts)
+
+        file.write(records.tobytes())
+        file.flush()
+        self.record_count += len(records)
+
+
+# 内存映射读取，第一次按股票查询时对 code 列排序建一次索引，之后按索引取行
+class TickJournalReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.records = self._map_records(path)
+        self._index: Optional[Dict[str, np.ndarray]] = None
+
+    @staticmethod
+    def _map_records(path: str) -> np.ndarray:
+        header_size = TICK_JOURNAL_HEADER.itemsize
+        file_size = os.path.getsize(path)
+        if file_size < header_size:
+            return np.zeros(0, dtype=TICK_RECORD_DTYPE)
+
+        header = np.fromfile(path, dtype=TICK_JOURNAL_HEADER, count=1)[0]
+        assert header['magic'] == TICK_JOURNAL_MAGIC, f'{path} 不是tick流水文件'
+        assert header['record_size'] == TICK_RECORD_DTYPE.itemsize, f'{path} 记录长度不匹配'
+
+        # 进程崩溃时可能留下半条记录，直接忽略尾部
+        count = (file_size - header_size) // TICK_RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=TICK_RECORD_DTYPE)
+        return np.memmap(path, dtype=TICK_RECORD_DTYPE, mode='r', offset=header_size, shape=(count,))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _build_index(self) -> Dict[str, np.ndarray]:
+        if self._index is None:
+            codes = self.records['code']
+            order = np.argsort(codes, kind='stable')
+            sorted_codes = codes[order]
+            uniques, starts = np.unique(sorted_codes, return_index=True)
+            ends = list(starts[1:]) + [len(order)]
+            self._index = {
+                code.decode(): order[start:end]
+                for code, start, end in zip(uniques, starts, ends)
+            }
+        return self._index
+
+    def codes(self) -> List[str]:
+        return list(self._build_index().keys())
+
+    # 读取单个股票当日的全部tick，返回列字典，格式同 TickSeries.view()
+    def load(self, code: str) -> Optional[Dict[str, np.ndarray]]:
+        index = self._build_index()
+        if code not in index:
+            return None
+        rows = self.records[index[code]]
+        return {name: np.asarray(rows[name]) for name in TICK_COLUMNS}
+
+    # 按时间顺序回放原始记录
+    def iter_records(self, batch_size: int = 10000):
+        for i in range(0, len(self.records), batch_size):
+            yield self.records[i:i + batch_size]
+
+
+def load_tick_journal(curr_date: str, code: str) -> Optional[Dict[str, np.ndarray]]:
+    path = get_tick_journal_path(curr_date)
+    if not os.path.exists(path):
+        return None
+    return TickJournalReader(path).load(code)
+
+
+# 读取旧版 tick_history.json，转换成按时间排序的定长记录数组
+def load_tick_history_json(json_path: str, curr_date: str) -> np.ndarray:
+    """
+    curr_date example: '2024-12-31'，旧格式只记录了 %H:%M:%S，需要补上日期
+    """
+    with open(json_path, 'r') as r:
+        today_ticks = json.load(r)
+
+    rows = []
+    for code, ticks in today_ticks.items():
+        for tick in ticks:
+            dt = datetime.datetime.strptime(f'{curr_date} {tick[0]}', '%Y-%m-%d %H:%M:%S')
+            rows.append((
+                code.encode(),
+                int(dt.timestamp() * 1000),
+                tick[1], tick[2], tick[3], tick[4], tick[5], tick[6],
+            ))
+
+    records = np.array(rows, dtype=TICK_RECORD_DTYPE)
+    return records[np.argsort(records['time'], kind='stable')]
+
+
+# 把旧版 tick_history.json 转换成二进制流水文件
+def convert_tick_history_json(json_path: str, journal_path: str, curr_date: str) -> int:
+    records = load_tick_history_json(json_path, curr_date)
+
+    with open(journal_path, 'wb') as w:
+        _write_journal_header(w)
+        w.write(records.tobytes())
+    print(f'{len(records)} ticks converted to {journal_path}')
+    return len(records)
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import datetime
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+# 取排序后数组的百分位，数据量小直接用最近秩
+def _percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(p * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+# ================
+# 分阶段耗时统计
+# ================
+class LatencyRecorder:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path        # 输出文件路径，可以带 {} 按日期滚动，例如 latency_{}.jsonl
+        self.lock = threading.Lock()
+        self.curr_minute = 0    # 当前统计的分钟序号
+        self.buckets: Dict[str, List[float]] = {}
+
+        # 跨分钟时只把上一分钟的数据挂到队列里，由写盘线程汇总落盘，不占用行情回调
+        self.finished: List[Tuple[int, Dict[str, List[float]]]] = []
+        self.writer: Optional[threading.Thread] = None
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.write_lock = threading.Lock()  # 写盘线程和 flush 不同时写文件
+
+    def set_path(self, path: Optional[str]) -> None:
+        with self.lock:
+            self.path = path
+
+    def record(self, stage: str, seconds: float) -> None:
+        minute = int(time.time() // 60)
+        with self.lock:
+            if minute != self.curr_minute:
+                self._rollover_locked()
+                self.curr_minute = minute
+
+            if stage not in self.buckets:
+                self.buckets[stage] = []
+            self.buckets[stage].append(seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0)
+
+    # 当前分钟也结束统计，和队列里的一起同步写盘
+    def flush(self) -> None:
+        with self.lock:
+            self._rollover_locked(notify=False)
+        self._write_finished()
+
+    # 停止写盘线程，剩下的数据同步写完
+    def stop(self) -> None:
+        self.stopped.set()
+        self.wakeup.set()
+        if self.writer is not None:
+            self.writer.join(timeout=5.0)
+            self.writer = None
+        self.flush()
+        self.stopped.clear()
+
+    # 汇总当前分钟的直方图：次数、p50、p99、最大值，单位（毫秒）
+    def summary(self) -> List[Dict]:
+        with self.lock:
+            return self._summarize(self.curr_minute, self.buckets)
+
+    @staticmethod
+    def _summarize(curr_minute: int, buckets: Dict[str, List[float]]) -> List[Dict]:
+        if curr_minute == 0:
+            return []
+
+        minute = datetime.datetime.fromtimestamp(curr_minute * 60).strftime('%Y-%m-%d %H:%M')
+        ans = []
+        for stage, values in buckets.items():
+            if len(values) == 0:
+                continue
+            values = sorted(values)
+            ans.append({
+                'minute': minute,
+                'stage': stage,
+                'count': len(values),
+                'p50_ms': round(_percentile(values, 0.50) * 1000, 3),
+                'p99_ms': round(_percentile(values, 0.99) * 1000, 3),
+                'max_ms': round(values[-1] * 1000, 3),
+            })
+        return ans
+
+    # 没有输出路径时直接丢弃，不需要写盘线程
+    def _rollover_locked(self, notify: bool = True) -> None:
+        if self.path is not None and len(self.buckets) > 0:
+            self.finished.append((self.curr_minute, self.buckets))
+            if notify:
+                if self.writer is None:
+                    self.writer = threading.Thread(target=self._write_loop, name='latency-writer', daemon=True)
+                    self.writer.start()
+                self.wakeup.set()
+        self.buckets = {}
+
+    def _write_loop(self) -> None:
+        while not self.stopped.is_set():
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self._write_finished()
+
+    def _write_finished(self) -> None:
+        with self.write_lock:
+            with self.lock:
+                finished, self.finished = self.finished, []
+                path = self.path
+            if path is None:
+                return
+
+            for curr_minute, buckets in finished:
+                rows = self._summarize(curr_minute, buckets)
+                if len(rows) == 0:
+                    continue
+                file_path = path.format(rows[0]['minute'][:10]) if '{}' in path else path
+                try:
+                    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+                    with open(file_path, 'a') as w:
+                        for row in rows:
+                            w.write(json.dumps(row, ensure_ascii=False))
+                            w.write('\n')
+                except OSError as e:
+                    print(f'[耗时统计写入失败:{e}]', end='')
+
+
+# 进程内共用一个统计器
+latency_recorder = LatencyRecorder()
+
+
+def latency_span(stage: str):
+    return latency_recorder.span(stage)
+
+
+# 函数耗时装饰器
+def latency_timed(stage: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                latency_recorder.record(stage, time.perf_counter() - t0)
+        return wrapper
+    return decorator
@@ -1,9 +1,10 @@
-import datetime
 import logging
 
 from delegate.base_delegate import BaseDelegate
 
 from tools.utils_basic import get_limit_up_price
+from tools.utils_clock import clock_now
+from tools.utils_timing import latency_timed
 
 
 class BaseBuyer:
@@ -13,6 +14,7 @@ class BaseBuyer:
         self.delegate = delegate
         self.order_premium = parameters.order_premium
 
+    @latency_timed('order_buy')
     def order_buy(
         self,
         code: str,
@@ -59,7 +61,7 @@ class BaseBuyer:
 
             if self.delegate.callback is not None:
                 self.delegate.callback.record_order(
-                    order_time=datetime.datetime.now().timestamp(),
+                    order_time=clock_now().timestamp(),
                     code=code,
                     price=price,
                     volume=volume,
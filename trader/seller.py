@@ -1,23 +1,186 @@
-import datetime
 import logging
+import time
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 from xtquant.xttype import XtPosition
 
 from delegate.base_delegate import BaseDelegate
+from tools.utils_bars import BarStore, BarSeries
 from tools.utils_basic import get_limit_down_price
+from tools.utils_clock import clock_now, compile_time_range
+from tools.utils_indicator import RollingIndicators
+from tools.utils_timing import latency_recorder, latency_timed
+from trader.seller_stops import StopOrderBook
+from trader.seller_triggers import TriggerTable, Trigger
+
+
+# ================================
+# 批量卖出判断的输入，每次扫描把需要检查的持仓整理成数组
+# ================================
+class SellBatch:
+    def __init__(
+        self,
+        positions: List[XtPosition],
+        quotes: Dict[str, Dict],
+        held_days: Dict[str, int],
+        max_prices: Dict[str, float],
+    ):
+        self.positions = positions
+        self.codes = [position.stock_code for position in positions]
+        self.quotes = [quotes[code] for code in self.codes]
+
+        self.price = np.array([quote['lastPrice'] for quote in self.quotes], dtype=np.float64)
+        self.open_price = np.array([position.open_price for position in positions], dtype=np.float64)
+        self.can_use_volume = np.array([position.can_use_volume for position in positions], dtype=np.int64)
+        self.held_day = np.array([held_days[code] for code in self.codes], dtype=np.int64)
+        self.max_price = np.array([max_prices.get(code, np.nan) for code in self.codes], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+# ================================
+# 编译后的单条卖出规则：绑定到卖出策略实例的 check_sell 和它的生效时段
+# 逐个判断和批量判断都经过这里，调用次数、命中次数和耗时统计口径一致
+# ================================
+class SellRule:
+    def __init__(self, component, seller, minute_range: Optional[Tuple[int, int]]):
+        self.name = component.__name__
+        self.component = component
+        self.check_sell = component.check_sell.__get__(seller)     # 构造时绑定，盘中不再查找父类
+        batch_check_sell = getattr(component, 'batch_check_sell', None)
+        self.batch_check_sell = batch_check_sell.__get__(seller) if batch_check_sell is not None else None
+        self.minute_range = minute_range                            # None 表示任何时候都要检查
+        self.stage = f'check_sell.{self.name}'
+
+        self.calls = 0          # 调用次数，批量判断按参与判断的持仓数计
+        self.hits = 0           # 返回 True 的次数（卖出或阻断）
+        self.seconds = 0.0      # 累计耗时，单位（秒）
+
+    def is_active(self, curr_minute: int) -> bool:
+        return self.minute_range is None or self.minute_range[0] <= curr_minute < self.minute_range[1]
+
+    def __call__(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
+                 held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                 bars: Optional[Dict[int, BarSeries]] = None) -> bool:
+        t0 = time.perf_counter()
+        sold = self.check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
+        cost = time.perf_counter() - t0
+        latency_recorder.record(self.stage, cost)
+
+        self.calls += 1
+        self.seconds += cost
+        if sold:
+            self.hits += 1
+        return sold
+
+    def batch(self, batch: SellBatch, curr_time: str, undecided: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        t0 = time.perf_counter()
+        mask, reasons = self.batch_check_sell(batch, curr_time, undecided)
+        cost = time.perf_counter() - t0
+        latency_recorder.record(self.stage, cost)
+
+        self.calls += int(undecided.sum())
+        self.seconds += cost
+        self.hits += int(mask.sum())
+        return mask, reasons
 
 
 class BaseSeller:
+    rule_window: Optional[str] = None   # 生效时段的属性名，组合卖出策略据此筛选每分钟要执行的规则
+
     def __init__(self, strategy_name: str, delegate: BaseDelegate, parameters):
         self.strategy_name = strategy_name
         self.delegate = delegate
         self.order_premium = parameters.order_premium
+        self.batch_sell = getattr(parameters, 'batch_sell', False)     # 是否按数组批量判断卖点
+        self.full_scan_time = ''    # 上次全量扫描的分钟，每分钟至少全量扫描一次，保证按时间触发的卖点
+        self.indicator_states: Dict[str, RollingIndicators] = {}   # 盘前算好的指标前缀状态
+        self.trigger_table = TriggerTable(self.build_triggers)      # 持仓触发价表，输入变化时才重算
+        self.sell_rules: List[SellRule] = [SellRule(self.__class__, self, None)]   # 组合卖出策略会重新编译
+
+        # 本地条件单：硬止损止盈（和可选的移动止损）在每次推送时直接检查，不等策略扫描
+        self.open_stop_orders = getattr(parameters, 'open_stop_orders', False)
+        self.stop_trailing: Optional[float] = getattr(parameters, 'stop_trailing', None)  # 移动止损回落比例
+        self.stop_minute_range = compile_time_range(getattr(parameters, 'stop_time_range', ['09:31', '14:57']))
+        self.stop_book = StopOrderBook()
+        self.stop_armed: Dict[str, int] = {}    # 已挂条件单的股票和挂单时的可用数量
+
+    # 盘前下载完历史日线之后调用，每个股票算一次指标前缀状态
+    def prepare_indicators(self, cache_history: Dict[str, pd.DataFrame]) -> None:
+        self.indicator_states = {code: RollingIndicators(cache_history[code]) for code in cache_history}
+
+    # 取股票的指标状态，history 重新下载过或者没有提前准备时当场构建
+    def get_indicators(self, code: str, history: pd.DataFrame) -> RollingIndicators:
+        state = self.indicator_states.get(code)
+        if state is None or state.source is not history:
+            state = RollingIndicators(history)
+            self.indicator_states[code] = state
+        return state
+
+    # 汇总各个卖出策略的触发价，有 make_triggers（包括继承来的）的策略才参与
+    def build_triggers(self, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        triggers = {}
+        for component in self.get_sell_components():
+            make_triggers = getattr(component, 'make_triggers', None)
+            if make_triggers is not None:
+                triggers.update(make_triggers(self, cost_price, held_day, max_price))
+        return triggers
+
+    # 根据触发价表挂本地条件单，只在触发价或可用数量变化时重挂，已触发的不会被立即补回
+    def arm_stops(
+        self,
+        positions: List[XtPosition],
+        held_days: Dict[str, int],
+        max_prices: Dict[str, float],
+        changed: List[str],
+    ) -> None:
+        changed = set(changed)
+        holding = set()
+        for position in positions:
+            code = position.stock_code
+            if held_days.get(code, 0) <= 0 or position.can_use_volume <= 0 or code not in self.trigger_table:
+                continue
+            holding.add(code)
+            if self.stop_book.recently_sold(code):
+                continue
+            if code not in changed and self.stop_armed.get(code) == position.can_use_volume:
+                continue
+
+            volume = position.can_use_volume
+            triggers = self.trigger_table.rows[code]
+            if 'hard_loss' in triggers:
+                self.stop_book.place(code, 'stop_loss', triggers['hard_loss'][0], volume, f'条件单{triggers["hard_loss"][1]}')
+            if 'hard_earn' in triggers:
+                self.stop_book.place(code, 'take_profit', triggers['hard_earn'][0], volume, f'条件单{triggers["hard_earn"][1]}')
+            if self.stop_trailing is not None and code in max_prices:
+                self.stop_book.place_trailing(
+                    code, self.stop_trailing, max_prices[code], volume, f'移动止损{int(self.stop_trailing * 100)}%')
+            self.stop_armed[code] = volume
 
-    def order_sell(self, code, quote, volume, remark, log=True) -> None:
+        self.stop_book.retain(holding)
+        self.stop_armed = {code: volume for code, volume in self.stop_armed.items() if code in holding}
+
+    # 行情回调里直接调用，只检查本次推送到的股票
+    def check_stops(self, quotes: Dict[str, Dict], curr_minute: int) -> None:
+        if not self.open_stop_orders or len(self.stop_armed) == 0:
+            return
+        if not (self.stop_minute_range[0] <= curr_minute < self.stop_minute_range[1]):
+            return
+        for order, quote in self.stop_book.check(quotes):
+            self.stop_armed.pop(order.code, None)   # 下次扫描时按新的可用数量重挂，部分成交或废单不会漏掉
+            self.order_sell(order.code, quote, order.volume, order.remark, from_stop=True)
+
+    @latency_timed('order_sell')
+    def order_sell(self, code, quote, volume, remark, log=True, from_stop=False) -> None:
         # TODO: 20cm
         if volume > 0:
+            if self.open_stop_orders and not from_stop and not self.stop_book.mark_sold(code):
+                print(f'{code} 条件单刚刚卖出，扫描不再重复委托')
+                return
+
             order_price = quote['lastPrice'] - self.order_premium
             limit_price = get_limit_down_price(code, quote['lastClose'])
             if order_price < limit_price:
@@ -41,7 +204,7 @@ class BaseSeller:
 
             if self.delegate.callback is not None:
                 self.delegate.callback.record_order(
-                    order_time=datetime.datetime.now().timestamp(),
+                    order_time=clock_now().timestamp(),
                     code=code,
                     price=order_price,
                     volume=volume,
@@ -59,27 +222,102 @@ class BaseSeller:
         positions: List[XtPosition],
         held_days: Dict[str, int],
         max_prices: Dict[str, float],
-        cache_history: Dict[str, pd.DataFrame]
+        cache_history: Dict[str, pd.DataFrame],
+        changed_codes: Optional[Dict[str, Tuple[Optional[float], float]]] = None,  # 只扫描变过价的股票
+        cache_bars: Optional[BarStore] = None,  # 盘中聚合的分钟线
     ) -> None:
-        for position in positions:
+        if changed_codes is not None and self.full_scan_time != curr_time:
+            changed_codes = None
+        if changed_codes is None:
+            self.full_scan_time = curr_time
+
+        changed_triggers = self.trigger_table.sync(positions, held_days, max_prices)
+        if len(changed_triggers) > 0:
+            self.trigger_table.log(changed_triggers)
+        if self.open_stop_orders:
+            self.arm_stops(positions, held_days, max_prices, changed_triggers)
+
+        # 如果有数据且有持仓时间记录
+        targets = [
+            position for position in positions
+            if (changed_codes is None or position.stock_code in changed_codes)
+            and (position.stock_code in quotes) and (position.stock_code in held_days)
+            and not self.stop_book.recently_fired(position.stock_code)    # 条件单刚卖过的不再重复下单
+        ]
+
+        if self.batch_sell:
+            self.execute_sell_batch(
+                targets, quotes, curr_date, curr_time, held_days, max_prices, cache_history, cache_bars)
+            return
+
+        for position in targets:
             code = position.stock_code
+            self.check_sell(
+                code=code,
+                quote=quotes[code],
+                curr_date=curr_date,
+                curr_time=curr_time,
+                position=position,
+                held_day=held_days[code],
+                max_price=max_prices[code] if code in max_prices else None,
+                history=cache_history[code] if code in cache_history else None,
+                bars=cache_bars.get(code) if cache_bars is not None else None,
+            )
 
-            # 如果有数据且有持仓时间记录
-            if (code in quotes) and (code in held_days):
-                self.check_sell(
-                    code=code,
-                    quote=quotes[code],
-                    curr_date=curr_date,
-                    curr_time=curr_time,
-                    position=position,
-                    held_day=held_days[code],
-                    max_price=max_prices[code] if code in max_prices else None,
-                    history=cache_history[code] if code in cache_history else None,
-                )
+    # 参与卖出判断的策略类，按顺序执行，组合卖出策略会覆盖
+    def get_sell_components(self) -> list:
+        return [self.__class__]
+
+    # 当前分钟需要执行的规则
+    def get_active_rules(self, curr_time: str) -> List[SellRule]:
+        return self.sell_rules
+
+    # 批量判断：有 batch_check_sell 的策略对全部持仓做一次数组运算，其余策略逐个持仓调用 check_sell
+    # 和逐个判断一样，某个持仓被前面的策略卖出或阻断之后，后面的策略不再处理它
+    def execute_sell_batch(
+        self,
+        positions: List[XtPosition],
+        quotes: Dict[str, Dict],
+        curr_date: str,
+        curr_time: str,
+        held_days: Dict[str, int],
+        max_prices: Dict[str, float],
+        cache_history: Dict[str, pd.DataFrame],
+        cache_bars: Optional[BarStore] = None,
+    ) -> None:
+        if len(positions) == 0:
+            return
+
+        batch = SellBatch(positions, quotes, held_days, max_prices)
+        decided = np.zeros(len(batch), dtype=bool)
+
+        for rule in self.get_active_rules(curr_time):
+            if decided.all():
+                break
+
+            if rule.batch_check_sell is not None:
+                mask, reasons = rule.batch(batch, curr_time, ~decided)
+                for i in np.flatnonzero(mask):
+                    self.order_sell(batch.codes[i], batch.quotes[i], int(batch.can_use_volume[i]), reasons[i])
+                decided |= mask
+            else:
+                for i in np.flatnonzero(~decided):
+                    code = batch.codes[i]
+                    decided[i] = rule(
+                        code=code,
+                        quote=batch.quotes[i],
+                        curr_date=curr_date,
+                        curr_time=curr_time,
+                        position=batch.positions[i],
+                        held_day=held_days[code],
+                        max_price=max_prices[code] if code in max_prices else None,
+                        history=cache_history[code] if code in cache_history else None,
+                        bars=cache_bars.get(code) if cache_bars is not None else None,
+                    )
 
     def check_sell(
         self, code: str, quote: Dict, curr_date: str, curr_time: str,
         position: XtPosition, held_day: int, max_price: Optional[float],
-        history: Optional[pd.DataFrame],
+        history: Optional[pd.DataFrame], bars: Optional[Dict[int, BarSeries]] = None,
     ) -> bool:
         return False  # False 表示没有卖过，不阻挡其他Seller卖出
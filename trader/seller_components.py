@@ -2,148 +2,266 @@ import logging
 
 from mytt.MyTT_advance import *
 # from mytt.MyTT_custom import *
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from xtquant.xttype import XtPosition
 
+from tools.utils_bars import BarSeries
 from tools.utils_basic import get_limit_up_price
-from trader.seller import BaseSeller
+from tools.utils_clock import get_time_minute, compile_time_range
+from trader.seller import BaseSeller, SellBatch
+from trader.seller_triggers import Trigger
 
 
 # ================================
 # 根据建仓价的下跌比例严格绝对止损
 # ================================
 class HardSeller(BaseSeller):
+    rule_window = 'hard_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('硬性卖出策略', end=' ')
         self.hard_time_range = parameters.hard_time_range
+        self.hard_minute_range = compile_time_range(self.hard_time_range)
         self.earn_limit = parameters.earn_limit
         self.risk_limit = parameters.risk_limit
         self.risk_tight = parameters.risk_tight
 
+    def make_triggers(self, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        return {
+            'hard_loss': (cost_price * (self.risk_limit + held_day * self.risk_tight),
+                          f'硬止损{int((1 - self.risk_limit) * 100)}%'),
+            'hard_earn': (cost_price * self.earn_limit,
+                          f'硬止盈{int((self.earn_limit - 1) * 100)}%'),
+        }
+
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
-        if (held_day > 0) and (self.hard_time_range[0] <= curr_time < self.hard_time_range[1]):
+        curr_minute = get_time_minute(curr_time)
+        if (held_day > 0) and (self.hard_minute_range[0] <= curr_minute < self.hard_minute_range[1]):
             curr_price = quote['lastPrice']
-            cost_price = position.open_price
             sell_volume = position.can_use_volume
-            switch_lower = cost_price * (self.risk_limit + held_day * self.risk_tight)
+            triggers = self.trigger_table.lookup(code, position.open_price, held_day, max_price)
+            loss_price, loss_reason = triggers['hard_loss']
+            earn_price, earn_reason = triggers['hard_earn']
 
-            if curr_price <= switch_lower:
-                self.order_sell(code, quote, sell_volume, f'硬止损{int((1 - self.risk_limit) * 100)}%')
+            if curr_price <= loss_price:
+                self.order_sell(code, quote, sell_volume, loss_reason)
                 return True
-            elif curr_price >= cost_price * self.earn_limit:
-                self.order_sell(code, quote, sell_volume, f'硬止盈{int((self.earn_limit - 1) * 100)}%')
+            elif curr_price >= earn_price:
+                self.order_sell(code, quote, sell_volume, earn_reason)
                 return True
 
         return False
 
+    # 批量版本：止损价和止盈价直接从触发价表里取
+    def batch_check_sell(self, batch: SellBatch, curr_time: str, undecided: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        reasons = [''] * len(batch)
+        curr_minute = get_time_minute(curr_time)
+        if not (self.hard_minute_range[0] <= curr_minute < self.hard_minute_range[1]):
+            return np.zeros(len(batch), dtype=bool), reasons
+
+        active = undecided & (batch.held_day > 0)
+        loss = active & (batch.price <= self.trigger_table.column(batch.codes, 'hard_loss'))
+        earn = active & ~loss & (batch.price >= self.trigger_table.column(batch.codes, 'hard_earn'))
+
+        for i in np.flatnonzero(loss):
+            reasons[i] = self.trigger_table.reason(batch.codes[i], 'hard_loss')
+        for i in np.flatnonzero(earn):
+            reasons[i] = self.trigger_table.reason(batch.codes[i], 'hard_earn')
+        return loss | earn, reasons
+
 
 # ================================
 # 盈利未达预期则卖出换仓
 # ================================
 class SwitchSeller(BaseSeller):
+    rule_window = 'switch_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('换仓卖出策略', end=' ')
         self.switch_time_range = parameters.switch_time_range
+        self.switch_minute_range = compile_time_range(self.switch_time_range)
         self.switch_hold_days = parameters.switch_hold_days
         self.switch_demand_daily_up = parameters.switch_demand_daily_up
 
+    def make_triggers(self, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        if held_day <= self.switch_hold_days:
+            return {}
+        return {'switch': (cost_price * (1 + held_day * self.switch_demand_daily_up), '换仓卖单')}
+
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
-        if (held_day > self.switch_hold_days) and (self.switch_time_range[0] <= curr_time < self.switch_time_range[1]):
+        curr_minute = get_time_minute(curr_time)
+        if (held_day > self.switch_hold_days) and (self.switch_minute_range[0] <= curr_minute < self.switch_minute_range[1]):
             curr_price = quote['lastPrice']
-            cost_price = position.open_price
             sell_volume = position.can_use_volume
-            switch_upper = cost_price * (1 + held_day * self.switch_demand_daily_up)
+            switch_upper, reason = self.trigger_table.lookup(code, position.open_price, held_day, max_price)['switch']
 
             if curr_price < switch_upper:  # 未满足盈利目标的仓位
-                self.order_sell(code, quote, sell_volume, '换仓卖单')
+                self.order_sell(code, quote, sell_volume, reason)
                 return True
 
         return False
 
+    def batch_check_sell(self, batch: SellBatch, curr_time: str, undecided: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        reasons = [''] * len(batch)
+        curr_minute = get_time_minute(curr_time)
+        if not (self.switch_minute_range[0] <= curr_minute < self.switch_minute_range[1]):
+            return np.zeros(len(batch), dtype=bool), reasons
+
+        mask = undecided & (batch.held_day > self.switch_hold_days) \
+            & (batch.price < self.trigger_table.column(batch.codes, 'switch'))
+        for i in np.flatnonzero(mask):
+            reasons[i] = self.trigger_table.reason(batch.codes[i], 'switch')
+        return mask, reasons
+
 
 # ================================
 # 历史最高价回落比例止盈
 # ================================
 class FallSeller(BaseSeller):
+    rule_window = 'fall_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('回落卖出策略', end=' ')
         self.fall_time_range = parameters.fall_time_range
+        self.fall_minute_range = compile_time_range(self.fall_time_range)
         self.fall_from_top = parameters.fall_from_top
 
+    # 最高价落在哪一档只随最高价变化，取第一个命中的档位
+    def make_triggers(self, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        if max_price is None:
+            return {}
+        for inc_min, inc_max, fall_threshold in self.fall_from_top:  # 逐级回落卖出
+            if cost_price * inc_min <= max_price < cost_price * inc_max:
+                return {'fall': (max_price * (1 - fall_threshold), f'涨{int((inc_min - 1) * 100)}%回落')}
+        return {}
+
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if max_price is not None:
-            if (held_day > 0) and (self.fall_time_range[0] <= curr_time < self.fall_time_range[1]):
+            if (held_day > 0) and (self.fall_minute_range[0] <= curr_minute < self.fall_minute_range[1]):
                 curr_price = quote['lastPrice']
                 cost_price = position.open_price
                 sell_volume = position.can_use_volume
-
-                for inc_min, inc_max, fall_threshold in self.fall_from_top:  # 逐级回落卖出
-                    if (cost_price * inc_min <= max_price < cost_price * inc_max) \
-                            and curr_price < max_price * (1 - fall_threshold):
-                        logging.warning(f'[Sell]'
-                                        f'cost_p:{cost_price} max_p:{max_price} '
-                                        f'inc_min:{inc_min} inc_max:{inc_max}')
-                        self.order_sell(code, quote, sell_volume, f'涨{int((inc_min - 1) * 100)}%回落')
-                        return True
+                triggers = self.trigger_table.lookup(code, cost_price, held_day, max_price)
+
+                if 'fall' in triggers and curr_price < triggers['fall'][0]:
+                    fall_price, reason = triggers['fall']
+                    logging.warning(f'[Sell]'
+                                    f'cost_p:{cost_price} max_p:{max_price} '
+                                    f'fall_p:{fall_price:.3f}')
+                    self.order_sell(code, quote, sell_volume, reason)
+                    return True
 
         return False
 
+    def batch_check_sell(self, batch: SellBatch, curr_time: str, undecided: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        reasons = [''] * len(batch)
+        curr_minute = get_time_minute(curr_time)
+        if not (self.fall_minute_range[0] <= curr_minute < self.fall_minute_range[1]):
+            return np.zeros(len(batch), dtype=bool), reasons
+
+        fall_prices = self.trigger_table.column(batch.codes, 'fall')
+        mask = undecided & (batch.held_day > 0) & (batch.price < fall_prices)
+        for i in np.flatnonzero(mask):
+            logging.warning(f'[Sell]'
+                            f'cost_p:{batch.open_price[i]} max_p:{batch.max_price[i]} '
+                            f'fall_p:{fall_prices[i]:.3f}')
+            reasons[i] = self.trigger_table.reason(batch.codes[i], 'fall')
+        return mask, reasons
+
 
 # ================================
 # 浮盈回撤百分止盈
 # ================================
 class ReturnSeller(BaseSeller):
+    rule_window = 'return_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('回撤卖出策略', end=' ')
         self.return_time_range = parameters.return_time_range
+        self.return_minute_range = compile_time_range(self.return_time_range)
         self.return_of_profit = parameters.return_of_profit
 
+    def make_triggers(self, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        if max_price is None:
+            return {}
+        for inc_min, inc_max, fall_percentage in self.return_of_profit:  # 逐级回落止盈
+            if cost_price * inc_min <= max_price < cost_price * inc_max:
+                return {'return': (max_price - (max_price - cost_price) * fall_percentage,
+                                   f'涨{int((inc_min - 1) * 100)}%回撤')}
+        return {}
+
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if max_price is not None:
-            if (held_day > 0) and (self.return_time_range[0] <= curr_time < self.return_time_range[1]):
+            if (held_day > 0) and (self.return_minute_range[0] <= curr_minute < self.return_minute_range[1]):
                 curr_price = quote['lastPrice']
                 cost_price = position.open_price
                 sell_volume = position.can_use_volume
-
-                for inc_min, inc_max, fall_percentage in self.return_of_profit:  # 逐级回落止盈
-                    if (cost_price * inc_min <= max_price < cost_price * inc_max) \
-                            and curr_price < max_price - (max_price - cost_price) * fall_percentage:
-                        logging.warning(f'[Sell]'
-                                        f'cost_p:{cost_price} max_p:{max_price} '
-                                        f'inc_min:{inc_min} inc_max:{inc_max}')
-                        self.order_sell(code, quote, sell_volume, f'涨{int((inc_min - 1) * 100)}%回撤')
-                        return True
+                triggers = self.trigger_table.lookup(code, cost_price, held_day, max_price)
+
+                if 'return' in triggers and curr_price < triggers['return'][0]:
+                    return_price, reason = triggers['return']
+                    logging.warning(f'[Sell]'
+                                    f'cost_p:{cost_price} max_p:{max_price} '
+                                    f'return_p:{return_price:.3f}')
+                    self.order_sell(code, quote, sell_volume, reason)
+                    return True
 
         return False
 
+    def batch_check_sell(self, batch: SellBatch, curr_time: str, undecided: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        reasons = [''] * len(batch)
+        curr_minute = get_time_minute(curr_time)
+        if not (self.return_minute_range[0] <= curr_minute < self.return_minute_range[1]):
+            return np.zeros(len(batch), dtype=bool), reasons
+
+        return_prices = self.trigger_table.column(batch.codes, 'return')
+        mask = undecided & (batch.held_day > 0) & (batch.price < return_prices)
+        for i in np.flatnonzero(mask):
+            logging.warning(f'[Sell]'
+                            f'cost_p:{batch.open_price[i]} max_p:{batch.max_price[i]} '
+                            f'return_p:{return_prices[i]:.3f}')
+            reasons[i] = self.trigger_table.reason(batch.codes[i], 'return')
+        return mask, reasons
+
 
 # ================================
 # 尾盘涨停卖出（暂时先别用）
 # ================================
 class TailCapSeller(BaseSeller):
+    rule_window = 'tail_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('尾盘涨停卖出策略', end=' ')
         self.tail_time_range = parameters.tail_time_range
+        self.tail_minute_range = compile_time_range(self.tail_time_range)
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if history is not None:
-            if (held_day > 0) and (self.tail_time_range[0] <= curr_time < self.tail_time_range[1]):
+            if (held_day > 0) and (self.tail_minute_range[0] <= curr_minute < self.tail_minute_range[1]):
                 sell_volume = position.can_use_volume
                 curr_price = quote['lastPrice']
                 last_close = history['close'].values[-1]
@@ -164,12 +282,15 @@ class OpenDaySeller(BaseSeller):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('开仓日指标止损策略', end=' ')
         self.opening_time_range = parameters.opening_time_range
+        self.opening_minute_range = compile_time_range(self.opening_time_range)
         self.open_low_rate = parameters.open_low_rate
         self.open_vol_rate = parameters.open_vol_rate
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if history is not None:
             if 0 < held_day < len(history):
                 sell_volume = position.can_use_volume
@@ -183,7 +304,7 @@ class OpenDaySeller(BaseSeller):
 
                 # 建仓日尾盘缩量卖出
                 if curr_price < get_limit_up_price(code, quote['lastClose']):
-                    if self.opening_time_range[0] <= curr_time < self.opening_time_range[1]:
+                    if self.opening_minute_range[0] <= curr_minute < self.opening_minute_range[1]:
                         curr_volume = quote['volume']
                         open_day_volume = history['volume'].values[-held_day] * self.open_vol_rate
                         if curr_volume < open_day_volume:
@@ -196,34 +317,28 @@ class OpenDaySeller(BaseSeller):
 # 跌破均线卖出
 # ================================
 class MASeller(BaseSeller):
+    rule_window = 'ma_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print(f'跌破{parameters.ma_above}日均线卖出策略', end=' ')
         self.ma_time_range = parameters.ma_time_range
+        self.ma_minute_range = compile_time_range(self.ma_time_range)
         self.ma_above = parameters.ma_above
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if history is not None:
-            if (held_day > 0) and (self.ma_time_range[0] <= curr_time < self.ma_time_range[1]):
+            if (held_day > 0) and (self.ma_minute_range[0] <= curr_minute < self.ma_minute_range[1]):
                 sell_volume = position.can_use_volume
 
                 curr_price = quote['lastPrice']
-                curr_vol = quote['volume']
 
-                df = history._append({
-                    'datetime': curr_date,
-                    'open': quote['open'],
-                    'high': quote['high'],
-                    'low': quote['low'],
-                    'close': curr_price,
-                    'volume': curr_vol,
-                    'amount': quote['amount'],
-                }, ignore_index=True)
-
-                ma_values = MA(df.close.tail(self.ma_above + 1), self.ma_above)
-                ma_value = ma_values[-1]
+                # 昨天为止的前缀和加上今天的价格，不再拼接 DataFrame
+                ma_value = self.get_indicators(code, history).ma(self.ma_above, curr_price)
 
                 if curr_price < ma_value - 0.01:
                     self.order_sell(code, quote, sell_volume, '破均卖单')
@@ -236,35 +351,28 @@ class MASeller(BaseSeller):
 # CCI 冲高回落卖出
 # ================================
 class CCISeller(BaseSeller):
+    rule_window = 'cci_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('CCI卖出策略', end=' ')
         self.cci_time_range = parameters.cci_time_range
+        self.cci_minute_range = compile_time_range(self.cci_time_range)
         self.cci_upper = parameters.cci_upper
         self.cci_lower = parameters.cci_lower
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
-        if (history is not None) and (self.cci_time_range[0] <= curr_time < self.cci_time_range[1]):
-            if (held_day > 0) and int(curr_time[-2:]) % 5 == 0:  # 每隔5分钟 CCI 卖出
+        curr_minute = get_time_minute(curr_time)
+        if (history is not None) and (self.cci_minute_range[0] <= curr_minute < self.cci_minute_range[1]):
+            if (held_day > 0) and curr_minute % 5 == 0:  # 每隔5分钟 CCI 卖出
                 sell_volume = position.can_use_volume
 
                 curr_price = quote['lastPrice']
-                curr_vol = quote['volume']
 
-                df = history._append({
-                    'datetime': curr_date,
-                    'open': quote['open'],
-                    'high': quote['high'],
-                    'low': quote['low'],
-                    'close': curr_price,
-                    'volume': curr_vol,
-                    'amount': quote['amount'],
-                }, ignore_index=True)
-
-                df['CCI'] = CCI(df['close'], df['high'], df['low'], 14)
-                cci = df['CCI'].tail(2).values
+                cci = self.get_indicators(code, history).cci(curr_price, quote['high'], quote['low'])
 
                 if cci[0] > self.cci_lower > cci[1]:  # CCI 下穿
                     self.order_sell(code, quote, sell_volume, '低CCI卖')
@@ -281,34 +389,27 @@ class CCISeller(BaseSeller):
 # WR上穿卖出
 # ================================
 class WRSeller(BaseSeller):
+    rule_window = 'wr_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('WR上穿卖出策略', end=' ')
         self.wr_time_range = parameters.wr_time_range
+        self.wr_minute_range = compile_time_range(self.wr_time_range)
         self.wr_cross = parameters.wr_cross
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
-        if (history is not None) and (self.wr_time_range[0] <= curr_time < self.wr_time_range[1]):
-            if held_day > 0 and int(curr_time[-2:]) % 5 == 0:  # 每隔5分钟 WR 卖出
+        curr_minute = get_time_minute(curr_time)
+        if (history is not None) and (self.wr_minute_range[0] <= curr_minute < self.wr_minute_range[1]):
+            if held_day > 0 and curr_minute % 5 == 0:  # 每隔5分钟 WR 卖出
                 sell_volume = position.can_use_volume
 
                 curr_price = quote['lastPrice']
-                curr_vol = quote['volume']
 
-                df = history._append({
-                    'datetime': curr_date,
-                    'open': quote['open'],
-                    'high': quote['high'],
-                    'low': quote['low'],
-                    'close': curr_price,
-                    'volume': curr_vol,
-                    'amount': quote['amount'],
-                }, ignore_index=True)
-
-                df['WR'] = WR(df['close'], df['high'], df['low'], 14)
-                wr = df['WR'].tail(2).values
+                wr = self.get_indicators(code, history).wr(curr_price, quote['high'], quote['low'])
 
                 if wr[0] < self.wr_cross < wr[1]:  # WR 上穿
                     self.order_sell(code, quote, sell_volume, 'WR上穿卖')
@@ -321,18 +422,23 @@ class WRSeller(BaseSeller):
 # 次日成交量萎缩卖出
 # ================================
 class VolumeDropSeller(BaseSeller):
+    rule_window = 'next_minute_range'
+
     def __init__(self, strategy_name, delegate, parameters):
         BaseSeller.__init__(self, strategy_name, delegate, parameters)
         print('次缩卖出策略', end=' ')
         self.next_time_range = parameters.next_time_range
+        self.next_minute_range = compile_time_range(self.next_time_range)
         self.next_volume_dec_threshold = parameters.vol_dec_thre
         self.next_volume_dec_minute = parameters.vol_dec_time
         self.next_volume_dec_limit = parameters.vol_dec_limit
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
-        if (history is not None) and (self.next_time_range[0] <= curr_time < self.next_time_range[1]):
+        curr_minute = get_time_minute(curr_time)
+        if (history is not None) and (self.next_minute_range[0] <= curr_minute < self.next_minute_range[1]):
             cost_price = position.open_price
             sell_volume = position.can_use_volume
 
@@ -360,32 +466,19 @@ class UppingBlocker(BaseSeller):
         print('上行趋势禁卖阻断', end=' ')
 
     def check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
+                   held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                   bars: Optional[Dict[int, BarSeries]] = None) -> bool:
 
+        curr_minute = get_time_minute(curr_time)
         if history is not None:
-            if held_day > 0 and int(curr_time[-2:]) % 5 == 0:
+            if held_day > 0 and curr_minute % 5 == 0:
                 curr_price = quote['lastPrice']
-                curr_vol = quote['volume']
-
-                df = history._append({
-                    'datetime': curr_date,
-                    'open': quote['open'],
-                    'high': quote['high'],
-                    'low': quote['low'],
-                    'close': curr_price,
-                    'volume': curr_vol,
-                    'amount': quote['amount'],
-                }, ignore_index=True)
-
-                _, _, df['MACD'] = MACD(df['close'])
-                macd = df['MACD'].tail(2).values
-
-                close = df['close'].tail(2).values
-                high = df['high'].tail(2).values
-                low = df['low'].tail(2).values
-
-                yesterday_price = close[0] + high[0] + low[0]
-                today_price = close[1] + high[1] + low[1]
+
+                indicators = self.get_indicators(code, history)
+                macd = indicators.macd(curr_price)
+
+                yesterday_price = indicators.last_close + indicators.last_high + indicators.last_low
+                today_price = curr_price + quote['high'] + quote['low']
 
                 if macd[0] < macd[1] and yesterday_price < today_price:  # macd上行 & 价格上行
                     # self.order_sell(code, quote, sell_volume, '上行不卖')
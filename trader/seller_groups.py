@@ -1,4 +1,6 @@
+from trader.seller import SellRule
 from trader.seller_components import *
+from tools.utils_clock import TRADING_SESSIONS
 
 
 class GroupSellers:
@@ -6,22 +8,56 @@ class GroupSellers:
         pass
 
     def group_init(self, strategy_name, delegate, parameters):
-        for parent in self.__class__.__bases__:
-            if parent.__name__ != 'GroupSellers':
-                parent.__init__(self, strategy_name, delegate, parameters)
+        for parent in self.get_group_bases():
+            parent.__init__(self, strategy_name, delegate, parameters)
+        self.compile_rules(parameters)
         print('>> 初始化完成')
 
+    def get_group_bases(self) -> list:
+        return [parent for parent in self.__class__.__bases__ if parent is not GroupSellers]
+
+    # 构造时把父类策略编译成规则列表，生效时段和卖出扫描时段没有交集的规则直接去掉
+    def compile_rules(self, parameters) -> None:
+        scan_ranges = getattr(parameters, 'minute_ranges', TRADING_SESSIONS)
+        self.sell_rules: List[SellRule] = []
+        for component in self.get_group_bases():
+            minute_range = getattr(self, component.rule_window) if component.rule_window is not None else None
+            if minute_range is not None and \
+                    not any(max(minute_range[0], start) < min(minute_range[1], end) for start, end in scan_ranges):
+                print(f'[{component.__name__}不在扫描时段]', end=' ')
+                continue
+            self.sell_rules.append(SellRule(component, self, minute_range))
+
+        self.active_minute = -1                     # 上次筛选生效规则的分钟数
+        self.active_rules: List[SellRule] = []
+
+    # 每分钟筛选一次当前生效的规则
+    def get_active_rules(self, curr_time: str) -> List[SellRule]:
+        curr_minute = get_time_minute(curr_time)
+        if curr_minute != self.active_minute:
+            self.active_rules = [rule for rule in self.sell_rules if rule.is_active(curr_minute)]
+            self.active_minute = curr_minute
+        return self.active_rules
+
+    def get_sell_components(self) -> list:
+        return [rule.component for rule in self.sell_rules]
+
+    # 各规则的调用次数、命中次数和平均耗时
+    def rule_stats(self) -> List[Dict]:
+        return [{
+            'rule': rule.name,
+            'calls': rule.calls,
+            'hits': rule.hits,
+            'avg_ms': round(rule.seconds / rule.calls * 1000, 3) if rule.calls > 0 else 0.0,
+        } for rule in self.sell_rules]
+
     def group_check_sell(self, code: str, quote: Dict, curr_date: str, curr_time: str, position: XtPosition,
-                         held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame]) -> bool:
-        sold = False
-        for parent in self.__class__.__bases__:
-            if parent.__name__ != 'GroupSellers':
-                if sold:
-                    break
-                else:
-                    sold = parent.check_sell(self, code=code, quote=quote, curr_date=curr_date, curr_time=curr_time,
-                                             position=position, held_day=held_day, max_price=max_price, history=history)
-        return sold
+                         held_day: int, max_price: Optional[float], history: Optional[pd.DataFrame],
+                         bars: Optional[Dict[int, BarSeries]] = None) -> bool:
+        for rule in self.get_active_rules(curr_time):
+            if rule(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars):
+                return True
+        return False
 
 
 class ClassicGroupSeller(GroupSellers, HardSeller, SwitchSeller, ReturnSeller):
@@ -29,8 +65,8 @@ class ClassicGroupSeller(GroupSellers, HardSeller, SwitchSeller, ReturnSeller):
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 class ShieldGroupSeller(GroupSellers, HardSeller, FallSeller, ReturnSeller):
@@ -38,8 +74,8 @@ class ShieldGroupSeller(GroupSellers, HardSeller, FallSeller, ReturnSeller):
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 # 龙抬头
@@ -48,8 +84,8 @@ class LTT2GroupSeller(GroupSellers, HardSeller, OpenDaySeller, SwitchSeller, Ret
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 # 三倍量突破
@@ -58,8 +94,8 @@ class T3BLGroupSeller(GroupSellers, HardSeller, SwitchSeller, FallSeller, MASell
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 # 超跌倍量
@@ -68,8 +104,8 @@ class CDBLGroupSeller(GroupSellers, HardSeller, SwitchSeller, FallSeller):
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 # 平台绿缩
@@ -78,8 +114,8 @@ class PTLSGroupSeller(GroupSellers, HardSeller, UppingBlocker, FallSeller, Retur
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
 
 
 # 金雀突破
@@ -88,5 +124,5 @@ class JQTPGroupSeller(GroupSellers, HardSeller, WRSeller, FallSeller, UppingBloc
         super().__init__()
         self.group_init(strategy_name, delegate, parameters)
 
-    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history):
-        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history)
+    def check_sell(self, code, quote, curr_date, curr_time, position, held_day, max_price, history, bars=None):
+        self.group_check_sell(code, quote, curr_date, curr_time, position, held_day, max_price, history, bars)
@@ -0,0 +1,159 @@
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+from tools.utils_clock import clock_monotonic
+
+
+# ================================
+# 单条本地条件单，触发一次之后就从订单簿里移除
+# ================================
+class StopOrder:
+    def __init__(
+        self,
+        code: str,
+        kind: str,                      # stop_loss：跌破触发；take_profit：涨破触发；trailing：从最高价回落触发
+        price: float,                   # 触发价，trailing 为当前的回落触发价
+        volume: int,
+        remark: str,
+        ratio: float = 0.0,             # trailing 的回落比例
+        high: float = 0.0,              # trailing 跟踪到的最高价
+    ):
+        self.code = code
+        self.kind = kind
+        self.price = price
+        self.volume = volume
+        self.remark = remark
+        self.ratio = ratio
+        self.high = high
+
+    def __repr__(self) -> str:
+        return f'StopOrder({self.code} {self.kind} {self.price:.3f} {self.volume}股 {self.remark})'
+
+
+# ================================
+# 本地条件单订单簿：每个股票的触发价按价格排序，推送到达时只比较最近的一档
+# ================================
+class StopOrderBook:
+    def __init__(
+        self,
+        cooldown: float = 60.0,         # 触发之后多少秒内不再对同一股票下卖单，单位（秒）
+    ):
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.seq = 0                    # 插入序号，同价位时保持先后顺序
+
+        # { code: [(price, seq, order)] } 按价格升序
+        self.lowers: Dict[str, List[Tuple[float, int, StopOrder]]] = {}     # 价格 <= 触发价时卖出
+        self.uppers: Dict[str, List[Tuple[float, int, StopOrder]]] = {}     # 价格 >= 触发价时卖出
+        self.trailings: Dict[str, StopOrder] = {}                          # 每个股票最多一条移动止损
+
+        self.fired: Dict[str, float] = {}       # 条件单最近触发的单调时钟，用于去重
+        self.sold: Dict[str, float] = {}        # 策略扫描最近下卖单的单调时钟
+        self.history: List[StopOrder] = []      # 当日已触发的条件单
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(v) for v in self.lowers.values()) \
+                + sum(len(v) for v in self.uppers.values()) + len(self.trailings)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.lowers or code in self.uppers or code in self.trailings
+
+    def _insert(self, side: Dict[str, List[Tuple[float, int, StopOrder]]], order: StopOrder) -> None:
+        self.seq += 1
+        bisect.insort(side.setdefault(order.code, []), (order.price, self.seq, order))
+
+    # 止损单和止盈单，同一股票同一种类只保留最新的一条
+    def place(self, code: str, kind: str, price: float, volume: int, remark: str) -> StopOrder:
+        assert kind in ['stop_loss', 'take_profit'], f'不支持的条件单类型 {kind}'
+        order = StopOrder(code, kind, price, volume, remark)
+        side = self.lowers if kind == 'stop_loss' else self.uppers
+        with self.lock:
+            if code in side:
+                side[code] = [item for item in side[code] if item[2].kind != kind]
+            self._insert(side, order)
+        return order
+
+    def place_trailing(self, code: str, ratio: float, high: float, volume: int, remark: str) -> StopOrder:
+        order = StopOrder(code, 'trailing', high * (1 - ratio), volume, remark, ratio=ratio, high=high)
+        with self.lock:
+            prev = self.trailings.get(code)
+            if prev is not None and prev.high > high:
+                order.high = prev.high          # 盘中已经跟踪到更高的价格
+                order.price = prev.price
+            self.trailings[code] = order
+        return order
+
+    def cancel(self, code: str) -> None:
+        with self.lock:
+            self.lowers.pop(code, None)
+            self.uppers.pop(code, None)
+            self.trailings.pop(code, None)
+
+    # 只保留仍在持仓的股票
+    def retain(self, codes) -> None:
+        with self.lock:
+            for side in [self.lowers, self.uppers, self.trailings]:
+                for code in [code for code in side if code not in codes]:
+                    del side[code]
+
+    def recently_fired(self, code: str) -> bool:
+        fired = self.fired.get(code)
+        return fired is not None and clock_monotonic() - fired < self.cooldown
+
+    # 条件单或者策略扫描最近卖过
+    def recently_sold(self, code: str) -> bool:
+        sold = self.sold.get(code)
+        return self.recently_fired(code) or (sold is not None and clock_monotonic() - sold < self.cooldown)
+
+    # 策略扫描准备下卖单：条件单刚卖过时返回 False，否则撤掉这个股票的条件单并记下
+    # 判断和标记在同一把锁里，和行情回调线程里的 check 不会同时卖出同一个股票
+    def mark_sold(self, code: str) -> bool:
+        with self.lock:
+            if self.recently_fired(code):
+                return False
+            self.lowers.pop(code, None)
+            self.uppers.pop(code, None)
+            self.trailings.pop(code, None)
+            self.sold[code] = clock_monotonic()
+        return True
+
+    # 用本次推送检查条件单，返回触发的 [(order, quote)]，每个股票一次推送最多触发一条
+    def check(self, quotes: Dict[str, Dict]) -> List[Tuple[StopOrder, Dict]]:
+        ans = []
+        with self.lock:
+            for code in [code for code in quotes if code in self.lowers or code in self.uppers or code in self.trailings]:
+                quote = quotes[code]
+                curr_price = quote['lastPrice']
+                if curr_price <= 0:
+                    continue
+
+                order = None
+                trailing = self.trailings.get(code)
+                if trailing is not None and curr_price > trailing.high:
+                    trailing.high = curr_price
+                    trailing.price = curr_price * (1 - trailing.ratio)
+
+                lowers = self.lowers.get(code)
+                uppers = self.uppers.get(code)
+                if lowers and curr_price <= lowers[-1][0]:
+                    order = lowers.pop()[2]     # 最高的下方触发价最先被跌破
+                elif uppers and curr_price >= uppers[0][0]:
+                    order = uppers.pop(0)[2]    # 最低的上方触发价最先被涨破
+                elif trailing is not None and curr_price <= trailing.price:
+                    order = self.trailings.pop(code)
+
+                if order is None:
+                    continue
+
+                # 同一股票触发后撤掉其余条件单，避免重复卖出
+                self.lowers.pop(code, None)
+                self.uppers.pop(code, None)
+                self.trailings.pop(code, None)
+                if self.recently_sold(code):
+                    continue
+                self.fired[code] = clock_monotonic()
+                self.history.append(order)
+                ans.append((order, quote))
+        return ans
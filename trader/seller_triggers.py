@@ -0,0 +1,93 @@
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from xtquant.xttype import XtPosition
+
+
+# 单条触发价：(价格, 卖出备注)
+Trigger = Tuple[float, str]
+
+
+# ================================
+# 持仓触发价表：止损、止盈、回落、回撤等阈值只和建仓价、持仓天数、最高价有关
+# 这些输入变化时才重算，盘中每次只需要拿现价和表里的价格比较一次
+# ================================
+class TriggerTable:
+    def __init__(
+        self,
+        build: Callable[[float, int, Optional[float]], Dict[str, Trigger]],     # (建仓价, 持仓天数, 最高价) -> 各规则触发价
+    ):
+        self.build = build
+        self.keys: Dict[str, tuple] = {}                    # 每个持仓上次计算时的输入
+        self.rows: Dict[str, Dict[str, Trigger]] = {}       # 每个持仓的触发价 { rule: (price, reason) }
+        self.rebuilds = 0                                   # 累计重算次数，审计用
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.rows
+
+    # 取某个持仓的触发价，输入和上次不同时当场重算
+    def lookup(self, code: str, cost_price: float, held_day: int, max_price: Optional[float]) -> Dict[str, Trigger]:
+        key = (cost_price, held_day, max_price)
+        if self.keys.get(code) != key:
+            self.keys[code] = key
+            self.rows[code] = self.build(cost_price, held_day, max_price)
+            self.rebuilds += 1
+        return self.rows[code]
+
+    # 每次扫描前同步：删掉已清仓的，重算输入有变化的，返回重算了的代码
+    def sync(
+        self,
+        positions: List[XtPosition],
+        held_days: Dict[str, int],
+        max_prices: Dict[str, float],
+    ) -> List[str]:
+        holding = set()
+        changed = []
+        for position in positions:
+            code = position.stock_code
+            if code not in held_days:
+                continue
+            holding.add(code)
+
+            rebuilds = self.rebuilds
+            self.lookup(code, position.open_price, held_days[code], max_prices.get(code))
+            if self.rebuilds != rebuilds:
+                changed.append(code)
+
+        for code in [code for code in self.rows if code not in holding]:
+            del self.rows[code]
+            del self.keys[code]
+        return changed
+
+    # 一组持仓某条规则的触发价，没有这条规则的记为 NaN，和 NaN 比较总是 False
+    def column(self, codes: List[str], rule: str) -> np.ndarray:
+        return np.array([
+            self.rows[code][rule][0] if code in self.rows and rule in self.rows[code] else np.nan
+            for code in codes
+        ], dtype=np.float64)
+
+    def reason(self, code: str, rule: str) -> str:
+        return self.rows[code][rule][1]
+
+    def to_frame(self) -> pd.DataFrame:
+        records = []
+        for code, row in self.rows.items():
+            cost_price, held_day, max_price = self.keys[code]
+            record = {'code': code, 'cost_price': cost_price, 'held_day': held_day, 'max_price': max_price}
+            for rule, (price, reason) in row.items():
+                record[rule] = round(price, 3)
+                record[f'{rule}_reason'] = reason
+            records.append(record)
+        return pd.DataFrame(records)
+
+    def log(self, codes: Optional[List[str]] = None) -> None:
+        for code in (codes if codes is not None else list(self.rows.keys())):
+            cost_price, held_day, max_price = self.keys[code]
+            prices = ' '.join(f'{rule}:{price:.3f}' for rule, (price, _) in self.rows[code].items())
+            logging.info(f'[触发价]{code} cost_p:{cost_price} held:{held_day} max_p:{max_price} {prices}')